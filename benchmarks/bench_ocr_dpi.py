@@ -0,0 +1,60 @@
+"""Сравнение фиксированного и адаптивного DPI для OCR.
+
+Для каждого режима замеряются скорость (страниц в минуту) и точность.
+Точность считается как доля совпадающих символов с текстовым слоем PDF,
+поэтому нужен документ, где текстовый слой есть (например, результат
+«Создать PDF с текстовым слоем» или изначально цифровой PDF).
+
+Запуск: python benchmarks/bench_ocr_dpi.py document.pdf [--pages 20] [--fixed 200 300]
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_processor import OCRProcessor, _ocr_page_job  # noqa: E402
+from page_source import AdaptiveDPI, PageRef, load_page, open_document  # noqa: E402
+from settings import Settings  # noqa: E402
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+def run_mode(pdf_path, pages, dpi, options, references):
+    started = time.perf_counter()
+    texts = [_ocr_page_job(PageRef(pdf_path, page_num, dpi), options) or '' for page_num in pages]
+    elapsed = time.perf_counter() - started
+    accuracy = sum(difflib.SequenceMatcher(None, text, reference, autojunk=False).ratio()
+                   for text, reference in zip(texts, references)) / len(pages)
+    return elapsed, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf_path')
+    parser.add_argument('--pages', type=int, default=20, help="Сколько первых страниц использовать")
+    parser.add_argument('--fixed', type=int, nargs='+', default=[200, 300], help="Фиксированные DPI для сравнения")
+    args = parser.parse_args()
+
+    settings = Settings()
+    options = OCRProcessor(settings).ocr_options()
+    doc = open_document(args.pdf_path)
+    pages = range(min(args.pages, doc.page_count))
+    references = [normalize(doc.load_page(page_num).get_text()) for page_num in pages]
+
+    adaptive = AdaptiveDPI(settings.ocr_dpi_min, settings.ocr_dpi_max, settings.ocr_target_x_height)
+    chosen = [round(load_page(PageRef(args.pdf_path, page_num, adaptive))[1].dpi) for page_num in pages]
+    print(f"Адаптивный DPI по страницам: от {min(chosen)} до {max(chosen)}, в среднем {sum(chosen) / len(chosen):.0f}")
+
+    modes = [(f"фиксированный {dpi}", dpi) for dpi in args.fixed] + [("адаптивный", adaptive)]
+    for name, dpi in modes:
+        elapsed, accuracy = run_mode(args.pdf_path, pages, dpi, options, references)
+        print(f"{name:18} {len(pages) / elapsed * 60:.1f} стр/мин, точность {accuracy:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Сравнение движков OCR на одних и тех же страницах в одном процессе.
+
+Показывает, сколько стоит перезагрузка traineddata: pytesseract запускает
+tesseract на каждую страницу, пакетный режим — на пачку, tesserocr держит
+модель в памяти процесса.
+
+Запуск: python benchmarks/bench_ocr_engines.py document.pdf [--dpi 200] [--pages 16]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_preprocessing import preprocess  # noqa: E402
+from ocr_backends import (  # noqa: E402
+    ENGINE_BATCH, ENGINE_PYTESSERACT, ENGINE_TESSEROCR, OCROptions, get_backend, tesserocr
+)
+from page_source import open_document, render_page_image  # noqa: E402
+from settings import Settings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf_path')
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--pages', type=int, default=16, help="Сколько первых страниц использовать")
+    args = parser.parse_args()
+
+    settings = Settings()
+    doc = open_document(args.pdf_path)
+    images = [preprocess(render_page_image(doc, page_num, args.dpi), settings.ocr_preprocess, settings.ocr_target_x_height)[0]
+              for page_num in range(min(args.pages, doc.page_count))]
+
+    engines = [ENGINE_PYTESSERACT, ENGINE_BATCH] + ([ENGINE_TESSEROCR] if tesserocr is not None else [])
+    for engine in engines:
+        options = OCROptions(engine, settings.ocr_language, settings.ocr_psm, settings.ocr_oem, None)
+        backend = get_backend(engine)
+        started = time.perf_counter()
+        for i in range(0, len(images), backend.batch_size):
+            backend.recognize(images[i:i + backend.batch_size], options)
+        elapsed = time.perf_counter() - started
+        print(f"{engine:16} {elapsed / len(images) * 1000:.0f} мс/стр")
+
+
+if __name__ == '__main__':
+    main()
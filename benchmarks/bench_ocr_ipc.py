@@ -0,0 +1,78 @@
+"""Замер накладных расходов IPC при передаче страниц в пул OCR.
+
+Сравнивает два способа доставки страницы в рабочий процесс:
+готовое изображение PIL (pickle через pipe) и ссылку PageRef, по которой
+страница рендерится в самом процессе. Распознавание не выполняется —
+рабочая функция только возвращает размер изображения, поэтому разница
+во времени и объёме данных целиком приходится на доставку страниц.
+
+Запуск: python benchmarks/bench_ocr_ipc.py document.pdf [--dpi 200] [--workers 4]
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_source import PageRef, load_page_image, open_document, render_page_image  # noqa: E402
+
+
+def _measure_image(image):
+    return image.size[0] * image.size[1]
+
+
+def _measure_page_ref(page_ref):
+    return _measure_image(load_page_image(page_ref))
+
+
+def bench_images(pdf_path, pages, dpi, workers):
+    doc = open_document(pdf_path)
+    payload_bytes = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for page_num in pages:
+            image = render_page_image(doc, page_num, dpi)
+            payload_bytes += len(pickle.dumps(image))
+            futures.append(executor.submit(_measure_image, image))
+        for future in futures:
+            future.result()
+    return time.perf_counter() - started, payload_bytes
+
+
+def bench_page_refs(pdf_path, pages, dpi, workers):
+    payload_bytes = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for page_num in pages:
+            page_ref = PageRef(pdf_path, page_num, dpi)
+            payload_bytes += len(pickle.dumps(page_ref))
+            futures.append(executor.submit(_measure_page_ref, page_ref))
+        for future in futures:
+            future.result()
+    return time.perf_counter() - started, payload_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf_path')
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--pages', type=int, default=50, help="Сколько первых страниц использовать")
+    args = parser.parse_args()
+
+    page_count = open_document(args.pdf_path).page_count
+    pages = range(min(args.pages, page_count))
+    for name, bench in (("PIL-изображения", bench_images), ("PageRef", bench_page_refs)):
+        elapsed, payload_bytes = bench(args.pdf_path, pages, args.dpi, args.workers)
+        print(f"{name:16} {len(pages)} стр. за {elapsed:.2f} с "
+              f"({len(pages) / elapsed:.1f} стр/с), передано {payload_bytes / 2 ** 20:.1f} МБ "
+              f"({payload_bytes // len(pages)} байт/стр)")
+
+
+if __name__ == '__main__':
+    main()
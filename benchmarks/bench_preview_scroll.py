@@ -0,0 +1,57 @@
+"""Прокрутка предпросмотра: сколько страниц показывается сразу из кэша.
+
+Имитирует листание документа с заданной скоростью без Tk: на каждом шаге
+запрашивается рендер вокруг текущей страницы, и считается, была ли для неё
+уже готова полная страница или хотя бы миниатюра.
+
+Запуск: python benchmarks/bench_preview_scroll.py scan.pdf [--pages 200] [--interval-ms 100]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_renderer import LEVEL_FULL, LEVEL_THUMB, PageRenderer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf_path')
+    parser.add_argument('--pages', type=int, default=200, help="Сколько страниц пролистать")
+    parser.add_argument('--interval-ms', type=int, default=100, help="Время на одной странице")
+    parser.add_argument('--cache-mb', type=int, default=256)
+    args = parser.parse_args()
+
+    renderer = PageRenderer(args.cache_mb * 1024 * 1024)
+    started = time.perf_counter()
+    document = renderer.open_document(args.pdf_path).result()
+    if document is None:
+        sys.exit("Документ зашифрован")
+    print(f"Открытие документа: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    started = time.perf_counter()
+    renderer.request(document, 0, LEVEL_THUMB)
+    while renderer.get(document, 0, LEVEL_THUMB) is None:
+        time.sleep(0.001)
+    print(f"Первая миниатюра: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    full_hits = thumb_hits = 0
+    pages = range(min(args.pages, document.page_count))
+    for page_num in pages:
+        if renderer.get(document, page_num, LEVEL_FULL) is not None:
+            full_hits += 1
+        elif renderer.get(document, page_num, LEVEL_THUMB) is not None:
+            thumb_hits += 1
+        renderer.prefetch(document, page_num)
+        time.sleep(args.interval_ms / 1000)
+    renderer.shutdown()
+
+    stats = renderer.cache.stats()
+    print(f"Готова полная страница: {full_hits} из {len(pages)}, только миниатюра: {thumb_hits}")
+    print(f"Кэш: {stats['entries']} стр., {stats['size_bytes'] / 2 ** 20:.1f} / {stats['max_bytes'] / 2 ** 20:.0f} МБ")
+
+
+if __name__ == '__main__':
+    main()
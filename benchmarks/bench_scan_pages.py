@@ -0,0 +1,43 @@
+"""Сравнение рендера страниц-сканов с извлечением встроенного изображения.
+
+Замеряет только получение изображения страницы, без OCR. Страницы, для
+которых быстрый путь неприменим, учитываются отдельно.
+
+Запуск: python benchmarks/bench_scan_pages.py scan.pdf [--dpi 300] [--pages 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_source import extract_scan_image, open_document, render_page_image  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf_path')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=50, help="Сколько первых страниц использовать")
+    args = parser.parse_args()
+
+    doc = open_document(args.pdf_path)
+    pages = range(min(args.pages, doc.page_count))
+
+    started = time.perf_counter()
+    for page_num in pages:
+        render_page_image(doc, page_num, args.dpi)
+    render_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    extracted = sum(1 for page_num in pages if extract_scan_image(doc, page_num, args.dpi) is not None)
+    extract_time = time.perf_counter() - started
+
+    print(f"Рендер в {args.dpi} DPI: {render_time / len(pages) * 1000:.1f} мс/стр")
+    print(f"Встроенное изображение: {extract_time / len(pages) * 1000:.1f} мс/стр, "
+          f"быстрый путь применим к {extracted} из {len(pages)} стр.")
+
+
+if __name__ == '__main__':
+    main()
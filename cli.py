@@ -0,0 +1,234 @@
+"""Пакетная конвертация без графического интерфейса.
+
+Пример:
+    python -m cli scans/ "reports/**/*.pdf" -o out/ -f txt --ocr auto -j 8
+
+Модуль не импортирует tkinter и может работать на сервере. Уже
+сконвертированные файлы (выход новее входа) пропускаются, поэтому
+прерванный запуск можно просто повторить. В stdout печатается JSON-сводка,
+код возврата равен 1, если хотя бы один файл не удалось обработать.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from exporter import Exporter
+from fingerprint import Fingerprinter
+from page_scheduler import iter_completed
+from page_source import PageRef
+from pdf_processor import PDFProcessor, MODE_AUTO, MODE_OCR, MODE_TEXT
+from result_cache import ResultCache
+from settings import Settings
+from utils import resolve_workers, validate_file
+
+# Значения --ocr и соответствующие режимы PDFProcessor
+OCR_MODES = {'on': MODE_OCR, 'off': MODE_TEXT, 'auto': MODE_AUTO}
+
+
+def parse_page_range(value):
+    """Разбирает диапазон вида '3' или '1-5' в пару (start_page, end_page)."""
+    try:
+        if '-' in value:
+            start_page, end_page = map(int, value.split('-'))
+        else:
+            start_page = end_page = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Некорректный диапазон страниц")
+    if start_page < 1 or end_page < start_page:
+        raise argparse.ArgumentTypeError("Некорректный диапазон страниц")
+    return start_page, end_page
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description="Пакетная конвертация PDF и изображений в текст.")
+    parser.add_argument('inputs', nargs='+', help="Файлы, каталоги или glob-шаблоны")
+    parser.add_argument('-o', '--output-dir', required=True, help="Каталог для результатов")
+    parser.add_argument('-f', '--format', default='txt',
+                        choices=[pattern.lstrip('*.') for _, pattern in Exporter.get_supported_filetypes()],
+                        help="Формат выходных файлов (по умолчанию txt)")
+    parser.add_argument('--ocr', choices=OCR_MODES, default='off',
+                        help="on — всегда OCR, off — только текстовый слой, auto — OCR только для страниц-сканов")
+    parser.add_argument('-j', '--jobs', type=int, default=0, help="Число одновременно обрабатываемых файлов (0 — по числу ядер)")
+    parser.add_argument('--pages', type=parse_page_range, help="Диапазон страниц, например 1-5")
+    parser.add_argument('--password', help="Пароль для зашифрованных PDF")
+    parser.add_argument('--overwrite', action='store_true', help="Перезаписывать уже сконвертированные файлы")
+    parser.add_argument('--no-cache', action='store_true', help="Не использовать кэш результатов")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Подробный лог в stderr")
+    return parser
+
+
+def glob_root(pattern):
+    """Каталог, с которого начинается шаблон: часть пути до первого элемента с *, ? или [."""
+    root = os.path.dirname(pattern)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or os.curdir
+
+
+def collect_inputs(inputs, output_dir, output_format):
+    """Возвращает пары (входной файл, выходной файл) без повторов.
+
+    Для каталогов и glob-шаблонов сохраняется структура подкаталогов
+    относительно каталога или неизменяемой начальной части шаблона.
+    """
+    seen = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = []
+            for dir_path, _, file_names in os.walk(pattern):
+                candidates.extend(os.path.join(dir_path, name) for name in sorted(file_names))
+            root = pattern
+        else:
+            candidates = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+            root = glob_root(pattern)
+        for input_path in candidates:
+            if not validate_file(input_path) or os.path.abspath(input_path) in seen:
+                continue
+            seen.add(os.path.abspath(input_path))
+            relative = os.path.relpath(input_path, root)
+            output_path = os.path.join(output_dir, os.path.splitext(relative)[0] + '.' + output_format)
+            yield input_path, output_path
+
+
+def is_up_to_date(input_path, output_path):
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+
+class BatchConverter:
+    def __init__(self, settings, args):
+        self.settings = settings
+        self.args = args
+        self.cache = None if args.no_cache else ResultCache(settings.cache_file, settings.cache_max_mb * 1024 * 1024)
+        self.fingerprinter = Fingerprinter(settings.fingerprint_mode, self.cache)
+        self.pdf_processor = PDFProcessor(settings, cache=self.cache)
+        self.exporter = Exporter(settings)
+        # Отмена по Ctrl+C: процессоры перестают брать новые страницы
+        self.cancel_event = threading.Event()
+        # Выходной файл -> входной, который его пишет: разные входы из разных
+        # аргументов могут дать одно и то же имя результата
+        self._claimed_outputs = {}
+        self._claim_lock = threading.Lock()
+
+    def claim_output(self, input_path, output_path):
+        """Закрепляет выходной файл за входным; возвращает входной файл, который занял его раньше."""
+        key = os.path.normcase(os.path.abspath(output_path))
+        with self._claim_lock:
+            return self._claimed_outputs.setdefault(key, input_path)
+
+    def iter_pdf_pages(self, input_path):
+        start_page, end_page = self.args.pages or (None, None)
+        doc_key = self.fingerprinter.fingerprint(input_path)
+        return self.pdf_processor.iter_pages(
+            input_path, OCR_MODES[self.args.ocr], start_page, end_page, self.args.password, self.cancel_event, None, doc_key
+        )
+
+    def iter_image_pages(self, input_path):
+        text = self.pdf_processor.ocr_processor.submit_page(PageRef(input_path)).result()
+        if text is None:
+            raise ValueError("Не удалось распознать изображение")
+        yield 0, text
+
+    def convert_file(self, job):
+        input_path, output_path = job
+        started = time.monotonic()
+        result = {'input': input_path, 'output': output_path}
+        base, ext = os.path.splitext(output_path)
+        partial_path = f"{base}.partial{ext}"
+        try:
+            owner = self.claim_output(input_path, output_path)
+            if owner != input_path:
+                # Исключение, а не пропуск: иначе файл молча остался бы несконвертированным
+                partial_path = None
+                raise ValueError(f"Выходной файл {output_path} уже используется для {owner}")
+            if not self.args.overwrite and is_up_to_date(input_path, output_path):
+                result['status'] = 'skipped'
+                return result
+            if input_path.lower().endswith('.pdf'):
+                page_chunks = self.iter_pdf_pages(input_path)
+            else:
+                page_chunks = self.iter_image_pages(input_path)
+            page_count = 0
+
+            def iter_text():
+                nonlocal page_count
+                for _, page_text in page_chunks:
+                    page_count += 1
+                    yield page_text + '\n'
+
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            # Страницы пишутся в файл по мере готовности; запись идёт во временный
+            # файл, чтобы прерванный экспорт не был принят за готовый
+            self.exporter.export(iter_text(), partial_path)
+            if self.cancel_event.is_set():
+                raise RuntimeError("Операция отменена")
+            os.replace(partial_path, output_path)
+            result['status'] = 'converted'
+            result['pages'] = page_count
+        except Exception as e:
+            logging.error(f"Ошибка при обработке {input_path}: {e}", exc_info=self.args.verbose)
+            result['status'] = 'failed'
+            result['error'] = str(e)
+            if partial_path is not None and os.path.exists(partial_path):
+                os.remove(partial_path)
+        finally:
+            result['seconds'] = round(time.monotonic() - started, 3)
+        return result
+
+    def run(self, jobs):
+        workers = resolve_workers(self.args.jobs)
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Ограниченное окно задач: список из тысяч файлов не превращается в тысячи future
+            tasks = ((job, job) for job in jobs)
+            completed = iter_completed(
+                tasks, lambda job: executor.submit(self.convert_file, job), workers * 2, self.cancel_event
+            )
+            try:
+                for _, result in completed:
+                    results.append(result)
+                    logging.info(f"{result['status']}: {result['input']} ({result['seconds']} с)")
+            except KeyboardInterrupt:
+                self.cancel_event.set()
+        return results
+
+    def close(self):
+        self.pdf_processor.shutdown()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s %(levelname)s %(message)s'
+    )
+    started = time.monotonic()
+    converter = BatchConverter(Settings(), args)
+    try:
+        results = converter.run(collect_inputs(args.inputs, args.output_dir, args.format))
+    finally:
+        converter.close()
+
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ('converted', 'skipped', 'failed')}
+    summary = {
+        'total': len(results),
+        **counts,
+        'cancelled': converter.cancel_event.is_set(),
+        'seconds': round(time.monotonic() - started, 3),
+        'files': results,
+    }
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 1 if counts['failed'] or converter.cancel_event.is_set() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Сколько страниц накапливать в памяти перед записью одной транзакцией
+FLUSH_PAGES = 500
+
+
+class CorpusIndex:
+    """Полнотекстовый индекс по всем сконвертированным документам (SQLite FTS5).
+
+    Страницы добавляются через add_page() и пишутся пачками по FLUSH_PAGES
+    в одной транзакции, поэтому массовая конвертация не ждёт диска на
+    каждой странице. Повторное добавление неизменившейся страницы
+    пропускается: для каждой (документ, страница) хранится контрольная
+    сумма текста. Когда файл по тому же пути индексируется под новым
+    отпечатком (файл изменился), строки прежней версии удаляются.
+    """
+
+    def __init__(self, path, flush_pages=FLUSH_PAGES):
+        self.path = path
+        self.flush_pages = flush_pages
+        # Буфер и соединение защищены разными блокировками: пока пачка пишется
+        # на диск, рабочие потоки продолжают добавлять страницы в буфер
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self._pending = {}  # (doc_key, page_num) -> (path, text, mode)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "doc_key TEXT PRIMARY KEY, path TEXT NOT NULL, indexed_at REAL NOT NULL, mode TEXT)"
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(documents)")}
+            if 'mode' not in columns:
+                # Индекс, созданный до появления режима обработки
+                self.conn.execute("ALTER TABLE documents ADD COLUMN mode TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS documents_path ON documents (path)")
+            # Связь страницы документа со строкой FTS и контрольной суммой её текста
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_rows ("
+                "doc_key TEXT NOT NULL, page_num INTEGER NOT NULL, fts_rowid INTEGER NOT NULL, "
+                "checksum INTEGER NOT NULL, PRIMARY KEY (doc_key, page_num))"
+            )
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+                "text, doc_key UNINDEXED, page_num UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    @staticmethod
+    def quote_query(text):
+        """Превращает пользовательский ввод в запрос FTS5: все слова, без операторов."""
+        words = text.split()
+        return ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+
+    def add_page(self, doc_key, path, page_num, text, mode=None):
+        """Ставит страницу (номер с 1) в очередь на индексацию.
+
+        mode — режим, в котором получен текст; по нему документ открывается из результатов поиска.
+        """
+        with self.lock:
+            self._pending[(doc_key, page_num)] = (path, text, mode)
+            should_flush = len(self._pending) >= self.flush_pages
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные страницы одной транзакцией."""
+        # Пачка забирается из буфера уже под блокировкой соединения: иначе две
+        # параллельные записи могли бы закончиться в обратном порядке, и старый
+        # текст страницы затёр бы новый
+        with self.db_lock:
+            with self.lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            now = time.time()
+            with self.conn:
+                documents = {}
+                for (doc_key, _), (path, _, mode) in pending.items():
+                    documents[doc_key] = (path, mode)
+                for doc_key, (path, _) in documents.items():
+                    stale = self.conn.execute(
+                        "SELECT doc_key FROM documents WHERE path = ? AND doc_key != ?", (path, doc_key)
+                    ).fetchall()
+                    for (stale_key,) in stale:
+                        self._delete_document(stale_key)
+                for (doc_key, page_num), (path, text, _) in pending.items():
+                    checksum = zlib.crc32(text.encode('utf-8'))
+                    row = self.conn.execute(
+                        "SELECT fts_rowid, checksum FROM page_rows WHERE doc_key = ? AND page_num = ?",
+                        (doc_key, page_num)
+                    ).fetchone()
+                    if row is not None:
+                        if row[1] == checksum:
+                            continue
+                        self.conn.execute("DELETE FROM pages WHERE rowid = ?", (row[0],))
+                    cursor = self.conn.execute(
+                        "INSERT INTO pages (text, doc_key, page_num) VALUES (?, ?, ?)", (text, doc_key, page_num)
+                    )
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO page_rows (doc_key, page_num, fts_rowid, checksum) VALUES (?, ?, ?, ?)",
+                        (doc_key, page_num, cursor.lastrowid, checksum)
+                    )
+                # Документ мог переехать: запоминаем последний путь
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO documents (doc_key, path, indexed_at, mode) VALUES (?, ?, ?, ?)",
+                    [(doc_key, path, now, mode) for doc_key, (path, mode) in documents.items()]
+                )
+
+    def search(self, query, limit=100, offset=0, raw=False):
+        """Ищет страницы по запросу; лучшие совпадения первыми.
+
+        По умолчанию query — просто слова (все должны встретиться на странице);
+        raw=True передаёт строку в FTS5 как есть (фразы, OR, NEAR, префиксы*).
+        Возвращает словари с doc_key, path, page (с 1), mode и snippet.
+        """
+        self.flush()
+        match = query if raw else self.quote_query(query)
+        if not match:
+            return []
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT pages.doc_key, documents.path, pages.page_num, documents.mode, "
+                "snippet(pages, 0, '[', ']', '…', 12) "
+                "FROM pages JOIN documents ON documents.doc_key = pages.doc_key "
+                "WHERE pages MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (match, limit, offset)
+            ).fetchall()
+        return [{'doc_key': doc_key, 'path': path, 'page': page_num, 'mode': mode, 'snippet': snippet}
+                for doc_key, path, page_num, mode, snippet in rows]
+
+    def remove_document(self, doc_key):
+        with self.lock:
+            self._pending = {key: value for key, value in self._pending.items() if key[0] != doc_key}
+        with self.db_lock:
+            with self.conn:
+                self._delete_document(doc_key)
+
+    def _delete_document(self, doc_key):
+        # Вызывается внутри транзакции под db_lock
+        rowids = self.conn.execute("SELECT fts_rowid FROM page_rows WHERE doc_key = ?", (doc_key,)).fetchall()
+        self.conn.executemany("DELETE FROM pages WHERE rowid = ?", rowids)
+        self.conn.execute("DELETE FROM page_rows WHERE doc_key = ?", (doc_key,))
+        self.conn.execute("DELETE FROM documents WHERE doc_key = ?", (doc_key,))
+
+    def stats(self):
+        self.flush()
+        with self.db_lock:
+            documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            pages = self.conn.execute("SELECT COUNT(*) FROM page_rows").fetchone()[0]
+        return {'documents': documents, 'pages': pages}
+
+    def close(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            logging.error(f"Ошибка при записи полнотекстового индекса {self.path}: {e}")
+        with self.db_lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Ошибка при закрытии полнотекстового индекса {self.path}: {e}")
@@ -1,15 +1,85 @@
 import csv
-import fitz
-import openpyxl
-from docx import Document
-from docx.shared import Pt
+import html
+
+# Format backends (PyMuPDF, python-docx, openpyxl) are imported inside the
+# export method that needs them, so only the chosen format pays its import cost
+
+# Write buffer for the streaming exporters
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# PDF page geometry in points (A4)
+PDF_PAGE_WIDTH = 595
+PDF_PAGE_HEIGHT = 842
+PDF_MARGIN = 72
+PDF_LINE_SPACING = 1.2
+
+# PDF save options for each export_compression setting
+PDF_SAVE_OPTIONS = {
+    'none': {'garbage': 0, 'deflate': False},
+    'low': {'garbage': 1, 'deflate': True},
+    'medium': {'garbage': 3, 'deflate': True},
+    'high': {'garbage': 4, 'deflate': True, 'deflate_fonts': True, 'clean': True},
+}
+
+
+class FontMetrics:
+    """Glyph widths of one font at one size, measured once and cached."""
+
+    def __init__(self, font, font_size):
+        self.font = font
+        self.font_size = font_size
+        self.widths = {}
+
+    def char_width(self, char):
+        width = self.widths.get(char)
+        if width is None:
+            width = self.font.text_length(char, fontsize=self.font_size)
+            self.widths[char] = width
+        return width
+
+    def text_width(self, text):
+        return sum(self.char_width(char) for char in text)
+
+    def wrap(self, lines, max_width):
+        """Word-wrap lines so that each fits into max_width points."""
+        space_width = self.char_width(' ')
+        for line in lines:
+            current = []
+            current_width = 0.0
+            for word in line.split(' '):
+                word_width = self.text_width(word)
+                # Words wider than a line are broken between characters
+                while word_width > max_width and len(word) > 1:
+                    if current:
+                        yield ' '.join(current)
+                        current, current_width = [], 0.0
+                    part_width = 0.0
+                    for idx, char in enumerate(word):
+                        if part_width + self.char_width(char) > max_width and idx:
+                            break
+                        part_width += self.char_width(char)
+                    yield word[:idx]
+                    word = word[idx:]
+                    word_width = self.text_width(word)
+                extra = space_width if current else 0.0
+                if current and current_width + extra + word_width > max_width:
+                    yield ' '.join(current)
+                    current, current_width, extra = [], 0.0, 0.0
+                current.append(word)
+                current_width += extra + word_width
+            yield ' '.join(current)
+
 
 class Exporter:
     def __init__(self, settings):
         self.settings = settings
 
     def export(self, text, file_path):
-        """Export text to the specified file format based on the file extension."""
+        """Export text to the specified file format based on the file extension.
+
+        text may be a string or an iterable of chunks (e.g. pages); chunks are
+        written as they are produced.
+        """
         if file_path.endswith('.txt'):
             self.export_to_txt(text, file_path)
         elif file_path.endswith('.docx'):
@@ -44,23 +114,47 @@ class Exporter:
         ]
 
     @staticmethod
-    def export_to_txt(text, file_path):
+    def iter_chunks(text):
+        """Accept either a whole string or an iterable of text chunks."""
+        if isinstance(text, str):
+            yield text
+        else:
+            yield from text
+
+    @classmethod
+    def iter_lines(cls, text):
+        """Yield lines from text chunks without materializing the whole document."""
+        tail = ''
+        for chunk in cls.iter_chunks(text):
+            lines = (tail + chunk).split('\n')
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+
+    @classmethod
+    def export_to_txt(cls, text, file_path):
         """Export text to a plain text file."""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(text)
+        with open(file_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in cls.iter_chunks(text):
+                f.write(chunk)
 
     def export_to_docx(self, text, file_path):
         """Export text to a DOCX file with formatting from settings."""
+        from docx import Document
+        from docx.shared import Pt
+
         doc = Document()
         p = doc.add_paragraph()
-        run = p.add_run(text)
-        run.font.name = self.settings.font_family
-        run.font.size = Pt(self.settings.font_size)
+        for chunk in self.iter_chunks(text):
+            run = p.add_run(chunk)
+            run.font.name = self.settings.font_family
+            run.font.size = Pt(self.settings.font_size)
         doc.save(file_path)
 
     def export_to_html(self, text, file_path):
         """Export text to an HTML file with CSS styling."""
-        html_content = f"""
+        header = f"""
         <html>
         <head>
         <style>
@@ -68,55 +162,83 @@ class Exporter:
         </style>
         </head>
         <body>
-        <p>{text.replace('\n', '<br>')}</p>
+        <p>"""
+        footer = """</p>
         </body>
         </html>
         """
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        with open(file_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(header)
+            for chunk in self.iter_chunks(text):
+                f.write(html.escape(chunk, quote=False).replace('\n', '<br>'))
+            f.write(footer)
 
     def export_to_pdf(self, text, file_path):
-        """Export text to a PDF file with formatting from settings."""
+        """Export text to a PDF file, flowing it across as many A4 pages as needed."""
+        import fitz
+
+        font = fitz.Font('helv')  # Helvetica as default
+        font_size = self.settings.font_size
+        metrics = FontMetrics(font, font_size)
+        line_height = font_size * PDF_LINE_SPACING
+        text_width = PDF_PAGE_WIDTH - 2 * PDF_MARGIN
+        lines_per_page = max(1, int((PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // line_height))
+
         pdf = fitz.open()
-        page = pdf.new_page(width=595, height=842)  # A4 size in points
-        rect = fitz.Rect(72, 72, 595 - 72, 842 - 72)  # Margins
-        text_settings = {
-            'fontsize': self.settings.font_size,
-            'fontname': 'helv',  # Helvetica as default
-        }
-        page.insert_textbox(rect, text, **text_settings)
-        pdf.save(file_path)
+        page = writer = None
+        line_no = lines_per_page
+        for line in metrics.wrap(self.iter_lines(text), text_width):
+            if line_no >= lines_per_page:
+                if writer is not None:
+                    writer.write_text(page)
+                page = pdf.new_page(width=PDF_PAGE_WIDTH, height=PDF_PAGE_HEIGHT)
+                writer = fitz.TextWriter(page.rect)
+                line_no = 0
+            if line:
+                baseline = PDF_MARGIN + font_size + line_no * line_height
+                writer.append((PDF_MARGIN, baseline), line, font=font, fontsize=font_size)
+            line_no += 1
+        if writer is not None:
+            writer.write_text(page)
+        if pdf.page_count == 0:
+            pdf.new_page(width=PDF_PAGE_WIDTH, height=PDF_PAGE_HEIGHT)
+        pdf.save(file_path, **PDF_SAVE_OPTIONS.get(self.settings.export_compression, PDF_SAVE_OPTIONS['medium']))
         pdf.close()
 
-    @staticmethod
-    def export_to_markdown(text, file_path):
+    @classmethod
+    def export_to_markdown(cls, text, file_path):
         """Export text to a Markdown file."""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(text)
+        cls.export_to_txt(text, file_path)
 
     def export_to_rtf(self, text, file_path):
         """Export text to an RTF file with font formatting."""
         font_family = self.settings.font_family
         font_size = self.settings.font_size * 2  # RTF uses half-points
-        rtf_content = r"{\rtf1\ansi\deff0{\fonttbl{\f0 " + font_family + r";}}\f0\fs" + str(font_size) + r" " + text + r"}"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(rtf_content)
+        with open(file_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(r"{\rtf1\ansi\deff0{\fonttbl{\f0 " + font_family + r";}}\f0\fs" + str(font_size) + r" ")
+            for chunk in self.iter_chunks(text):
+                f.write(chunk)
+            f.write(r"}")
 
-    @staticmethod
-    def export_to_csv(text, file_path):
+    @classmethod
+    def export_to_csv(cls, text, file_path):
         """Export text to a CSV file, treating each line as a row."""
-        lines = text.strip().split('\n')
-        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        with open(file_path, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER_SIZE) as f:
             writer = csv.writer(f)
-            for line in lines:
+            for line in cls.iter_lines(text):
                 writer.writerow([line])
 
-    @staticmethod
-    def export_to_excel(text, file_path):
-        """Export text to an Excel file, treating each line as a row."""
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        lines = text.strip().split('\n')
-        for idx, line in enumerate(lines, 1):
-            ws.cell(row=idx, column=1, value=line)
-        wb.save(file_path)
\ No newline at end of file
+    @classmethod
+    def export_to_excel(cls, text, file_path):
+        """Export text to an Excel file, treating each line as a row.
+
+        Uses openpyxl write-only mode so rows are streamed to disk
+        instead of being kept as cell objects in memory.
+        """
+        import openpyxl
+
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        for line in cls.iter_lines(text):
+            ws.append([line])
+        wb.save(file_path)
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import os
+import threading
+
+from utils import hash_file, lazy_import
+
+fitz = lazy_import('fitz')
+
+# Размер одного читаемого блока и число блоков из середины файла
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_COUNT = 8
+
+FINGERPRINT_MODES = ('quick', 'full', 'pdf_id')
+
+
+class Fingerprinter:
+    """Быстрые отпечатки документов для ключей кэша.
+
+    Режимы:
+      quick  — размер, mtime, inode и хэш начала, конца и нескольких блоков файла;
+      full   — полный SHA-256, запоминаемый в кэше по быстрому ключу;
+      pdf_id — идентификатор /ID из трейлера PDF (с откатом на quick).
+    Счётчики в stats() показывают, как часто выполнялся дорогой путь.
+    """
+
+    def __init__(self, mode='quick', cache=None):
+        self.mode = mode if mode in FINGERPRINT_MODES else 'quick'
+        self.cache = cache
+        self.lock = threading.Lock()
+        self._quick_memo = {}
+        self.counters = {
+            'quick_computed': 0,
+            'quick_memo_hits': 0,
+            'full_computed': 0,
+            'full_memo_hits': 0,
+            'pdf_id_used': 0,
+        }
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def fingerprint(self, path):
+        """Возвращает отпечаток файла согласно выбранному режиму."""
+        if self.mode == 'full':
+            return self.full_hash(path)
+        if self.mode == 'pdf_id':
+            pdf_id = self.pdf_id(path)
+            if pdf_id is not None:
+                return pdf_id
+        return self.quick_key(path)
+
+    def quick_key(self, path):
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with self.lock:
+            cached = self._quick_memo.get(memo_key)
+        if cached is not None:
+            self._count('quick_memo_hits')
+            return cached
+
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}".encode())
+        with open(path, 'rb') as f:
+            for offset in self._sample_offsets(stat.st_size):
+                f.seek(offset)
+                hasher.update(f.read(SAMPLE_SIZE))
+        key = 'q:' + hasher.hexdigest()
+        with self.lock:
+            self._quick_memo[memo_key] = key
+        self._count('quick_computed')
+        return key
+
+    @staticmethod
+    def _sample_offsets(size):
+        """Смещения блоков: начало, равномерные выборки из середины и конец."""
+        if size <= SAMPLE_SIZE * (SAMPLE_COUNT + 2):
+            return range(0, size, SAMPLE_SIZE)
+        step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT + 1)
+        return [0] + [step * idx for idx in range(1, SAMPLE_COUNT + 1)] + [size - SAMPLE_SIZE]
+
+    def full_hash(self, path):
+        """Полный SHA-256 файла; вычисляется один раз для каждого быстрого ключа."""
+        memo_key = None
+        if self.cache is not None:
+            memo_key = self.cache.make_key('full_hash', self.quick_key(path))
+            memoized = self.cache.get(memo_key)
+            if memoized is not None:
+                self._count('full_memo_hits')
+                return memoized
+        digest = hash_file(path)
+        self._count('full_computed')
+        if memo_key is not None:
+            self.cache.put(memo_key, digest)
+        return digest
+
+    def pdf_id(self, path):
+        """Отпечаток по /ID из трейлера PDF или None, если его нет."""
+        if not path.lower().endswith('.pdf'):
+            return None
+        try:
+            doc = fitz.open(path)
+            try:
+                value_type, value = doc.xref_get_key(-1, "ID")
+            finally:
+                doc.close()
+        except Exception as e:
+            logging.warning(f"Не удалось прочитать /ID из {path}: {e}")
+            return None
+        if value_type != 'array' or not value.strip('[] '):
+            return None
+        self._count('pdf_id_used')
+        # Размер защищает от совпадения /ID у изменённых без его обновления файлов
+        return f"id:{value}:{os.path.getsize(path)}"
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
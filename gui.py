@@ -1,26 +1,37 @@
 import gettext
-import io
 import logging
 import os
 import queue
+import re
+import sqlite3
 import threading
+import time
 import tkinter as tk
 from tkinter import font as tkfont
 from tkinter import ttk, messagebox, filedialog, simpledialog
 
-import fitz
 from PIL import Image, ImageTk
 from tkinterdnd2 import DND_FILES
 from ttkbootstrap import Style
 
+from corpus_index import CorpusIndex
 from exporter import Exporter
+from fingerprint import Fingerprinter
+from ocr_backends import OCR_ENGINES
 from ocr_processor import OCRProcessor
-from pdf_processor import PDFProcessor
+from page_renderer import PageRenderer
+from page_source import PageRef
+from preview_pane import PreviewPane
+from pdf_processor import PDFProcessor, MODE_TEXT, MODE_OCR, MODE_AUTO
 from plugin_manager import PluginManager
+from result_cache import ResultCache
+from search_engine import PENDING, SearchEngine
 from settings import Settings
-from task_queue import TaskQueue
+from text_store import PageSequencer, TextStore
+from text_view import VirtualTextView
+from task_queue import TaskQueue, PRIORITY_INTERACTIVE, PRIORITY_BULK, PRIORITY_BACKGROUND
 from updater import Updater
-from utils import resource_path, create_tooltip, hash_file
+from utils import resource_path, create_tooltip, validate_file
 
 # Настройка логирования
 logging.basicConfig(filename='app.log', level=logging.DEBUG,
@@ -30,6 +41,9 @@ logging.basicConfig(filename='app.log', level=logging.DEBUG,
 locale_dir = './locales'
 current_lang = 'ru'
 
+# Сколько секунд check_queue может занимать главный поток за один такт
+QUEUE_TICK_BUDGET = 0.05
+
 class AppGUI:
     def __init__(self, root):
         self.root = root
@@ -38,12 +52,16 @@ class AppGUI:
             self.settings = Settings()
             self.style = Style(theme=self.settings.theme)
             self.style.master = self.root
-            self.pdf_processor = PDFProcessor(self.settings)
             self.ocr_processor = OCRProcessor(self.settings)
+            self.result_cache = ResultCache(self.settings.cache_file, self.settings.cache_max_mb * 1024 * 1024)
+            self.fingerprinter = Fingerprinter(self.settings.fingerprint_mode, self.result_cache)
+            self.pdf_processor = PDFProcessor(self.settings, self.ocr_processor, self.result_cache)
             self.exporter = Exporter(self.settings)
-            self.task_queue = TaskQueue(self.update_progress)
+            self.task_queue = TaskQueue(self.on_batch_progress)
             self.plugin_manager = PluginManager(self)
             self.updater = Updater()
+            self.corpus_index = self.open_corpus_index()
+            self.page_renderer = PageRenderer(self.settings.preview_cache_mb * 1024 * 1024)
         except Exception as e:
             logging.error(f"Ошибка инициализации зависимостей: {e}")
             messagebox.showerror("Ошибка", "Не удалось инициализировать приложение. Проверьте лог-файл.")
@@ -52,8 +70,15 @@ class AppGUI:
 
         self.opened_files = []
         self.cancel_event = threading.Event()
-        self.processing_cache = {}
+        self.active_batches = []
         self.text_queue = queue.Queue()
+        # (путь, страница), к которой перейти, когда документ из поиска по корпусу загрузится
+        self.pending_goto = None
+        # Весь извлечённый текст живёт здесь; виджет показывает только окно из него
+        self.text_store = TextStore()
+        # Страницы параллельно обрабатываемых файлов попадают в хранилище по документам
+        self.page_sequencer = PageSequencer(self.text_store)
+        self.search_engine = SearchEngine(self.text_store)
         self.status_text = tk.StringVar()
         self.status_text.set("Готово")
         self.current_lang = self.settings.language
@@ -62,7 +87,7 @@ class AppGUI:
         # Инициализация атрибутов GUI
         self.menubar = None
         self.text_frame = None
-        self.text_display = None
+        self.text_view = None
         self.status_frame = None
         self.status_label = None
         self.progress_bar = None
@@ -72,7 +97,18 @@ class AppGUI:
         self.setup_gui()
         self.bind_hotkeys()
         self.load_session()
-        self.check_for_updates()
+        # Проверка обновлений не должна задерживать первое появление окна
+        self.root.after_idle(self.check_for_updates)
+
+    def open_corpus_index(self):
+        if not self.settings.corpus_index_enabled:
+            return None
+        try:
+            return CorpusIndex(self.settings.corpus_index_file)
+        except sqlite3.Error as e:
+            # Например, SQLite собран без FTS5 — приложение работает и без индекса
+            logging.warning(f"Полнотекстовый индекс недоступен: {e}")
+            return None
 
     @staticmethod
     def get_translation(lang_code):
@@ -103,9 +139,11 @@ class AppGUI:
 
         # Меню "Файл"
         file_menu = tk.Menu(self.menubar, tearoff=0)
-        file_menu.add_command(label=self._("Открыть PDF"), command=lambda: self.open_file(use_ocr=False), accelerator="Ctrl+O")
-        file_menu.add_command(label=self._("Открыть PDF (OCR)"), command=lambda: self.open_file(use_ocr=True))
+        file_menu.add_command(label=self._("Открыть PDF"), command=lambda: self.open_file(MODE_TEXT), accelerator="Ctrl+O")
+        file_menu.add_command(label=self._("Открыть PDF (OCR)"), command=lambda: self.open_file(MODE_OCR))
+        file_menu.add_command(label=self._("Открыть PDF (авто: OCR только для сканов)"), command=lambda: self.open_file(MODE_AUTO))
         file_menu.add_command(label=self._("Открыть изображение"), command=self.open_image)
+        file_menu.add_command(label=self._("Создать PDF с текстовым слоем (OCR)"), command=self.create_searchable_pdf)
         file_menu.add_command(label=self._("Предпросмотр PDF"), command=self.preview_pdf)
         file_menu.add_command(label=self._("Сохранить"), command=self.save_file, accelerator="Ctrl+S")
         file_menu.add_separator()
@@ -127,12 +165,15 @@ class AppGUI:
         # Меню "Правка"
         edit_menu = tk.Menu(self.menubar, tearoff=0)
         edit_menu.add_command(label=self._("Поиск и замена"), command=self.search_text, accelerator="Ctrl+F")
+        edit_menu.add_command(label=self._("Перейти к странице"), command=self.goto_page, accelerator="Ctrl+G")
+        edit_menu.add_command(label=self._("Поиск по всем документам"), command=self.search_corpus)
         self.menubar.add_cascade(label=self._("Правка"), menu=edit_menu)
 
         # Меню "Помощь"
         help_menu = tk.Menu(self.menubar, tearoff=0)
         help_menu.add_command(label=self._("О программе"), command=self.show_about)
         help_menu.add_command(label=self._("Просмотр логов"), command=self.view_logs)
+        help_menu.add_command(label=self._("Статистика кэша"), command=self.show_cache_stats)
         help_menu.add_command(label=self._("Проверить обновления"), command=self.check_for_updates)
         self.menubar.add_cascade(label=self._("Помощь"), menu=help_menu)
 
@@ -149,7 +190,7 @@ class AppGUI:
         exit_icon = ImageTk.PhotoImage(Image.open(resource_path('icons/exit.png')).resize((24, 24)))
 
         # Кнопки на панели инструментов
-        open_button = ttk.Button(toolbar, image=open_icon, command=lambda: self.open_file(use_ocr=False))
+        open_button = ttk.Button(toolbar, image=open_icon, command=lambda: self.open_file(MODE_TEXT))
         open_button.image = open_icon
         open_button.pack(side=tk.LEFT, padx=2, pady=2)
         create_tooltip(open_button, self._("Открыть PDF"))
@@ -174,20 +215,14 @@ class AppGUI:
         self.text_frame = ttk.Frame(self.root)
         self.text_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
 
-        # Создание текстового поля
-        self.text_display = tk.Text(
+        # Текстовое поле с полосой прокрутки: в виджет загружается только
+        # видимая часть текста из self.text_store
+        self.text_view = VirtualTextView(
             self.text_frame,
-            wrap=tk.WORD,
+            self.text_store,
             font=(self.settings.font_family, self.settings.font_size)
         )
-        self.text_display.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # Добавление полосы прокрутки
-        scrollbar = ttk.Scrollbar(
-            self.text_frame, orient=tk.VERTICAL, command=self.text_display.yview
-        )
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.text_display.configure(yscrollcommand=scrollbar.set)
+        self.text_view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # Создание фрейма для индикатора прогресса и статуса
         self.status_frame = ttk.Frame(self.root)
@@ -216,6 +251,7 @@ class AppGUI:
         self.root.bind(self.settings.hotkeys['save_file'], self.on_save_file)
         self.root.bind(self.settings.hotkeys['search_text'], self.on_search_text)
         self.root.bind(self.settings.hotkeys['quit'], self.on_quit)
+        self.root.bind(self.settings.hotkeys['goto_page'], self.on_goto_page)
 
     # Обработчики горячих клавиш
     def on_open_file(self, _event=None):
@@ -227,13 +263,24 @@ class AppGUI:
     def on_search_text(self, _event=None):
         self.search_text()
 
+    def on_goto_page(self, _event=None):
+        self.goto_page()
+
     def on_quit(self, _event=None):
         if messagebox.askokcancel(self._("Выход"), self._("Вы действительно хотите выйти?")):
             self.save_session()
+            self.task_queue.shutdown()
+            self.pdf_processor.shutdown()
+            self.page_renderer.shutdown()
+            logging.info(f"Статистика кэша результатов: {self.result_cache.stats()}")
+            logging.info(f"Статистика отпечатков документов: {self.fingerprinter.stats()}")
+            self.result_cache.close()
+            if self.corpus_index is not None:
+                self.corpus_index.close()
             self.root.quit()
 
     # Функции обработки событий
-    def open_file(self, use_ocr=False):
+    def open_file(self, mode=MODE_TEXT):
         try:
             pdf_files = filedialog.askopenfilenames(
                 title=self._("Выберите PDF-файл(ы)"),
@@ -264,55 +311,88 @@ class AppGUI:
                     messagebox.showerror(self._("Ошибка"), self._("Некорректный диапазон страниц."))
                     return
 
-            self.text_display.delete(1.0, tk.END)
+            self.clear_text()
             self.status_text.set(self._("Загрузка PDF..."))
             self.progress_bar['value'] = 0
+            jobs = []
             for pdf_file in pdf_files:
                 if not os.path.exists(pdf_file):
                     logging.warning(f"Файл не найден: {pdf_file}")
                     messagebox.showwarning(self._("Предупреждение"), self._(f"Файл {pdf_file} не найден."))
                     continue
-                self.task_queue.add_task(
-                    self.pdf_to_text_worker,
-                    pdf_file,
-                    use_ocr,
-                    start_page,
-                    end_page
-                )
+                jobs.append((pdf_file, mode, start_page, end_page))
+            self.enqueue_batch(self.pdf_to_text_worker, jobs)
             self.show_progress_dialog()
             self.root.after(100, self.check_queue)
         except Exception as e:
             logging.error(f"Ошибка при открытии файла: {e}", exc_info=True)
             messagebox.showerror(self._("Ошибка"), self._("Не удалось открыть файл. Подробности в файле журнала."))
 
-    def pdf_to_text_worker(self, pdf_path, use_ocr=False, start_page=None, end_page=None, password=None):
+    def pdf_to_text_worker(self, pdf_path, mode=MODE_TEXT, start_page=None, end_page=None, password=None):
         try:
             if self.cancel_event.is_set():
                 self.text_queue.put(("CANCELLED", self._("Операция отменена")))
                 return
 
-            cache_key = (hash_file(pdf_path), use_ocr, start_page, end_page, password)
-            if cache_key in self.processing_cache:
-                self.text_queue.put(("RESULT", self.processing_cache[cache_key]))
-                return
-
-            if use_ocr:
-                text = self.pdf_processor.convert_pdf_to_text_with_ocr(
-                    pdf_path, start_page, end_page, password, self.cancel_event, self.text_queue
-                )
-            else:
-                text = self.pdf_processor.extract_text(
-                    pdf_path, start_page, end_page, password, self.cancel_event, self.text_queue
-                )
+            # Кэш постраничный: процессор досчитает только отсутствующие страницы
+            doc_key = self.fingerprinter.fingerprint(pdf_path)
+            page_chunks = self.pdf_processor.iter_pages(
+                pdf_path, mode, start_page, end_page, password, self.cancel_event, self.text_queue, doc_key
+            )
 
-            if text is None:
-                raise ValueError("Не удалось извлечь текст из PDF")
+            # Страницы уходят в интерфейс по мере готовности
+            for page_num, page_text in page_chunks:
+                self.text_queue.put(("PAGE", page_num + 1, page_text, pdf_path))
+                if self.corpus_index is not None:
+                    self.corpus_index.add_page(doc_key, pdf_path, page_num + 1, page_text, mode)
 
-            self.processing_cache[cache_key] = text
-            self.text_queue.put(("RESULT", text))
+            if self.cancel_event.is_set():
+                self.text_queue.put(("CANCELLED", self._("Операция отменена")))
+                return
+            self.text_queue.put(("DONE", pdf_path))
         except Exception as e:
             logging.error(f"Ошибка при обработке {pdf_path}: {e}", exc_info=True)
-            self.text_queue.put(("ERROR", f"{self._('Не удалось извлечь текст из PDF')}: {str(e)}"))
+            self.text_queue.put(("ERROR", f"{self._('Не удалось извлечь текст из PDF')}: {str(e)}", pdf_path))
+
+    def create_searchable_pdf(self):
+        try:
+            pdf_file = filedialog.askopenfilename(
+                title=self._("Выберите PDF-файл для распознавания"),
+                filetypes=[("PDF files", "*.pdf")]
+            )
+            if not pdf_file:
+                return
+            output_path = filedialog.asksaveasfilename(
+                defaultextension=".pdf",
+                initialfile=os.path.splitext(os.path.basename(pdf_file))[0] + "_ocr.pdf",
+                filetypes=[("PDF files", "*.pdf")],
+                title=self._("Сохранить PDF с текстовым слоем как")
+            )
+            if not output_path:
+                return
+            self.cancel_event.clear()
+            self.status_text.set(self._("Распознавание PDF..."))
+            self.progress_bar['value'] = 0
+            self.enqueue_batch(self.searchable_pdf_worker, [(pdf_file, output_path)])
+            self.show_progress_dialog()
+            self.root.after(100, self.check_queue)
+        except Exception as e:
+            logging.error(f"Ошибка при создании PDF с текстовым слоем: {e}", exc_info=True)
+            messagebox.showerror(self._("Ошибка"), self._("Не удалось создать PDF. Подробности в файле журнала."))
+
+    def searchable_pdf_worker(self, pdf_path, output_path, password=None):
+        try:
+            doc_key = self.fingerprinter.fingerprint(pdf_path)
+            completed = self.pdf_processor.make_searchable_pdf(
+                pdf_path, output_path, None, None, password, self.cancel_event, self.text_queue, doc_key
+            )
+            if not completed:
+                self.text_queue.put(("CANCELLED", self._("Операция отменена")))
+                return
+            self.text_queue.put(("DONE", output_path))
+        except Exception as e:
+            logging.error(f"Ошибка при создании PDF с текстовым слоем из {pdf_path}: {e}", exc_info=True)
+            self.text_queue.put(("ERROR", f"{self._('Не удалось создать PDF с текстовым слоем')}: {e}"))
 
     def open_image(self):
         try:
@@ -322,11 +402,10 @@ class AppGUI:
             )
             if image_files:
                 self.cancel_event.clear()
-                self.text_display.delete(1.0, tk.END)
+                self.clear_text()
                 self.status_text.set(self._("Загрузка изображений..."))
                 self.progress_bar['value'] = 0
-                for image_file in image_files:
-                    self.task_queue.add_task(self.image_to_text_worker, image_file)
+                self.enqueue_batch(self.image_to_text_worker, [(image_file,) for image_file in image_files])
                 self.show_progress_dialog()
                 self.root.after(100, self.check_queue)
         except Exception as e:
@@ -338,45 +417,84 @@ class AppGUI:
             if self.cancel_event.is_set():
                 self.text_queue.put(("CANCELLED", self._("Операция отменена")))
                 return
-            image = Image.open(image_file)
-            text = self.ocr_processor.ocr_image(image)
-            self.text_queue.put(("RESULT", text))
+            text = self.ocr_processor.submit_page(PageRef(image_file)).result()
+            if text is None:
+                raise ValueError("Не удалось распознать изображение")
+            self.text_queue.put(("RESULT", text, image_file))
         except Exception as e:
             logging.error(f"Ошибка при обработке изображения {image_file}: {e}")
-            self.text_queue.put(("ERROR", f"{self._('Не удалось извлечь текст из изображения')}: {e}"))
+            self.text_queue.put(("ERROR", f"{self._('Не удалось извлечь текст из изображения')}: {e}", image_file))
 
     def check_queue(self):
+        # Очередь разбирается порциями, чтобы не блокировать главный цикл Tk
+        started = time.monotonic()
         try:
-            while True:
-                message_type, message_content = self.text_queue.get_nowait()
+            while time.monotonic() - started < QUEUE_TICK_BUDGET:
+                message = self.text_queue.get_nowait()
+                message_type = message[0]
                 if message_type == "PROGRESS":
-                    self.update_progress(message_content)
-                elif message_type == "RESULT":
-                    self.text_display.insert(tk.END, message_content + "\n")
+                    self.update_progress(*message[1:])
+                elif message_type == "BATCH":
+                    # Основной индикатор показывает долю обработанных файлов пакета
+                    self.progress_bar['value'] = message[1]
+                elif message_type == "PAGE":
+                    _, page_num, page_text, source = message
+                    self.on_pages_appended(self.page_sequencer.add_page(source, page_num, page_text))
+                elif message_type in ("RESULT", "DONE"):
+                    if message_type == "RESULT":
+                        self.on_pages_appended(self.page_sequencer.add_page(message[2], None, message[1]))
+                        self.finish_source(message[2])
+                    else:
+                        self.finish_source(message[1])
                     self.progress_bar['value'] = 100
                     self.status_text.set(self._("Готово"))
                     self.close_progress_dialog()
                 elif message_type == "ERROR":
-                    messagebox.showerror(self._("Ошибка"), message_content)
+                    if len(message) > 2:
+                        self.finish_source(message[2])
+                    messagebox.showerror(self._("Ошибка"), message[1])
                     self.progress_bar['value'] = 0
                     self.status_text.set(self._("Ошибка"))
                     self.close_progress_dialog()
                 elif message_type == "CANCELLED":
-                    messagebox.showinfo(self._("Отмена"), message_content)
+                    self.on_pages_appended(self.page_sequencer.finish_all())
+                    self.pending_goto = None
+                    messagebox.showinfo(self._("Отмена"), message[1])
                     self.progress_bar['value'] = 0
                     self.status_text.set(self._("Отменено"))
                     self.close_progress_dialog()
+            # Бюджет исчерпан, но сообщения ещё есть — продолжаем на следующем такте
+            self.text_view.on_store_append()
+            self.root.after(1, self.check_queue)
         except queue.Empty:
+            self.text_view.on_store_append()
             self.root.after(100, self.check_queue)
         except Exception as e:
             logging.error(f"Ошибка в check_queue: {e}", exc_info=True)
             self.status_text.set(self._("Ошибка обработки очереди"))
             self.close_progress_dialog()
 
+    def finish_source(self, source):
+        self.on_pages_appended(self.page_sequencer.finish(source))
+        # Документ целиком в хранилище, а искомой страницы в нём нет (файл изменился) — больше не ждём
+        if (self.pending_goto is not None and self.pending_goto[0] == source
+                and not self.page_sequencer.is_pending(source)):
+            self.pending_goto = None
+
+    def on_pages_appended(self, appended):
+        """Переходит к странице из поиска по корпусу, как только она попала в хранилище."""
+        if self.pending_goto is None or self.pending_goto not in appended:
+            return
+        source, page_num = self.pending_goto
+        self.pending_goto = None
+        self.text_view.on_store_append()
+        index = self.text_store.find_page(page_num, source=source)
+        if index is not None:
+            self.text_view.goto_page(index)
+
     def save_file(self):
         try:
-            text = self.text_display.get(1.0, tk.END).strip()
-            if not text:
+            if self.text_store.is_blank():
                 messagebox.showwarning(self._("Внимание"), self._("Нет текста для сохранения."))
                 return
             file_path = filedialog.asksaveasfilename(
@@ -386,7 +504,8 @@ class AppGUI:
             )
             if file_path:
                 os.makedirs(os.path.dirname(file_path), exist_ok=True)  # Создание директории, если её нет
-                self.exporter.export(text, file_path)
+                # Экспорт читает хранилище постранично, а не содержимое виджета
+                self.exporter.export(self.text_store.iter_chunks(), file_path)
                 messagebox.showinfo(self._("Успех"), self._("Файл успешно сохранен."))
                 self.status_text.set(self._("Файл успешно сохранен."))
         except Exception as e:
@@ -416,7 +535,7 @@ class AppGUI:
             self.settings.font_family = font_family_var.get()
             self.settings.font_size = int(font_size_var.get())
             new_font = (self.settings.font_family, self.settings.font_size)
-            self.text_display.configure(font=new_font)
+            self.text_view.set_font(new_font)
             self.settings.save_settings()
             font_window.destroy()
 
@@ -437,35 +556,224 @@ class AppGUI:
         replace_entry = tk.Entry(search_window, textvariable=replace_var)
         replace_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        def find():
-            self.text_display.tag_remove('highlight', '1.0', tk.END)
-            search_term = search_var.get()
-            if search_term:
-                idx = '1.0'
-                while True:
-                    idx = self.text_display.search(search_term, idx, nocase=1, stopindex=tk.END)
-                    if not idx:
-                        break
-                    lastidx = f"{idx}+{len(search_term)}c"
-                    self.text_display.tag_add('highlight', idx, lastidx)
-                    idx = lastidx
-                self.text_display.tag_config('highlight', background='yellow')
-
-        def replace():
-            search_term = search_var.get()
-            replace_term = replace_var.get()
-            content = self.text_display.get('1.0', tk.END)
-            new_content = content.replace(search_term, replace_term)
-            self.text_display.delete('1.0', tk.END)
-            self.text_display.insert(tk.END, new_content)
-
-        find_button = ttk.Button(search_window, text=self._("Найти"), command=find)
-        find_button.grid(row=2, column=0, padx=5, pady=5)
-        replace_button = ttk.Button(search_window, text=self._("Заменить"), command=replace)
-        replace_button.grid(row=2, column=1, padx=5, pady=5)
+        regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_window, text=self._("Регулярное выражение"), variable=regex_var).grid(
+            row=2, column=0, padx=5, pady=2, sticky='w')
+        case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_window, text=self._("Учитывать регистр"), variable=case_var).grid(
+            row=2, column=1, padx=5, pady=2, sticky='w')
+
+        count_var = tk.StringVar()
+        ttk.Label(search_window, textvariable=count_var).grid(row=4, column=0, columnspan=3, padx=5, pady=5, sticky='w')
+
+        search = self.search_engine
+        # Параметры, по которым построен текущий индекс, и последнее найденное совпадение
+        # pending — переход, ждущий, пока фоновая индексация дойдёт до ответа
+        state = {'query': None, 'match': None, 'index_job': None, 'pending': None}
+
+        def show_count():
+            suffix = "" if search.is_complete else "+"
+            if state['match'] is not None:
+                count_var.set(f"{search.match_number(state['match'])} {self._('из')} {search.count}{suffix}")
+            else:
+                count_var.set(f"{self._('Совпадений')}: {search.count}{suffix}")
+
+        def index_in_background():
+            # Индекс достраивается порциями между событиями Tk, счётчик и подсветка растут по ходу.
+            # Полный индекс продолжает ждать текст, который ещё допишется в хранилище
+            state['index_job'] = None
+            if not search_window.winfo_exists() or state['query'] is None:
+                return
+            indexed = search.indexed_lines
+            complete = search.index_step()
+            self.text_view.on_search_indexed(indexed, search.indexed_lines)
+            show_count()
+            if state['pending'] is not None:
+                navigate(state['pending'])
+            state['index_job'] = search_window.after(250 if complete else 1, index_in_background)
+
+        def ensure_query():
+            query = (search_var.get(), regex_var.get(), case_var.get())
+            if query == state['query'] and search.regex is not None:
+                return True
+            try:
+                search.set_query(*query)
+            except re.error as e:
+                state['query'] = None
+                count_var.set(f"{self._('Ошибка в выражении')}: {e}")
+                self.text_view.set_search(None)
+                return False
+            state['query'] = query
+            state['match'] = None
+            state['pending'] = None
+            if search.regex is None:
+                count_var.set("")
+                self.text_view.set_search(None)
+                return False
+            self.text_view.set_search(search)
+            if state['index_job'] is not None:
+                search_window.after_cancel(state['index_job'])
+            index_in_background()
+            return True
+
+        def show_match(match):
+            state['match'] = match
+            if match is None:
+                self.status_text.set(self._("Совпадений не найдено"))
+            else:
+                line, start, end = match
+                self.text_view.goto_line(line, start, end - start)
+                page = self.text_store.pages[self.text_store.page_at_line(line)]
+                if page.page_num is not None:
+                    self.status_text.set(f"{self._('Страница')} {page.page_num}")
+            show_count()
+
+        def current_position():
+            if state['match'] is not None:
+                return state['match'][:2]
+            return self.text_view.top_line(), -1
+
+        def navigate(find):
+            # Индекс не дошёл до ответа — переход повторит index_in_background после следующей порции
+            match = find()
+            if match is PENDING:
+                state['pending'] = find
+                self.status_text.set(self._("Поиск..."))
+                return
+            state['pending'] = None
+            show_match(match)
+
+        def find_next(_event=None):
+            if ensure_query():
+                line, col = current_position()
+                navigate(lambda: search.find_next(line, col))
+
+        def find_previous():
+            if ensure_query():
+                line, col = current_position()
+                navigate(lambda: search.find_previous(line, max(col, 0)))
+
+        def replace_all():
+            if not ensure_query():
+                return
+            count, first_line = search.replace_all(replace_var.get())
+            state['query'] = None
+            state['match'] = None
+            state['pending'] = None
+            # Перечитывается только загруженное окно, и только если замены были
+            if first_line is not None:
+                self.text_view.refresh()
+            self.text_view.set_search(None)
+            count_var.set(f"{self._('Заменено')}: {count}")
+
+        def on_close():
+            self.text_view.set_search(None)
+            search_window.destroy()
+
+        buttons = ttk.Frame(search_window)
+        buttons.grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+        ttk.Button(buttons, text=self._("Найти далее"), command=find_next).pack(side=tk.LEFT, padx=2)
+        ttk.Button(buttons, text=self._("Найти ранее"), command=find_previous).pack(side=tk.LEFT, padx=2)
+        ttk.Button(buttons, text=self._("Заменить все"), command=replace_all).pack(side=tk.LEFT, padx=2)
+        search_entry.bind('<Return>', find_next)
+        search_window.protocol("WM_DELETE_WINDOW", on_close)
+        search_entry.focus_set()
+
+    def goto_page(self):
+        if not len(self.text_store):
+            return
+        page_num = simpledialog.askinteger(self._("Переход"), self._("Номер страницы:"), minvalue=1)
+        if page_num is None:
+            return
+        index = self.text_store.find_page(page_num)
+        if index is None:
+            messagebox.showwarning(self._("Внимание"), self._("Страница не найдена."))
+            return
+        self.text_view.goto_page(index)
+
+    def search_corpus(self):
+        if self.corpus_index is None:
+            messagebox.showinfo(self._("Поиск по всем документам"), self._("Полнотекстовый индекс отключён или недоступен."))
+            return
+        corpus_window = tk.Toplevel(self.root)
+        corpus_window.title(self._("Поиск по всем документам"))
+
+        query_var = tk.StringVar()
+        query_entry = tk.Entry(corpus_window, textvariable=query_var, width=50)
+        query_entry.grid(row=0, column=0, padx=5, pady=5, sticky='we')
+        raw_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(corpus_window, text=self._("Синтаксис FTS5"), variable=raw_var).grid(row=0, column=1, padx=5, pady=5)
+
+        columns = ('document', 'page', 'snippet')
+        results = ttk.Treeview(corpus_window, columns=columns, show='headings', height=15)
+        results.heading('document', text=self._("Документ"))
+        results.heading('page', text=self._("Стр."))
+        results.heading('snippet', text=self._("Фрагмент"))
+        results.column('document', width=200)
+        results.column('page', width=50, anchor='e')
+        results.column('snippet', width=450)
+        results.grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky='nsew')
+        corpus_window.columnconfigure(0, weight=1)
+        corpus_window.rowconfigure(1, weight=1)
+
+        count_var = tk.StringVar()
+        ttk.Label(corpus_window, textvariable=count_var).grid(row=2, column=0, columnspan=3, padx=5, pady=5, sticky='w')
+        found = {}  # id строки Treeview -> результат поиска
+
+        def run_search(_event=None):
+            results.delete(*results.get_children())
+            found.clear()
+            try:
+                hits = self.corpus_index.search(query_var.get(), raw=raw_var.get())
+            except sqlite3.Error as e:
+                count_var.set(f"{self._('Ошибка в запросе')}: {e}")
+                return
+            for hit in hits:
+                item = results.insert('', tk.END, values=(os.path.basename(hit['path']), hit['page'], hit['snippet']))
+                found[item] = hit
+            count_var.set(f"{self._('Найдено страниц')}: {len(hits)}")
+
+        def open_result(_event=None):
+            selection = results.selection()
+            if selection:
+                self.open_corpus_hit(found[selection[0]])
+
+        ttk.Button(corpus_window, text=self._("Найти"), command=run_search).grid(row=0, column=2, padx=5, pady=5)
+        query_entry.bind('<Return>', run_search)
+        results.bind('<Double-1>', open_result)
+        results.bind('<Return>', open_result)
+        query_entry.focus_set()
+
+    def open_corpus_hit(self, hit):
+        """Показывает страницу из результатов поиска по корпусу, при необходимости загружая документ."""
+        path, page_num = hit['path'], hit['page']
+        index = self.text_store.find_page(page_num, source=path)
+        if index is not None:
+            self.text_view.goto_page(index)
+            return
+        if not os.path.exists(path):
+            messagebox.showwarning(self._("Предупреждение"), self._(f"Файл {path} не найден."))
+            return
+        # Текст берётся из кэша результатов, поэтому повторное открытие обычно мгновенно
+        self.cancel_event.clear()
+        self.clear_text()
+        self.pending_goto = (path, page_num)
+        self.status_text.set(self._("Загрузка PDF..."))
+        # Тот же режим, в котором документ индексировался: у сканов текстового слоя нет,
+        # и в текстовом режиме искомая страница оказалась бы пустой
+        self.enqueue_batch(self.pdf_to_text_worker, [(path, hit['mode'] or MODE_AUTO)])
+        self.root.after(100, self.check_queue)
+
+    def clear_text(self):
+        self.text_store.clear()
+        self.page_sequencer.reset()
+        self.text_view.refresh()
 
     def cancel_operation(self):
         self.cancel_event.set()
+        for batch in self.active_batches:
+            batch.cancel()
+        self.active_batches = []
 
     def ocr_settings(self):
         settings_window = tk.Toplevel(self.root)
@@ -481,6 +789,17 @@ class AppGUI:
         dpi_spinbox = tk.Spinbox(settings_window, from_=100, to=600, textvariable=dpi_var)
         dpi_spinbox.pack(pady=5)
 
+        tk.Label(settings_window, text=self._("Выбор DPI:")).pack(pady=5)
+        dpi_mode_var = tk.StringVar(value=self.settings.ocr_dpi_mode)
+        dpi_mode_menu = ttk.OptionMenu(settings_window, dpi_mode_var, self.settings.ocr_dpi_mode, 'fixed', 'adaptive')
+        dpi_mode_menu.pack(pady=5)
+
+        tk.Label(settings_window, text=self._("Границы адаптивного DPI (мин./макс.):")).pack(pady=5)
+        dpi_min_var = tk.IntVar(value=self.settings.ocr_dpi_min)
+        tk.Spinbox(settings_window, from_=72, to=600, textvariable=dpi_min_var).pack(pady=2)
+        dpi_max_var = tk.IntVar(value=self.settings.ocr_dpi_max)
+        tk.Spinbox(settings_window, from_=72, to=600, textvariable=dpi_max_var).pack(pady=2)
+
         tk.Label(settings_window, text=self._("Режим PSM:")).pack(pady=5)
         psm_var = tk.StringVar(value=self.settings.ocr_psm)
         psm_entry = tk.Entry(settings_window, textvariable=psm_var)
@@ -493,16 +812,39 @@ class AppGUI:
 
         tk.Label(settings_window, text=self._("Движок OCR:")).pack(pady=5)
         engine_var = tk.StringVar(value=self.settings.ocr_engine)
-        engine_options = ["tesseract", "other_engine"]  # Добавьте другие движки, если есть
-        engine_menu = ttk.OptionMenu(settings_window, engine_var, *engine_options)
+        engine_menu = ttk.OptionMenu(settings_window, engine_var, self.settings.ocr_engine, *OCR_ENGINES)
         engine_menu.pack(pady=5)
 
+        tk.Label(settings_window, text=self._("Предобработка изображений:")).pack(pady=5)
+        step_labels = [
+            ('crop', self._("Обрезка полей")),
+            ('deskew', self._("Выравнивание наклона")),
+            ('scale', self._("Уменьшение крупного шрифта")),
+            ('median', self._("Медианный фильтр")),
+            ('otsu', self._("Бинаризация (Оцу)")),
+            ('adaptive', self._("Адаптивная бинаризация")),
+        ]
+        step_vars = {}
+        for step, label in step_labels:
+            step_vars[step] = tk.BooleanVar(value=step in self.settings.ocr_preprocess)
+            ttk.Checkbutton(settings_window, text=label, variable=step_vars[step]).pack(anchor='w', padx=10)
+
+        tk.Label(settings_window, text=self._("Целевая высота строчных букв (пикс.):")).pack(pady=5)
+        x_height_var = tk.IntVar(value=self.settings.ocr_target_x_height)
+        x_height_spinbox = tk.Spinbox(settings_window, from_=10, to=60, textvariable=x_height_var)
+        x_height_spinbox.pack(pady=5)
+
         def apply_settings():
             self.settings.ocr_language = lang_var.get()
             self.settings.ocr_dpi = int(dpi_var.get())
+            self.settings.ocr_dpi_mode = dpi_mode_var.get()
+            self.settings.ocr_dpi_min = min(int(dpi_min_var.get()), int(dpi_max_var.get()))
+            self.settings.ocr_dpi_max = max(int(dpi_min_var.get()), int(dpi_max_var.get()))
             self.settings.ocr_psm = psm_var.get()
             self.settings.ocr_oem = oem_var.get()
             self.settings.ocr_engine = engine_var.get()
+            self.settings.ocr_preprocess = [step for step, _ in step_labels if step_vars[step].get()]
+            self.settings.ocr_target_x_height = int(x_height_var.get())
             self.settings.save_settings()
             settings_window.destroy()
 
@@ -600,6 +942,20 @@ class AppGUI:
             logging.error(f"Ошибка при открытии логов: {e}")
             messagebox.showerror(self._("Ошибка"), self._("Не удалось открыть файл логов. Подробности в файле журнала."))
 
+    def show_cache_stats(self):
+        stats = self.result_cache.stats()
+        fingerprint_stats = self.fingerprinter.stats()
+        message = (
+            f"{self._('Попаданий')}: {stats['hits']}\n"
+            f"{self._('Промахов')}: {stats['misses']} ({stats['hit_rate']:.0%} {self._('попаданий')})\n"
+            f"{self._('Записей')}: {stats['entries']}\n"
+            f"{self._('Размер')}: {stats['size_bytes'] / 2 ** 20:.1f} / {stats['max_bytes'] / 2 ** 20:.0f} МБ\n"
+            f"{self._('Полных хэшей файлов')}: {fingerprint_stats['full_computed']} "
+            f"({self._('из кэша')}: {fingerprint_stats['full_memo_hits']})"
+        )
+        if messagebox.askyesno(self._("Статистика кэша"), message + "\n\n" + self._("Очистить кэш?")):
+            self.result_cache.clear()
+
     @staticmethod
     def show_about():
         messagebox.showinfo(
@@ -614,26 +970,55 @@ class AppGUI:
                 filetypes=[("PDF files", "*.pdf")]
             )
             if pdf_file:
-                doc = fitz.open(pdf_file)
-                if doc.is_encrypted:
-                    password = simpledialog.askstring(self._("Требуется пароль"), self._("Введите пароль для PDF-файла:"), show='*')
-                    if not doc.authenticate(password):
-                        messagebox.showerror(self._("Ошибка"), self._("Неверный пароль для PDF-файла."))
-                        return
-                page = doc.load_page(0)
-                pix = page.get_pixmap()
-                img_data = pix.tobytes("ppm")
-                img = Image.open(io.BytesIO(img_data))
-                img.show()
-                doc.close()
+                self.status_text.set(self._("Открытие предпросмотра..."))
+                self.wait_preview_document(pdf_file, self.page_renderer.open_document(pdf_file))
         except Exception as e:
             logging.error(f"Ошибка при предпросмотре PDF: {e}")
             messagebox.showerror(self._("Ошибка"), self._("Не удалось выполнить предпросмотр PDF. Подробности в файле журнала."))
 
-    def update_progress(self, progress):
+    def wait_preview_document(self, pdf_file, future, password=None):
+        """Ждёт открытия документа в пуле рендера, не блокируя главный цикл Tk."""
+        if not future.done():
+            self.root.after(50, self.wait_preview_document, pdf_file, future, password)
+            return
+        try:
+            document = future.result()
+        except Exception as e:
+            logging.error(f"Ошибка при предпросмотре PDF: {e}")
+            self.status_text.set(self._("Ошибка"))
+            messagebox.showerror(self._("Ошибка"), self._("Не удалось выполнить предпросмотр PDF. Подробности в файле журнала."))
+            return
+        if document is None:
+            # Документ зашифрован: пустой пароль не подошёл или введён неверный
+            if password is not None:
+                messagebox.showerror(self._("Ошибка"), self._("Неверный пароль для PDF-файла."))
+            password = simpledialog.askstring(self._("Требуется пароль"), self._("Введите пароль для PDF-файла:"), show='*')
+            if password is None:
+                self.status_text.set(self._("Готово"))
+                return
+            self.wait_preview_document(pdf_file, self.page_renderer.open_document(pdf_file, password), password)
+            return
+        self.status_text.set(self._("Готово"))
+        if not document.page_count:
+            messagebox.showwarning(self._("Предупреждение"), self._("В документе нет страниц."))
+            return
+        preview_window = tk.Toplevel(self.root)
+        preview_window.title(f"{self._('Предпросмотр')}: {os.path.basename(pdf_file)}")
+        preview_window.geometry("900x1000")
+        pane = PreviewPane(preview_window, self.page_renderer, document)
+        pane.pack(fill=tk.BOTH, expand=True)
+        pane.show_page(0)
+
+    def update_progress(self, progress, stats=None):
         if hasattr(self, 'progress_dialog_bar'):
             self.progress_dialog_bar['value'] = progress
-            self.status_text.set(f"{self._('Обработка...')} {progress}%")
+            status = f"{self._('Обработка...')} {progress}%"
+            if stats:
+                status += f" ({stats['done']}/{stats['total']} {self._('стр.')}, {stats['pages_per_sec']:.1f} {self._('стр/с')}"
+                if stats['eta'] is not None:
+                    status += f", {self._('осталось')} ~{int(stats['eta'])} {self._('с')}"
+                status += ")"
+            self.status_text.set(status)
 
     def show_progress_dialog(self):
         self.progress_dialog = tk.Toplevel(self.root)
@@ -654,14 +1039,14 @@ class AppGUI:
 
     def drop_files(self, event):
         files = self.root.tk.splitlist(event.data)
-        pdf_files = [file for file in files if file.endswith('.pdf')]
-        if pdf_files:
+        dropped_files = [file for file in files if validate_file(file)]
+        if dropped_files:
             self.cancel_event.clear()
-            self.text_display.delete(1.0, tk.END)
-            self.status_text.set(self._("Загрузка PDF..."))
+            self.clear_text()
+            self.status_text.set(self._("Загрузка файлов..."))
             self.progress_bar['value'] = 0
-            for pdf_file in pdf_files:
-                self.task_queue.add_task(self.pdf_to_text_worker, pdf_file, False)
+            # Изображения распознаются через общий пул OCR, PDF — через PDFProcessor
+            self.enqueue_batch(self.process_file, [(dropped_file,) for dropped_file in dropped_files])
             self.show_progress_dialog()
             self.root.after(100, self.check_queue)
 
@@ -670,8 +1055,40 @@ class AppGUI:
 
     def load_session(self):
         self.opened_files = self.settings.load_session()
-        for file in self.opened_files:
-            self.task_queue.add_task(self.process_file, file)
+        if self.opened_files:
+            self.enqueue_batch(self.process_file, [(file,) for file in self.opened_files], PRIORITY_BACKGROUND)
+
+    def enqueue_batch(self, task, jobs, priority=None):
+        """Ставит задачи одним пакетом с общим прогрессом.
+
+        Очередь ограничена, поэтому задачи подаются из отдельного потока:
+        при заполненной очереди ждёт он, а не главный цикл Tk.
+        Одиночный файл считается интерактивным и обгоняет массовую обработку.
+        """
+        if priority is None:
+            priority = PRIORITY_INTERACTIVE if len(jobs) == 1 else PRIORITY_BULK
+        # Размер пакета известен заранее: прогресс и завершение считаются от него,
+        # а не от числа задач, которые поставщик успел поставить
+        batch = self.task_queue.new_batch(total=len(jobs))
+        self.active_batches = [b for b in self.active_batches if not b.is_finished()] + [batch]
+
+        def feed():
+            for args in jobs:
+                if self.cancel_event.is_set():
+                    break
+                try:
+                    self.task_queue.submit(task, args, priority=priority, batch=batch)
+                except RuntimeError:
+                    break  # Приложение закрывается, очередь уже остановлена
+            # При отмене поставлена только часть задач — пакет завершится на них
+            batch.close()
+
+        threading.Thread(target=feed, daemon=True).start()
+        return batch
+
+    def on_batch_progress(self, progress, _batch):
+        # Вызывается из рабочего потока: передаём прогресс в главный поток через очередь
+        self.text_queue.put(("BATCH", progress))
 
     def process_file(self, file_path):
         if file_path.lower().endswith('.pdf'):
@@ -0,0 +1,208 @@
+"""Предобработка страниц перед OCR на массивах NumPy.
+
+Все оценки (порог бинаризации, угол наклона, высота строчных букв, поля)
+считаются векторными операциями над буфером страницы. Геометрические
+преобразования (поворот, уменьшение) выполняет PIL, а preprocess()
+возвращает вместе с изображением матрицу, переводящую координаты
+обработанного изображения в координаты исходного, — по ней рамки слов
+возвращаются на страницу.
+"""
+from PIL import Image, ImageFilter
+
+from utils import lazy_import
+
+np = lazy_import('numpy')
+
+# Шаги в порядке выполнения; в настройках хранится подмножество этих имён
+STEP_CROP = 'crop'
+STEP_DESKEW = 'deskew'
+STEP_SCALE = 'scale'
+STEP_MEDIAN = 'median'
+STEP_OTSU = 'otsu'
+STEP_ADAPTIVE = 'adaptive'
+PREPROCESS_STEPS = (STEP_CROP, STEP_DESKEW, STEP_SCALE, STEP_MEDIAN, STEP_OTSU, STEP_ADAPTIVE)
+
+DEFAULT_TARGET_X_HEIGHT = 20  # пикселей; Tesseract лучше всего работает при 20-30
+MAX_SKEW_ANGLE = 5.0  # градусов
+SKEW_ANGLE_STEP = 0.25
+SKEW_MAX_POINTS = 20000  # Тёмных пикселей, по которым оценивается наклон
+SKEW_MAX_SIDE = 1000  # Оценка наклона идёт по уменьшенной до этого размера маске
+ADAPTIVE_BLOCK_SIZE = 31
+ADAPTIVE_OFFSET = 10
+CROP_MARGIN = 10
+MIN_SCALE = 0.25
+
+
+def otsu_threshold(gray):
+    """Порог Оцу по гистограмме яркости (uint8)."""
+    # Для гистограммы достаточно каждого второго пикселя по обеим осям
+    hist = np.bincount(gray[::2, ::2].ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+    prob = hist / total
+    omega = np.cumsum(prob)
+    mu = np.cumsum(prob * np.arange(256))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma_b = np.nan_to_num((mu[-1] * omega - mu) ** 2 / (omega * (1.0 - omega)))
+    # У двухуровневого изображения (1-битные сканы) дисперсия одинакова на всём
+    # промежутке между уровнями; argmax дал бы его начало, то есть сам тёмный
+    # уровень, и порог ничего бы не отделял. Берём середину плато.
+    best = np.flatnonzero(sigma_b >= sigma_b.max() * (1 - 1e-9))
+    return int((best[0] + best[-1]) // 2)
+
+
+def binarize_otsu(gray):
+    return np.where(gray > otsu_threshold(gray), 255, 0).astype(np.uint8)
+
+
+def binarize_adaptive(gray, block_size=ADAPTIVE_BLOCK_SIZE, offset=ADAPTIVE_OFFSET):
+    """Локальная бинаризация: пиксель тёмный, если он темнее среднего по окну на offset.
+
+    Среднее по окну берётся из интегрального изображения, поэтому стоимость
+    не зависит от размера окна.
+    """
+    radius = block_size // 2
+    padded = np.pad(gray, radius + 1, mode='edge').astype(np.int64)
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    height, width = gray.shape
+    y0, x0 = 0, 0
+    y1, x1 = block_size, block_size
+    window_sum = (integral[y1:y1 + height, x1:x1 + width] - integral[y0:y0 + height, x1:x1 + width]
+                  - integral[y1:y1 + height, x0:x0 + width] + integral[y0:y0 + height, x0:x0 + width])
+    mean = window_sum / (block_size * block_size)
+    return np.where(gray > mean - offset, 255, 0).astype(np.uint8)
+
+
+def _edge_runs(is_border):
+    """Длины непрерывных «рамочных» участков у начала и у конца оси."""
+    inner = np.flatnonzero(~is_border)
+    if inner.size == 0:
+        return 0, is_border.size
+    return int(inner[0]), int(inner[-1]) + 1
+
+
+def find_content_box(dark, margin=CROP_MARGIN):
+    """Рамка (left, top, right, bottom) содержимого страницы без пустых и чёрных полей."""
+    height, width = dark.shape
+    # Тёмные полосы сканера по краям: строки и столбцы, почти целиком залитые
+    top, bottom = _edge_runs(dark.mean(axis=1) > 0.5)
+    left, right = _edge_runs(dark.mean(axis=0) > 0.5)
+    inner = dark[top:bottom, left:right]
+    if inner.size == 0:
+        return 0, 0, width, height
+    # Одиночные точки пыли не считаются содержимым
+    rows = np.flatnonzero(inner.mean(axis=1) > 0.002)
+    cols = np.flatnonzero(inner.mean(axis=0) > 0.002)
+    if rows.size == 0 or cols.size == 0:
+        return 0, 0, width, height
+    return (max(left + int(cols[0]) - margin, 0), max(top + int(rows[0]) - margin, 0),
+            min(left + int(cols[-1]) + 1 + margin, width), min(top + int(rows[-1]) + 1 + margin, height))
+
+
+def estimate_skew(dark, max_angle=MAX_SKEW_ANGLE, step=SKEW_ANGLE_STEP):
+    """Угол наклона строк в градусах (положительный — строки опускаются вправо).
+
+    Для каждого кандидата тёмные пиксели проецируются на вертикаль вдоль
+    прямой с этим наклоном; у верного угла профиль строк самый резкий,
+    то есть сумма квадратов гистограммы максимальна.
+    """
+    stride = max(1, max(dark.shape) // SKEW_MAX_SIDE)
+    ys, xs = np.nonzero(dark[::stride, ::stride])
+    if ys.size < 100:
+        return 0.0
+    if ys.size > SKEW_MAX_POINTS:
+        keep = slice(None, None, ys.size // SKEW_MAX_POINTS + 1)
+        ys, xs = ys[keep], xs[keep]
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    offsets = ys[None, :] - xs[None, :] * np.tan(np.deg2rad(angles))[:, None]
+    bins = np.round(offsets).astype(np.int64)
+    bins -= bins.min()
+    n_bins = int(bins.max()) + 1
+    flat = bins + np.arange(angles.size)[:, None] * n_bins
+    hist = np.bincount(flat.ravel(), minlength=angles.size * n_bins).reshape(angles.size, n_bins)
+    scores = (hist.astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def estimate_x_height(dark):
+    """Медианная высота строчных букв в пикселях или None, если строк не найдено.
+
+    Строки выделяются по горизонтальной проекции, а высота строчных букв
+    внутри строки — как число рядов, где тёмных пикселей не меньше половины
+    максимума строки: выносные элементы дают заметно меньшую плотность.
+    """
+    row_ink = dark.sum(axis=1)
+    if not row_ink.any():
+        return None
+    is_text = np.concatenate(([0], (row_ink > row_ink.max() * 0.05).astype(np.int8), [0]))
+    edges = np.diff(is_text)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    heights = []
+    for start, end in zip(starts, ends):
+        if end - start < 4:
+            continue
+        line = row_ink[start:end]
+        heights.append(int((line >= line.max() * 0.5).sum()))
+    return float(np.median(heights)) if heights else None
+
+
+def _rotation_matrix(angle, width, height):
+    """Переводит координаты изображения, повёрнутого PIL на angle, в координаты исходного."""
+    theta = np.deg2rad(angle)
+    cos, sin = np.cos(theta), np.sin(theta)
+    cx, cy = width / 2, height / 2
+    return np.array([[cos, -sin, cx - cx * cos + cy * sin],
+                     [sin, cos, cy - cx * sin - cy * cos],
+                     [0.0, 0.0, 1.0]])
+
+
+def preprocess(image, steps=PREPROCESS_STEPS, target_x_height=DEFAULT_TARGET_X_HEIGHT):
+    """Применяет выбранные шаги и возвращает (изображение, матрица 3x3 в исходные координаты)."""
+    steps = set(steps)
+    gray = np.asarray(image.convert('L'))
+    transform = np.eye(3)
+    dark = gray < otsu_threshold(gray) if steps & {STEP_CROP, STEP_DESKEW, STEP_SCALE} else None
+
+    if STEP_CROP in steps:
+        left, top, right, bottom = find_content_box(dark)
+        gray, dark = gray[top:bottom, left:right], dark[top:bottom, left:right]
+        transform = transform @ np.array([[1.0, 0.0, left], [0.0, 1.0, top], [0.0, 0.0, 1.0]])
+
+    if STEP_DESKEW in steps:
+        angle = estimate_skew(dark)
+        if abs(angle) >= SKEW_ANGLE_STEP:
+            height, width = gray.shape
+            rotated = Image.fromarray(gray).rotate(angle, resample=Image.BILINEAR, fillcolor=255)
+            gray = np.asarray(rotated)
+            dark = gray < otsu_threshold(gray)
+            transform = transform @ _rotation_matrix(angle, width, height)
+
+    if STEP_SCALE in steps and target_x_height:
+        x_height = estimate_x_height(dark)
+        # Только уменьшение: увеличение не добавляет деталей, а лишь время
+        if x_height:
+            scale = max(target_x_height / x_height, MIN_SCALE)
+            if scale < 0.95:
+                height, width = gray.shape
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                gray = np.asarray(Image.fromarray(gray).resize(size, Image.BOX))
+                transform = transform @ np.diag([width / size[0], height / size[1], 1.0])
+
+    if STEP_MEDIAN in steps:
+        gray = np.asarray(Image.fromarray(gray).filter(ImageFilter.MedianFilter()))
+
+    if STEP_ADAPTIVE in steps:
+        gray = binarize_adaptive(gray)
+    elif STEP_OTSU in steps:
+        gray = binarize_otsu(gray)
+
+    return Image.fromarray(gray), transform
+
+
+def map_box(transform, box):
+    """Переводит рамку (x0, y0, x1, y1) обработанного изображения в координаты исходного."""
+    x0, y0, x1, y1 = box
+    corners = np.array([[x0, x1, x1, x0], [y0, y0, y1, y1], [1.0, 1.0, 1.0, 1.0]])
+    mapped = transform @ corners
+    return (float(mapped[0].min()), float(mapped[1].min()), float(mapped[0].max()), float(mapped[1].max()))
@@ -1,6 +1,18 @@
+"""Точка входа GUI.
+
+python main.py --profile-startup [--startup-budget-ms 1500] [--top 15]
+перезапускает приложение с -X importtime, печатает самые дорогие импорты
+и время от запуска процесса до первой отрисовки окна, после чего окно
+закрывается. С --startup-budget-ms код возврата 1 означает, что бюджет
+превышен, — так время запуска можно проверять в CI.
+"""
+import argparse
 import logging
-from tkinterdnd2 import TkinterDnD
-from gui import AppGUI
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
 
 logging.basicConfig(
     filename='app.log',
@@ -8,11 +20,87 @@ logging.basicConfig(
     format='%(asctime)s %(levelname)s %(message)s'
 )
 
+# Строка, которой дочерний процесс сообщает об отрисовке окна
+FIRST_PAINT_MARKER = 'FIRST_PAINT'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Конвертер PDF в Текст")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Замерить время запуска и импортов и выйти")
+    parser.add_argument('--startup-budget-ms', type=float, default=None,
+                        help="Допустимое время до первой отрисовки окна, мс")
+    parser.add_argument('--top', type=int, default=15, help="Сколько самых дорогих импортов показать")
+    # Служебный флаг: процесс, запущенный --profile-startup, закрывается после первой отрисовки
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    """Суммирует собственное время импорта (мкс) по пакетам верхнего уровня."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        package = parts[2].strip().split('.')[0]
+        totals[package] += int(parts[0])
+    return totals
+
+
+def profile_startup(args):
+    command = [sys.executable, '-X', 'importtime', __file__, '--startup-probe']
+    # Отчёт -X importtime пишется во временный файл: через канал он мог бы
+    # переполнить буфер, пока мы ждём маркер в stdout, и дочерний процесс завис бы
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as stderr_file:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+        first_paint = None
+        for line in process.stdout:
+            if line.startswith(FIRST_PAINT_MARKER) and first_paint is None:
+                first_paint = (time.perf_counter() - started) * 1000
+        process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    if first_paint is None:
+        print(f"Окно не было показано (код возврата {process.returncode}). Подробности в app.log.")
+        return 1
+
+    totals = parse_importtime(stderr)
+    print(f"{'Пакет':<30}{'Импорт, мс':>12}")
+    for package, micros in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<30}{micros / 1000:>12.1f}")
+    print(f"{'Все импорты':<30}{sum(totals.values()) / 1000:>12.1f}")
+    # -X importtime сам немного замедляет импорт, поэтому оценка чуть завышена
+    print(f"До первой отрисовки окна: {first_paint:.0f} мс")
+    if args.startup_budget_ms is not None and first_paint > args.startup_budget_ms:
+        print(f"Бюджет запуска {args.startup_budget_ms:.0f} мс превышен")
+        return 1
+    return 0
+
+
 def main():
+    args = parse_args()
+    if args.profile_startup:
+        sys.exit(profile_startup(args))
+
     global root
     try:
+        # GUI и его зависимости импортируются здесь, а не при загрузке модуля,
+        # чтобы режим профилирования не тянул их в родительский процесс
+        from tkinterdnd2 import TkinterDnD
+        from gui import AppGUI
+
         root = TkinterDnD.Tk()
         app = AppGUI(root)
+        if args.startup_probe:
+            # Обрабатываем отложенную отрисовку и сообщаем, что окно на экране
+            root.update()
+            print(FIRST_PAINT_MARKER, flush=True)
+            root.after_idle(root.destroy)
         try:
             root.mainloop()
         except Exception as e:
@@ -31,5 +119,6 @@ def main():
         except Exception as e:
             logging.error(f"Ошибка при завершении приложения: {str(e)}", exc_info=True)
 
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
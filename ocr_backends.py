@@ -0,0 +1,202 @@
+"""Движки OCR, между которыми выбирает settings.ocr_engine.
+
+pytesseract запускает отдельный процесс tesseract на каждое изображение,
+и тот каждый раз заново загружает traineddata. Поэтому есть два способа
+этого избежать:
+
+* tesserocr — привязка к libtesseract внутри рабочего процесса; модель
+  загружается один раз на процесс пула и переиспользуется для всех страниц;
+* пакетный режим — один вызов tesseract на несколько страниц через
+  файл-список изображений.
+
+Экземпляры движков создаются в рабочих процессах и живут вместе с ними.
+"""
+import csv
+import functools
+import logging
+import os
+import subprocess
+import tempfile
+from collections import namedtuple
+
+from utils import lazy_import
+
+pytesseract = lazy_import('pytesseract')
+# None, если tesserocr не установлен
+tesserocr = lazy_import('tesserocr', optional=True)
+
+ENGINE_AUTO = 'tesseract'  # tesserocr, если установлен, иначе пакетный режим
+ENGINE_TESSEROCR = 'tesserocr'
+ENGINE_BATCH = 'tesseract_batch'
+ENGINE_PYTESSERACT = 'pytesseract'
+OCR_ENGINES = (ENGINE_AUTO, ENGINE_TESSEROCR, ENGINE_BATCH, ENGINE_PYTESSERACT)
+
+# Страниц в одном вызове tesseract в пакетном режиме
+BATCH_PAGES = 8
+# Разделитель страниц в текстовом выводе tesseract
+PAGE_SEPARATOR = '\f'
+
+
+class OCROptions(namedtuple('OCROptions', ['engine', 'language', 'psm', 'oem', 'preprocess'])):
+    """Параметры распознавания, передаваемые в рабочий процесс."""
+    __slots__ = ()
+
+    @property
+    def config(self):
+        return f'--oem {self.oem} --psm {self.psm}'
+
+
+def _word_box(text, conf, left, top, width, height):
+    """Слово (x0, y0, x1, y1, текст) из строки вывода image_to_data или None."""
+    text = (text or '').strip()
+    # Строки уровня блока/абзаца имеют conf = -1 и пустой текст
+    if not text or float(conf) < 0:
+        return None
+    left, top = int(left), int(top)
+    return left, top, left + int(width), top + int(height), text
+
+
+class PytesseractBackend:
+    """Исходный способ: отдельный процесс tesseract на каждое изображение."""
+    batch_size = 1
+
+    def recognize(self, images, options):
+        return [pytesseract.image_to_string(image, lang=options.language, config=options.config) for image in images]
+
+    def recognize_words(self, images, options):
+        pages = []
+        for image in images:
+            data = pytesseract.image_to_data(image, lang=options.language, config=options.config,
+                                             output_type=pytesseract.Output.DICT)
+            rows = zip(data['text'], data['conf'], data['left'], data['top'], data['width'], data['height'])
+            pages.append([word for word in (_word_box(*row) for row in rows) if word])
+        return pages
+
+
+class TesserocrBackend:
+    """libtesseract в рабочем процессе: traineddata загружается один раз на набор параметров."""
+    batch_size = 1
+
+    def __init__(self):
+        self._apis = {}
+
+    def _api(self, options):
+        key = (options.language, options.psm, options.oem)
+        if key not in self._apis:
+            self._apis[key] = tesserocr.PyTessBaseAPI(lang=options.language, psm=int(options.psm), oem=int(options.oem))
+        return self._apis[key]
+
+    def recognize(self, images, options):
+        api = self._api(options)
+        texts = []
+        for image in images:
+            api.SetImage(image)
+            texts.append(api.GetUTF8Text())
+        return texts
+
+    def recognize_words(self, images, options):
+        api = self._api(options)
+        level = tesserocr.RIL.WORD
+        pages = []
+        for image in images:
+            api.SetImage(image)
+            api.Recognize()
+            words = []
+            for result in tesserocr.iterate_level(api.GetIterator(), level):
+                box = result.BoundingBox(level)
+                if box is None:
+                    continue
+                x0, y0, x1, y1 = box
+                word = _word_box(result.GetUTF8Text(level), result.Confidence(level), x0, y0, x1 - x0, y1 - y0)
+                if word:
+                    words.append(word)
+            pages.append(words)
+        return pages
+
+
+class BatchBackend:
+    """Один процесс tesseract на пачку страниц через файл-список изображений.
+
+    При сбое пакетного вызова пачка распознаётся постранично через pytesseract.
+    """
+    batch_size = BATCH_PAGES
+
+    def __init__(self):
+        self._fallback = PytesseractBackend()
+
+    def _run(self, images, options, output_format):
+        with tempfile.TemporaryDirectory(prefix='ocr_batch_') as tmp_dir:
+            list_path = os.path.join(tmp_dir, 'pages.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for index, image in enumerate(images):
+                    # PGM/PBM пишется без сжатия — это быстрее, чем PNG
+                    image_path = os.path.join(tmp_dir, f'{index:05d}.pnm')
+                    image.save(image_path, format='PPM')
+                    f.write(image_path + '\n')
+            output_base = os.path.join(tmp_dir, 'out')
+            command = [pytesseract.pytesseract.tesseract_cmd, list_path, output_base,
+                       '-l', options.language, '--oem', str(options.oem), '--psm', str(options.psm), output_format]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            with open(f'{output_base}.{output_format}', encoding='utf-8') as f:
+                return f.read()
+
+    def recognize(self, images, options):
+        try:
+            output = self._run(images, options, 'txt')
+            texts = output.split(PAGE_SEPARATOR)
+            # После последней страницы тоже стоит разделитель
+            if len(texts) < len(images):
+                raise ValueError(f"tesseract вернул {len(texts)} страниц вместо {len(images)}")
+            return texts[:len(images)]
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Пакетный вызов tesseract не удался, постраничное распознавание: {e}")
+            return self._fallback.recognize(images, options)
+
+    def recognize_words(self, images, options):
+        try:
+            output = self._run(images, options, 'tsv')
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Пакетный вызов tesseract не удался, постраничное распознавание: {e}")
+            return self._fallback.recognize_words(images, options)
+        pages = [[] for _ in images]
+        reader = csv.DictReader(output.splitlines(), delimiter='\t', quoting=csv.QUOTE_NONE)
+        for row in reader:
+            word = _word_box(row.get('text'), row['conf'], row['left'], row['top'], row['width'], row['height'])
+            if word:
+                pages[int(row['page_num']) - 1].append(word)
+        return pages
+
+
+_BACKEND_CLASSES = {
+    ENGINE_TESSEROCR: TesserocrBackend,
+    ENGINE_BATCH: BatchBackend,
+    ENGINE_PYTESSERACT: PytesseractBackend,
+}
+# Движки текущего процесса; в рабочих процессах пула живут до их завершения
+_backends = {}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_engine(name):
+    """Переводит значение settings.ocr_engine в доступный движок."""
+    if name == ENGINE_AUTO:
+        return ENGINE_TESSEROCR if tesserocr is not None else ENGINE_BATCH
+    if name == ENGINE_TESSEROCR and tesserocr is None:
+        logging.warning("tesserocr не установлен, используется pytesseract")
+        return ENGINE_PYTESSERACT
+    if name not in _BACKEND_CLASSES:
+        logging.warning(f"Неизвестный движок OCR {name!r}, используется pytesseract")
+        return ENGINE_PYTESSERACT
+    return name
+
+
+def batch_size(engine):
+    """Сколько страниц выгодно отправлять движку за один вызов."""
+    return _BACKEND_CLASSES[resolve_engine(engine)].batch_size
+
+
+def get_backend(engine):
+    engine = resolve_engine(engine)
+    if engine not in _backends:
+        _backends[engine] = _BACKEND_CLASSES[engine]()
+    return _backends[engine]
@@ -1,30 +1,186 @@
-import pytesseract
-from PIL import Image, ImageFilter
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from image_preprocessing import map_box, preprocess
+from ocr_backends import OCROptions, batch_size, get_backend, resolve_engine
+from page_source import load_page, load_page_image
+from utils import resolve_workers
+
+
+def _clean_text(text):
+    return ' '.join(text.split())
+
+
+def _recognize(image, options):
+    # Предобработка изображения
+    image, _ = OCRProcessor.preprocess_image(image, options.preprocess)
+    return _clean_text(get_backend(options.engine).recognize([image], options)[0])
+
+
+def _ocr_job(image, options):
+    """Распознаёт уже загруженное изображение в текущем процессе; при ошибке — пустая строка.
+
+    В пул OCR изображения не передаются: туда уходят только ссылки PageRef.
+    """
+    try:
+        return _recognize(image, options)
+    except Exception as e:
+        logging.error(f"Ошибка при OCR: {e}")
+        return ''
+
+
+def _ocr_page_job(page_ref, options):
+    """Загружает страницу по ссылке прямо в рабочем процессе и распознаёт её.
+
+    В отличие от _ocr_job при ошибке возвращает None, чтобы вызывающий код
+    мог отличить сбой от пустой страницы и не кэшировать его.
+    """
+    try:
+        return _recognize(load_page_image(page_ref), options)
+    except Exception as e:
+        logging.error(f"Ошибка при OCR страницы {page_ref.path}: {e}")
+        return None
+
+
+def _recognize_batch(page_refs, prepare, recognize):
+    """Распознаёт пачку страниц так, что сбой одной страницы не теряет остальные.
+
+    prepare(page_ref) готовит страницу, recognize(список) распознаёт
+    подготовленные одним вызовом. Если общий вызов не удался, страницы
+    распознаются по одной. Для страниц с ошибкой в результате None.
+    """
+    results = [None] * len(page_refs)
+    prepared = {}
+    for index, page_ref in enumerate(page_refs):
+        try:
+            prepared[index] = prepare(page_ref)
+        except Exception as e:
+            logging.error(f"Ошибка при подготовке страницы {page_ref.page_num} файла {page_ref.path} к OCR: {e}")
+    if not prepared:
+        return results
+    try:
+        for index, result in zip(prepared, recognize(list(prepared.values()))):
+            results[index] = result
+        return results
+    except Exception as e:
+        logging.error(f"Ошибка при OCR страниц {page_refs[0].path}, распознаём по одной: {e}")
+    for index, item in prepared.items():
+        try:
+            results[index] = recognize([item])[0]
+        except Exception as e:
+            logging.error(f"Ошибка при OCR страницы {page_refs[index].page_num} файла {page_refs[index].path}: {e}")
+    return results
+
+
+def _ocr_pages_job(page_refs, options):
+    """Распознаёт пачку страниц одним вызовом движка; для каждой страницы текст или None."""
+    def prepare(page_ref):
+        return OCRProcessor.preprocess_image(load_page_image(page_ref), options.preprocess)[0]
+
+    def recognize(images):
+        return [_clean_text(text) for text in get_backend(options.engine).recognize(images, options)]
+
+    return _recognize_batch(page_refs, prepare, recognize)
+
+
+def _recognize_words(images, options):
+    """Распознаёт изображения и возвращает для каждого слова с рамками: (x0, y0, x1, y1, слово).
+
+    Рамки приводятся к координатам исходного изображения, даже если
+    предобработка обрезала, повернула или уменьшила страницу.
+    """
+    processed = [OCRProcessor.preprocess_image(image, options.preprocess) for image in images]
+    pages = get_backend(options.engine).recognize_words([image for image, _ in processed], options)
+    return [[(*map_box(transform, word[:4]), word[4]) for word in words]
+            for (_, transform), words in zip(processed, pages)]
+
+
+def _page_words_in_points(placement, words):
+    # Переводим пиксели рендера или встроенного изображения в пункты страницы
+    if placement is None:
+        return words
+    sx, sy, dx, dy = placement
+    return [(dx + x0 * sx, dy + y0 * sy, dx + x1 * sx, dy + y1 * sy, word) for x0, y0, x1, y1, word in words]
+
+
+def _ocr_pages_words_job(page_refs, options):
+    """Как _ocr_pages_job, но возвращает слова с рамками в пунктах страницы PDF.
+
+    Текст и рамки получаются за один вызов Tesseract по одному рендеру страницы.
+    """
+    def recognize(loaded):
+        pages = _recognize_words([image for image, _ in loaded], options)
+        # У каждой страницы свой масштаб: адаптивный DPI или встроенное изображение скана
+        return [_page_words_in_points(placement, words) for (_, placement), words in zip(loaded, pages)]
+
+    return _recognize_batch(page_refs, load_page, recognize)
+
+
+def _ocr_page_words_job(page_ref, options):
+    return _ocr_pages_words_job([page_ref], options)[0]
+
 
 class OCRProcessor:
     def __init__(self, settings):
         self.settings = settings
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def ocr_options(self):
+        # Настройка параметров Tesseract
+        return OCROptions(
+            resolve_engine(self.settings.ocr_engine),
+            self.settings.ocr_language,
+            self.settings.ocr_psm,
+            self.settings.ocr_oem,
+            self.preprocess_options(),
+        )
+
+    def preprocess_options(self):
+        """Шаги предобработки и целевая высота строчных букв для передачи в рабочий процесс."""
+        return tuple(self.settings.ocr_preprocess), self.settings.ocr_target_x_height
+
+    def batch_size(self):
+        """Сколько страниц отправлять в одной задаче пула для выбранного движка."""
+        return batch_size(self.settings.ocr_engine)
 
     def ocr_image(self, image):
-        try:
-            # Предобработка изображения
-            image = self.preprocess_image(image)
-            # Настройка параметров Tesseract
-            custom_config = f'--oem {self.settings.ocr_oem} --psm {self.settings.ocr_psm}'
-            text = pytesseract.image_to_string(
-                image,
-                lang=self.settings.ocr_language,
-                config=custom_config
-            )
-            return ' '.join(text.split())
-        except Exception as e:
-            logging.error(f"Ошибка при OCR: {e}")
-            return ''
-
-    def preprocess_image(self, image):
-        # Пример предобработки изображения
-        image = image.convert('L')
-        image = image.filter(ImageFilter.MedianFilter())
-        # Дополнительные методы предобработки можно добавить здесь
-        return image
+        return _ocr_job(image, self.ocr_options())
+
+    def submit_page(self, page_ref):
+        """Отправляет в пул ссылку на страницу (PageRef) вместо готового изображения."""
+        return self.get_pool().submit(_ocr_page_job, page_ref, self.ocr_options())
+
+    def submit_pages(self, page_refs):
+        """Отправляет пачку страниц одной задачей; future возвращает список текстов."""
+        return self.get_pool().submit(_ocr_pages_job, list(page_refs), self.ocr_options())
+
+    def submit_page_words(self, page_ref):
+        """Отправляет страницу на OCR с получением рамок слов для текстового слоя."""
+        return self.get_pool().submit(_ocr_page_words_job, page_ref, self.ocr_options())
+
+    def submit_pages_words(self, page_refs):
+        """Пакетный вариант submit_page_words; future возвращает список по страницам."""
+        return self.get_pool().submit(_ocr_pages_words_job, list(page_refs), self.ocr_options())
+
+    def get_pool(self):
+        """Лениво создаёт долгоживущий пул процессов OCR."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=resolve_workers(self.settings.ocr_workers))
+            return self._pool
+
+    def shutdown(self):
+        """Останавливает пул OCR, отменяя ещё не начатые задачи."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    @staticmethod
+    def preprocess_image(image, preprocess_options=None):
+        """Возвращает (подготовленное изображение, матрица в координаты исходного)."""
+        if preprocess_options is None:
+            return preprocess(image)
+        steps, target_x_height = preprocess_options
+        return preprocess(image, steps, target_x_height)
@@ -0,0 +1,228 @@
+"""Фоновый рендер страниц PDF для панели предпросмотра.
+
+Страницы рендерятся в пуле процессов на двух уровнях: миниатюры для
+ленты и быстрой прокрутки и полный размер для просмотра. Готовые пиксели
+(RGB, без сжатия и без промежуточного PPM) лежат в LRU-кэше, ограниченном
+по байтам. Вокруг текущей страницы заранее запрашиваются соседние, а
+запросы, ушедшие далеко от неё при быстрой прокрутке, отменяются.
+Модуль не зависит от tkinter: готовые страницы передаются через callback,
+который вызывается в служебном потоке пула.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from page_source import open_document
+from utils import lazy_import
+
+fitz = lazy_import('fitz')
+
+LEVEL_THUMB = 'thumb'
+LEVEL_FULL = 'full'
+# Разрешение рендера для каждого уровня
+LEVEL_DPI = {LEVEL_THUMB: 20, LEVEL_FULL: 100}
+
+# Сколько страниц в каждую сторону от текущей рендерить заранее
+FULL_PREFETCH = 2
+THUMB_PREFETCH = 12
+PREVIEW_WORKERS = 2
+
+# Документ, открытый в предпросмотре; mtime входит в ключ кэша
+PreviewDocument = namedtuple('PreviewDocument', ['path', 'password', 'page_count', 'mtime'])
+
+
+class RenderedPage(namedtuple('RenderedPage', ['width', 'height', 'samples'])):
+    """Пиксели страницы в RGB, по 3 байта на точку, строки без выравнивания."""
+    __slots__ = ()
+
+    @property
+    def nbytes(self):
+        return len(self.samples)
+
+
+def _document_info_job(path, password):
+    """Число страниц или None, если документ зашифрован и пароль не подошёл."""
+    try:
+        return open_document(path, password).page_count
+    except ValueError:
+        return None
+
+
+def _render_job(path, password, page_num, dpi):
+    page = open_document(path, password).load_page(page_num)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    if pix.stride != pix.width * 3:
+        # Кэш и PhotoImage ждут плотно упакованные строки
+        samples = b''.join(pix.samples[row * pix.stride:row * pix.stride + pix.width * 3]
+                           for row in range(pix.height))
+    else:
+        samples = pix.samples
+    return RenderedPage(pix.width, pix.height, samples)
+
+
+class PixmapCache:
+    """LRU-кэш отрендеренных страниц с ограничением суммарного размера в байтах."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self.lock:
+            page = self._entries.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        with self.lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            # Страница больше всего кэша не кэшируется, чтобы не вытеснить остальные
+            if page.nbytes > self.max_bytes:
+                return
+            self._entries[key] = page
+            self.total_bytes += page.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self._entries), 'size_bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class PageRenderer:
+    def __init__(self, max_bytes, workers=PREVIEW_WORKERS):
+        self.cache = PixmapCache(max_bytes)
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._inflight = {}  # ключ -> (future, [callbacks])
+
+    @staticmethod
+    def page_key(document, page_num, level):
+        return document.path, document.mtime, page_num, level
+
+    def get_pool(self):
+        """Лениво создаёт пул процессов рендера."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def open_document(self, path, password=None):
+        """Future с PreviewDocument или None, если нужен (другой) пароль."""
+        mtime = os.path.getmtime(path)
+        future = self.get_pool().submit(_document_info_job, path, password)
+        result = Future()
+
+        def on_done(done):
+            if done.cancelled():
+                result.cancel()
+            elif done.exception() is not None:
+                result.set_exception(done.exception())
+            else:
+                page_count = done.result()
+                result.set_result(None if page_count is None else PreviewDocument(path, password, page_count, mtime))
+
+        future.add_done_callback(on_done)
+        return result
+
+    def get(self, document, page_num, level):
+        """Страница из кэша или None; рендер не запускает."""
+        return self.cache.get(self.page_key(document, page_num, level))
+
+    def request(self, document, page_num, level, callback=None):
+        """Запрашивает рендер страницы, если её нет в кэше.
+
+        callback(document, page_num, level, page) вызывается в служебном
+        потоке пула после рендера; при ошибке page равен None.
+        """
+        key = self.page_key(document, page_num, level)
+        if key in self.cache:
+            return
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                if callback is not None:
+                    entry[1].append(callback)
+                return
+        future = self.get_pool().submit(_render_job, document.path, document.password, page_num, LEVEL_DPI[level])
+        with self._lock:
+            self._inflight[key] = (future, [callback] if callback is not None else [])
+        future.add_done_callback(lambda done: self._on_rendered(key, document, page_num, level, done))
+
+    def _on_rendered(self, key, document, page_num, level, future):
+        with self._lock:
+            _, callbacks = self._inflight.pop(key, (None, []))
+        if future.cancelled():
+            return
+        page = None
+        if future.exception() is not None:
+            logging.warning(f"Не удалось отрендерить страницу {page_num + 1} файла {document.path}: {future.exception()}")
+        else:
+            page = future.result()
+        if page is not None:
+            self.cache.put(key, page)
+        for callback in callbacks:
+            callback(document, page_num, level, page)
+
+    def prefetch(self, document, center, callback=None):
+        """Запрашивает страницы вокруг center и отменяет далёкие незапущенные запросы.
+
+        Ближайшие страницы ставятся в очередь первыми, а полный размер
+        текущей страницы — раньше всего остального.
+        """
+        full_pages = self._around(document, center, FULL_PREFETCH)
+        thumb_pages = self._around(document, center, THUMB_PREFETCH)
+        wanted = {self.page_key(document, page_num, LEVEL_FULL) for page_num in full_pages}
+        wanted.update(self.page_key(document, page_num, LEVEL_THUMB) for page_num in thumb_pages)
+        with self._lock:
+            stale = [future for key, (future, _) in self._inflight.items() if key not in wanted]
+        for future in stale:
+            future.cancel()
+        self.request(document, center, LEVEL_FULL, callback)
+        for page_num in thumb_pages:
+            self.request(document, page_num, LEVEL_THUMB, callback)
+        for page_num in full_pages[1:]:
+            self.request(document, page_num, LEVEL_FULL, callback)
+
+    @staticmethod
+    def _around(document, center, radius):
+        """Номера страниц в пределах radius от center, по удалённости от неё."""
+        pages = [center]
+        for distance in range(1, radius + 1):
+            pages.extend(page_num for page_num in (center + distance, center - distance)
+                         if 0 <= page_num < document.page_count)
+        return pages
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            self._inflight.clear()
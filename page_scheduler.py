@@ -0,0 +1,98 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+# Как часто проверять отмену, пока ни одна задача не завершилась
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def run_inline(fn, *args):
+    """Выполняет fn в текущем потоке и возвращает завершённый Future."""
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def iter_completed(tasks, submit, max_inflight=None, cancel_event=None):
+    """Генератор пар (ключ, результат) в порядке завершения задач.
+
+    tasks — итерируемое из пар (ключ, аргумент), submit(аргумент) возвращает Future.
+    Одновременно в работе не больше max_inflight задач (None — без ограничения).
+    При установке cancel_event ожидающие задачи отменяются, и генератор
+    завершается, не дожидаясь уже запущенных.
+    """
+    tasks = iter(tasks)
+    pending = {}
+    exhausted = False
+    while True:
+        if cancel_event and cancel_event.is_set():
+            for future in pending:
+                future.cancel()
+            return
+        while not exhausted and (max_inflight is None or len(pending) < max_inflight):
+            try:
+                key, arg = next(tasks)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[submit(arg)] = key
+        if not pending:
+            return
+        done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+
+class ReorderBuffer:
+    """Выдаёт результаты в заданном порядке ключей, придерживая пришедшие раньше срока."""
+
+    def __init__(self, order):
+        self.order = deque(order)
+        self.buffer = {}
+
+    def add(self, key, value):
+        """Добавляет результат и возвращает список готовых пар (ключ, значение) по порядку."""
+        self.buffer[key] = value
+        return self.flush()
+
+    def update(self, items):
+        """Добавляет несколько результатов {ключ: значение} сразу."""
+        self.buffer.update(items)
+        return self.flush()
+
+    def flush(self):
+        ready = []
+        while self.order and self.order[0] in self.buffer:
+            key = self.order.popleft()
+            ready.append((key, self.buffer.pop(key)))
+        return ready
+
+
+class ProgressReporter:
+    """Отправляет в text_queue прогресс, скорость (стр/с) и оценку оставшегося времени."""
+
+    def __init__(self, text_queue, total, done=0):
+        self.text_queue = text_queue
+        self.total = total
+        self.done = done
+        self.initial = done
+        self.started = time.monotonic()
+
+    def advance(self, count=1):
+        self.done += count
+        if not self.text_queue or not self.total:
+            return
+        elapsed = time.monotonic() - self.started
+        # Страницы из кэша не учитываются в скорости, иначе ETA будет занижен
+        processed = self.done - self.initial
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate else None
+        self.text_queue.put(("PROGRESS", int(self.done / self.total * 100), {
+            'done': self.done,
+            'total': self.total,
+            'pages_per_sec': rate,
+            'eta': eta,
+        }))
@@ -0,0 +1,172 @@
+import io
+import os
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+
+from image_preprocessing import estimate_x_height, otsu_threshold
+from utils import lazy_import
+
+fitz = lazy_import('fitz')
+np = lazy_import('numpy')
+
+# Ссылка на страницу для OCR. Через границу процессов передаётся только она,
+# а само изображение создаётся уже в рабочем процессе.
+# page_num=None означает, что path указывает на файл изображения.
+# dpi — число или AdaptiveDPI, если разрешение выбирается для каждой страницы.
+PageRef = namedtuple('PageRef', ['path', 'page_num', 'dpi', 'password'], defaults=(None, None, None))
+
+# Границы разрешения и высота строчных букв в пикселях, к которой оно подбирается
+AdaptiveDPI = namedtuple('AdaptiveDPI', ['min_dpi', 'max_dpi', 'target_x_height'])
+
+# Разрешение пробного рендера для оценки размера шрифта
+PROBE_DPI = 96
+
+# Быстрый путь для сканов: единственное изображение должно занимать
+# не меньше этой доли страницы
+SCAN_MIN_PAGE_COVERAGE = 0.9
+# Форматы встроенных изображений, которые PIL открывает напрямую
+SCAN_IMAGE_FORMATS = {'jpeg', 'jpg', 'png', 'tiff', 'tif', 'bmp', 'pnm', 'jpx'}
+
+
+class PagePlacement(namedtuple('PagePlacement', ['scale_x', 'scale_y', 'offset_x', 'offset_y'])):
+    """Перевод пикселей изображения страницы в пункты: x_pt = offset_x + x * scale_x."""
+    __slots__ = ()
+
+    @classmethod
+    def rendered(cls, dpi):
+        return cls(72 / dpi, 72 / dpi, 0.0, 0.0)
+
+    @property
+    def dpi(self):
+        return 72 / self.scale_x
+
+
+# Сколько документов держать открытыми в одном рабочем процессе
+MAX_OPEN_DOCUMENTS = 4
+
+_open_documents = OrderedDict()
+
+
+def open_document(path, password=None):
+    """Возвращает открытый документ из кэша текущего процесса.
+
+    Ключ включает время изменения файла, чтобы не читать устаревший документ.
+    """
+    key = (path, os.path.getmtime(path), password)
+    doc = _open_documents.get(key)
+    if doc is not None:
+        _open_documents.move_to_end(key)
+        return doc
+    doc = fitz.open(path)
+    if doc.is_encrypted and not doc.authenticate(password or ""):
+        doc.close()
+        raise ValueError("Неверный пароль для PDF-файла.")
+    _open_documents[key] = doc
+    while len(_open_documents) > MAX_OPEN_DOCUMENTS:
+        _, old_doc = _open_documents.popitem(last=False)
+        old_doc.close()
+    return doc
+
+
+def render_page_image(doc, page_num, dpi):
+    """Рендерит одну страницу в полутоновое изображение PIL без промежуточных файлов."""
+    pix = doc.load_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombuffer("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride, 1)
+
+
+def native_image_dpi(page):
+    """Разрешение самого крупного растрового изображения на странице или None.
+
+    Для сканов это разрешение сканера: рендер выше него не добавляет деталей.
+    """
+    best_area, best_dpi = 0, None
+    for image_info in page.get_images(full=True):
+        xref, width_px = image_info[0], image_info[2]
+        for rect in page.get_image_rects(xref):
+            if rect.width <= 0 or rect.area <= best_area:
+                continue
+            best_area, best_dpi = rect.area, width_px * 72 / rect.width
+    return best_dpi
+
+
+def choose_page_dpi(doc, page_num, adaptive):
+    """Подбирает разрешение рендера страницы по оценке высоты строчных букв.
+
+    Высота оценивается по дешёвому пробному рендеру в PROBE_DPI; затем
+    разрешение выбирается так, чтобы буквы получили target_x_height пикселей,
+    но не выше разрешения скана и в пределах [min_dpi, max_dpi].
+    """
+    probe = render_page_image(doc, page_num, PROBE_DPI)
+    gray = np.asarray(probe)
+    x_height = estimate_x_height(gray < otsu_threshold(gray))
+    if not x_height:
+        return adaptive.min_dpi
+    dpi = adaptive.target_x_height * PROBE_DPI / x_height
+    native_dpi = native_image_dpi(doc.load_page(page_num))
+    if native_dpi:
+        dpi = min(dpi, max(native_dpi, adaptive.min_dpi))
+    return int(round(min(max(dpi, adaptive.min_dpi), adaptive.max_dpi)))
+
+
+def extract_scan_image(doc, page_num, max_dpi=None):
+    """Достаёт встроенное изображение страницы-скана без растеризации.
+
+    Срабатывает, только если на неповёрнутой странице без текста одно
+    неповёрнутое изображение без маски прозрачности, закрывающее почти всю
+    страницу. Возвращает (изображение, PagePlacement) или None — тогда
+    страницу нужно рендерить целиком.
+    """
+    page = doc.load_page(page_num)
+    images = page.get_images(full=True)
+    if len(images) != 1 or page.rotation or page.get_text('words'):
+        return None
+    xref, smask = images[0][0], images[0][1]
+    rects = page.get_image_rects(xref, transform=True)
+    if smask or len(rects) != 1:
+        return None
+    rect, matrix = rects[0]
+    # Поворот, отражение или наклон изображения требуют полного рендера
+    if matrix.b or matrix.c or matrix.a <= 0 or matrix.d <= 0:
+        return None
+    if (rect & page.rect).get_area() < page.rect.get_area() * SCAN_MIN_PAGE_COVERAGE:
+        return None
+    info = doc.extract_image(xref)
+    if not info or info.get('ext', '').lower() not in SCAN_IMAGE_FORMATS:
+        return None
+    try:
+        image = Image.open(io.BytesIO(info['image']))
+        native_dpi = image.size[0] * 72 / rect.width
+        if max_dpi and image.format == 'JPEG' and native_dpi > max_dpi:
+            # JPEG декодируется сразу в уменьшенном размере (масштабирование DCT)
+            scale = max_dpi / native_dpi
+            image.draft('L', (int(image.size[0] * scale), int(image.size[1] * scale)))
+        image.load()
+    except Exception:
+        return None
+    width, height = image.size
+    return image, PagePlacement(rect.width / width, rect.height / height, rect.x0, rect.y0)
+
+
+def load_page(page_ref):
+    """Возвращает (изображение, PagePlacement) по ссылке на страницу.
+
+    Для сканов берётся встроенное изображение как есть, остальные страницы
+    рендерятся. Для файла изображения PagePlacement равен None.
+    """
+    if page_ref.page_num is None:
+        return Image.open(page_ref.path), None
+    doc = open_document(page_ref.path, page_ref.password)
+    dpi = page_ref.dpi
+    adaptive = isinstance(dpi, AdaptiveDPI)
+    scan = extract_scan_image(doc, page_ref.page_num, dpi.max_dpi if adaptive else dpi)
+    if scan is not None:
+        return scan
+    if adaptive:
+        dpi = choose_page_dpi(doc, page_ref.page_num, dpi)
+    return render_page_image(doc, page_ref.page_num, dpi), PagePlacement.rendered(dpi)
+
+
+def load_page_image(page_ref):
+    """Создаёт изображение по ссылке на страницу PDF или на файл изображения."""
+    return load_page(page_ref)[0]
@@ -1,105 +1,492 @@
-import fitz
+import json
 import logging
-from pdf2image import convert_from_path
-from utils import validate_file
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+from utils import lazy_import, validate_file, resolve_workers
+from concurrent.futures import ProcessPoolExecutor
 from ocr_processor import OCRProcessor
+from page_scheduler import ProgressReporter, ReorderBuffer, iter_completed, run_inline
+from page_source import AdaptiveDPI, PageRef
+
+# PyMuPDF загружается при первой обработке документа, а не при запуске
+fitz = lazy_import('fitz')
+
+# Режимы обработки PDF
+MODE_TEXT = 'text'
+MODE_OCR = 'ocr'
+MODE_AUTO = 'auto'
+# Ключ кэша для слов OCR с рамками (используется текстовым слоем PDF)
+_CACHE_OCR_WORDS = 'ocr_words'
+# Ключ кэша для аннотаций страницы (JSON-список)
+_CACHE_ANNOTATIONS = 'annotations'
+
+# Документы короче этого порога обрабатываются без пула процессов
+PARALLEL_EXTRACT_MIN_PAGES = 32
+# Число шардов на один процесс: сглаживает неравномерную сложность страниц
+SHARDS_PER_WORKER = 4
+
+
+def split_page_range(pages, shards):
+    """Разбивает непрерывный диапазон страниц на не более чем shards смежных частей."""
+    shards = max(1, min(shards, len(pages)))
+    size, extra = divmod(len(pages), shards)
+    result = []
+    first = pages.start
+    for idx in range(shards):
+        last = first + size + (1 if idx < extra else 0)
+        result.append((first, last))
+        first = last
+    return result
+
+
+def split_page_runs(page_nums, shards):
+    """Разбивает отсортированный список страниц на смежные шарды.
+
+    Каждая непрерывная серия страниц делится пропорционально своей длине,
+    поэтому шард никогда не перескакивает через уже готовые страницы.
+    """
+    runs = []
+    for page_num in page_nums:
+        if runs and runs[-1][1] == page_num:
+            runs[-1][1] = page_num + 1
+        else:
+            runs.append([page_num, page_num + 1])
+    result = []
+    for first, last in runs:
+        run_shards = round(shards * (last - first) / len(page_nums))
+        result.extend(split_page_range(range(first, last), run_shards))
+    return result
+
+
+def page_image_coverage(page):
+    """Доля площади страницы, занятая изображениями (перекрытия не вычитаются)."""
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for image_info in page.get_image_info():
+        bbox = fitz.Rect(image_info['bbox']) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
+
+
+def add_text_layer(page, words, font):
+    """Накладывает на страницу невидимый (render_mode=3) текст по рамкам слов OCR."""
+    if not words:
+        return
+    writer = fitz.TextWriter(page.rect)
+    for x0, y0, x1, y1, word in words:
+        # Рамки получены по отрисованной странице, вставка идёт в неповёрнутых координатах
+        rect = fitz.Rect(x0, y0, x1, y1) * page.derotation_matrix
+        unit_width = font.text_length(word, fontsize=1)
+        if rect.is_empty or not unit_width:
+            continue
+        # Размер шрифта подбирается так, чтобы слово занимало ширину своей рамки
+        font_size = min(rect.width / unit_width, rect.height * 1.5)
+        writer.append((rect.x0, rect.y1 - rect.height * 0.2), word, font=font, fontsize=font_size)
+    writer.write_text(page, render_mode=3)
+
+
+def page_annotations(page, page_num):
+    """Аннотации страницы в виде словарей, пригодных для JSON."""
+    annotations = []
+    for annot in page.annots():
+        annot_info = annot.info
+        annotations.append({
+            'page': page_num + 1,
+            'type': annot.type[1],
+            'content': annot_info.get('content', ''),
+            'subject': annot_info.get('subject', ''),
+            'author': annot_info.get('title', ''),
+            'created': annot_info.get('creationDate', ''),
+            'modified': annot_info.get('modDate', ''),
+            'rect': list(annot.rect),
+        })
+    return annotations
+
+
+def _open_authenticated(pdf_path, password):
+    doc = fitz.open(pdf_path)
+    if doc.is_encrypted and not doc.authenticate(password or ""):
+        doc.close()
+        raise ValueError("Неверный пароль для PDF-файла.")
+    return doc
+
+
+def _extract_page_range(pdf_path, password, first, last, ocr_thresholds=None, with_annotations=False):
+    """Извлекает текст страниц [first, last) через собственный дескриптор документа.
+
+    Выполняется в дочернем процессе, поэтому документ открывается заново:
+    дескриптор fitz нельзя разделять между потоками и процессами.
+    Если переданы ocr_thresholds (мин. число символов, мин. доля изображений),
+    для каждой страницы дополнительно определяется, нужен ли ей OCR.
+    При with_annotations в том же проходе собираются аннотации страниц.
+    Возвращает (first, тексты, флаги OCR или None, аннотации по страницам или None).
+    """
+    doc = _open_authenticated(pdf_path, password)
+    try:
+        texts = []
+        needs_ocr = [] if ocr_thresholds else None
+        annotations = [] if with_annotations else None
+        for page_num in range(first, last):
+            page = doc.load_page(page_num)
+            page_text = ' '.join(page.get_text("text").split())
+            texts.append(page_text)
+            if ocr_thresholds:
+                min_chars, min_coverage = ocr_thresholds
+                # Скан: текстового слоя почти нет, а страница в основном занята картинкой
+                needs_ocr.append(len(page_text) < min_chars and page_image_coverage(page) >= min_coverage)
+            if with_annotations:
+                annotations.append(page_annotations(page, page_num))
+        return first, texts, needs_ocr, annotations
+    finally:
+        doc.close()
+
+
+def _extract_annotation_range(pdf_path, password, first, last):
+    """Собирает аннотации страниц [first, last); возвращает (first, аннотации по страницам)."""
+    doc = _open_authenticated(pdf_path, password)
+    try:
+        return first, [page_annotations(doc.load_page(page_num), page_num) for page_num in range(first, last)]
+    finally:
+        doc.close()
+
 
 class PDFProcessor:
-    def __init__(self, settings):
+    def __init__(self, settings, ocr_processor=None, cache=None):
         self.settings = settings
-        self.ocr_processor = OCRProcessor(settings)
+        self.ocr_processor = ocr_processor or OCRProcessor(settings)
+        self.cache = cache
+        self._extract_pool = None
+        self._pool_lock = threading.Lock()
+
+    def page_mode_key(self, mode):
+        """Параметры, от которых зависит результат для страницы в данном режиме."""
+        if mode in (MODE_OCR, _CACHE_OCR_WORDS):
+            return (mode, self.settings.ocr_language, self.ocr_render_dpi(),
+                    self.settings.ocr_psm, self.settings.ocr_oem,
+                    sorted(self.settings.ocr_preprocess), self.settings.ocr_target_x_height)
+        if mode == _CACHE_ANNOTATIONS:
+            return (mode,)
+        if mode == MODE_AUTO:
+            # Для автоматического режима кэшируется решение, нужен ли странице OCR
+            return ('route', self.settings.auto_ocr_min_chars, self.settings.auto_ocr_min_image_coverage)
+        return ('text',)
 
-    def extract_text(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None):
+    def ocr_render_dpi(self):
+        """Разрешение рендера для OCR: число или AdaptiveDPI в адаптивном режиме."""
+        if self.settings.ocr_dpi_mode == 'adaptive':
+            return AdaptiveDPI(self.settings.ocr_dpi_min, self.settings.ocr_dpi_max, self.settings.ocr_target_x_height)
+        return self.settings.ocr_dpi
+
+    def _page_keys(self, doc_key, mode, pages):
+        """Возвращает {номер страницы: ключ кэша}; пустой словарь, если кэш не используется."""
+        if self.cache is None or doc_key is None:
+            return {}
+        mode_key = self.page_mode_key(mode)
+        return {page_num: self.cache.make_key(doc_key, mode_key, page_num) for page_num in pages}
+
+    def _load_cached_pages(self, page_keys, pages=None):
+        """Возвращает {номер страницы: текст} для страниц, уже лежащих в кэше."""
+        pages = list(page_keys if pages is None else pages)
+        if not page_keys or not pages:
+            return {}
+        found = self.cache.get_many(page_keys[page_num] for page_num in pages)
+        return {page_num: found[page_keys[page_num]] for page_num in pages if page_keys[page_num] in found}
+
+    def _store_pages(self, page_keys, page_texts):
+        if self.cache is not None and page_keys and page_texts:
+            self.cache.put_many({page_keys[page_num]: text for page_num, text in page_texts.items()})
+
+    def _store_annotations(self, annot_keys, first, shard_annotations):
+        if shard_annotations is not None:
+            self._store_pages(annot_keys, {
+                page_num: json.dumps(annotations, ensure_ascii=False)
+                for page_num, annotations in enumerate(shard_annotations, first)
+            })
+
+    @staticmethod
+    def _page_range(pdf_path, start_page, end_page, password):
+        """Проверяет доступ к документу и возвращает диапазон индексов страниц."""
+        doc = fitz.open(pdf_path)
         try:
-            if not validate_file(pdf_path):
-                raise ValueError("Неверный формат файла.")
-            doc = fitz.open(pdf_path)
             if doc.is_encrypted:
                 if not password:
                     password = ""  # Здесь можно добавить запрос пароля у пользователя
                 if not doc.authenticate(password):
                     raise ValueError("Неверный пароль для PDF-файла.")
             total_pages = doc.page_count
+        finally:
+            doc.close()
+        if start_page and end_page:
+            return range(start_page - 1, end_page)
+        return range(total_pages)
 
-            pages = range(total_pages)
-            if start_page and end_page:
-                pages = range(start_page - 1, end_page)
-
-            text = ""
-
-            def extract_page_text(page_num):
-                if cancel_event and cancel_event.is_set():
-                    return page_num, ''
-                page = doc.load_page(page_num)
-                page_text_local = page.get_text("text")
-                page_text_local = ' '.join(page_text_local.split())
-                return page_num, page_text_local
-
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = {executor.submit(extract_page_text, page_num): page_num for page_num in pages}
-                for idx, future in enumerate(futures):
-                    if cancel_event and cancel_event.is_set():
-                        text_queue.put(("CANCELLED", "Операция отменена"))
-                        return
-                    page_num, page_text_local = future.result()
-                    progress = int((idx + 1) / len(pages) * 100)
-                    if text_queue:
-                        text_queue.put(("PROGRESS", progress))
-                    if page_text_local:
-                        text += page_text_local + '\n'
+    @staticmethod
+    def _join_pages(page_chunks, skip_empty):
+        return ''.join(page_text + '\n' for _, page_text in page_chunks if page_text or not skip_empty)
 
-            doc.close()
-            return text
+    def extract_text(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        try:
+            page_chunks = list(self.iter_text(pdf_path, start_page, end_page, password, cancel_event, text_queue, doc_key))
+            if cancel_event and cancel_event.is_set():
+                if text_queue:
+                    text_queue.put(("CANCELLED", "Операция отменена"))
+                return
+            # Текст собирается один раз из готовых страниц
+            return self._join_pages(page_chunks, skip_empty=True)
         except Exception as e:
             logging.error(f"Ошибка при обработке {pdf_path}: {e}")
             return ""
 
-    def convert_pdf_to_text_with_ocr(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None):
+    def iter_text(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        """Генератор пар (индекс страницы, текст) в порядке страниц.
+
+        При установке cancel_event генератор отменяет оставшиеся задачи и
+        завершается; уже извлечённые страницы к этому моменту сохранены в кэше.
+        """
+        if not validate_file(pdf_path):
+            raise ValueError("Неверный формат файла.")
+        pages = self._page_range(pdf_path, start_page, end_page, password)
+        if not pages:
+            return
+
+        # Страницы из кэша не извлекаются повторно, считаются только недостающие
+        page_keys = self._page_keys(doc_key, MODE_TEXT, pages)
+        # Аннотации попутно собираются в том же проходе и кэшируются
+        annot_keys = self._page_keys(doc_key, _CACHE_ANNOTATIONS, pages)
+        page_texts = self._load_cached_pages(page_keys)
+        missing = [page_num for page_num in pages if page_num not in page_texts]
+
+        progress = ProgressReporter(text_queue, len(pages), len(page_texts))
+        reorder = ReorderBuffer(pages)
+        yield from reorder.update(page_texts)
+        # Шарды обрабатываются по мере завершения, а порядок страниц
+        # восстанавливает буфер переупорядочивания
+        shards = self._iter_text_shards(pdf_path, password, missing, cancel_event, with_annotations=bool(annot_keys))
+        for first, shard_texts, _, shard_annotations in shards:
+            new_texts = dict(enumerate(shard_texts, first))
+            self._store_pages(page_keys, new_texts)
+            self._store_annotations(annot_keys, first, shard_annotations)
+            progress.advance(len(new_texts))
+            yield from reorder.update(new_texts)
+
+    def _iter_text_shards(self, pdf_path, password, page_nums, cancel_event, classify=False, with_annotations=False):
+        """Извлекает текст страниц page_nums шардами, выдавая их по мере готовности."""
+        ocr_thresholds = None
+        if classify:
+            ocr_thresholds = (self.settings.auto_ocr_min_chars, self.settings.auto_ocr_min_image_coverage)
+        return self._iter_shards(_extract_page_range, pdf_path, password, page_nums, cancel_event,
+                                 ocr_thresholds, with_annotations)
+
+    def _iter_shards(self, job, pdf_path, password, page_nums, cancel_event, *job_args):
+        """Выполняет job(pdf_path, password, first, last, *job_args) по шардам page_nums."""
+        # Небольшие объёмы дешевле обработать в текущем процессе, по странице
+        # за раз, чтобы отмена срабатывала между страницами
+        workers = resolve_workers(self.settings.extract_workers)
+        if workers == 1 or len(page_nums) < PARALLEL_EXTRACT_MIN_PAGES:
+            shards = split_page_runs(page_nums, len(page_nums))
+            max_inflight = 1
+
+            def submit(shard):
+                return run_inline(job, pdf_path, password, *shard, *job_args)
+        else:
+            shards = split_page_runs(page_nums, workers * SHARDS_PER_WORKER)
+            max_inflight = None
+            executor = self.get_extract_pool()
+
+            def submit(shard):
+                return executor.submit(job, pdf_path, password, *shard, *job_args)
+
+        tasks = ((shard, shard) for shard in shards)
+        for _, result in iter_completed(tasks, submit, max_inflight, cancel_event):
+            yield result
+
+    def _iter_ocr_pages(self, pdf_path, password, page_nums, cancel_event, words=False):
+        """Распознаёт страницы page_nums, выдавая (страница, результат или None) по мере готовности.
+
+        Результат — текст страницы или, при words=True, список слов с рамками.
+        """
+        # В пул уходят только ссылки на страницы: рендер выполняется в рабочем
+        # процессе, а очередь ограничена ocr_max_inflight задачами
+        max_inflight = resolve_workers(self.settings.ocr_max_inflight)
+        dpi = self.ocr_render_dpi()
+        batch_size = self.ocr_processor.batch_size()
+        if batch_size <= 1:
+            submit = self.ocr_processor.submit_page_words if words else self.ocr_processor.submit_page
+            tasks = ((page_num, PageRef(pdf_path, page_num, dpi, password)) for page_num in page_nums)
+            yield from iter_completed(tasks, submit, max_inflight, cancel_event)
+            return
+
+        # Пакетный движок: одна задача на несколько страниц, чтобы tesseract
+        # загружал языковые модели один раз на пачку
+        submit = self.ocr_processor.submit_pages_words if words else self.ocr_processor.submit_pages
+        batches = [page_nums[i:i + batch_size] for i in range(0, len(page_nums), batch_size)]
+        tasks = ((tuple(batch), [PageRef(pdf_path, page_num, dpi, password) for page_num in batch])
+                 for batch in batches)
+        for batch, results in iter_completed(tasks, submit, max_inflight, cancel_event):
+            yield from zip(batch, results)
+
+    def get_extract_pool(self):
+        """Лениво создаёт пул процессов для извлечения текста."""
+        with self._pool_lock:
+            if self._extract_pool is None:
+                self._extract_pool = ProcessPoolExecutor(max_workers=resolve_workers(self.settings.extract_workers))
+            return self._extract_pool
+
+    def shutdown(self):
+        """Останавливает пулы процессов обработчика."""
+        with self._pool_lock:
+            if self._extract_pool is not None:
+                self._extract_pool.shutdown(wait=False, cancel_futures=True)
+                self._extract_pool = None
+        self.ocr_processor.shutdown()
+
+    def convert_pdf_to_text_with_ocr(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
         try:
-            images = convert_from_path(
-                pdf_path,
-                dpi=self.settings.ocr_dpi,
-                first_page=start_page,
-                last_page=end_page,
-                userpw=password
-            )
-            total_pages = len(images)
-            text = ""
-
-            with ProcessPoolExecutor(max_workers=2) as executor:
-                futures = [executor.submit(self.ocr_processor.ocr_image, img) for img in images]
-                for idx, future in enumerate(futures):
-                    if cancel_event and cancel_event.is_set():
-                        text_queue.put(("CANCELLED", "Операция отменена"))
-                        return
-                    img_text = future.result()
-                    progress = int((idx + 1) / total_pages * 100)
-                    if text_queue:
-                        text_queue.put(("PROGRESS", progress))
-                    text += img_text + '\n'
-
-            return text
+            page_chunks = list(self.iter_ocr_text(pdf_path, start_page, end_page, password, cancel_event, text_queue, doc_key))
+            if cancel_event and cancel_event.is_set():
+                if text_queue:
+                    text_queue.put(("CANCELLED", "Операция отменена"))
+                return
+            return self._join_pages(page_chunks, skip_empty=False)
         except Exception as e:
             logging.error(f"Ошибка при обработке {pdf_path} с OCR: {e}")
             return ""
 
-    def extract_annotations(self, pdf_path):
-        annotations = []
+    def iter_ocr_text(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        """Генератор пар (индекс страницы, распознанный текст) в порядке страниц."""
+        pages = self._page_range(pdf_path, start_page, end_page, password)
+        page_keys = self._page_keys(doc_key, MODE_OCR, pages)
+        page_texts = self._load_cached_pages(page_keys)
+        missing = [page_num for page_num in pages if page_num not in page_texts]
+        progress = ProgressReporter(text_queue, len(pages), len(page_texts))
+        reorder = ReorderBuffer(pages)
+        yield from reorder.update(page_texts)
+
+        for page_num, img_text in self._iter_ocr_pages(pdf_path, password, missing, cancel_event):
+            # None означает ошибку OCR: такую страницу не кэшируем
+            if img_text is not None:
+                self._store_pages(page_keys, {page_num: img_text})
+            progress.advance()
+            yield from reorder.add(page_num, img_text or '')
+
+    def iter_auto_text(self, pdf_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        """Генератор (страница, текст), где OCR выполняется только для страниц-сканов.
+
+        Сначала один проход fitz извлекает текстовый слой и оценивает долю
+        изображений на странице; затем в пул OCR уходят лишь страницы без
+        текста, занятые картинкой. Решение по странице кэшируется.
+        """
+        pages = self._page_range(pdf_path, start_page, end_page, password)
+        route_keys = self._page_keys(doc_key, MODE_AUTO, pages)
+        text_keys = self._page_keys(doc_key, MODE_TEXT, pages)
+        ocr_keys = self._page_keys(doc_key, MODE_OCR, pages)
+        annot_keys = self._page_keys(doc_key, _CACHE_ANNOTATIONS, pages)
+        routes = self._load_cached_pages(route_keys)
+        text_pages = self._load_cached_pages(text_keys, [page_num for page_num in pages if routes.get(page_num) == MODE_TEXT])
+        ocr_pages = self._load_cached_pages(ocr_keys, [page_num for page_num in pages if routes.get(page_num) == MODE_OCR])
+        page_texts = {**text_pages, **ocr_pages}
+        progress = ProgressReporter(text_queue, len(pages), len(page_texts))
+        reorder = ReorderBuffer(pages)
+        yield from reorder.update(page_texts)
+
+        # Страницы-сканы с уже известным маршрутом сразу идут на OCR
+        to_ocr = [page_num for page_num in pages if routes.get(page_num) == MODE_OCR and page_num not in ocr_pages]
+        unclassified = [page_num for page_num in pages if page_num not in page_texts and routes.get(page_num) != MODE_OCR]
+
+        shards = self._iter_text_shards(pdf_path, password, unclassified, cancel_event, classify=True,
+                                        with_annotations=bool(annot_keys))
+        for first, shard_texts, needs_ocr, shard_annotations in shards:
+            self._store_annotations(annot_keys, first, shard_annotations)
+            new_texts = {}
+            new_routes = {}
+            for page_num, page_text, page_needs_ocr in zip(range(first, first + len(shard_texts)), shard_texts, needs_ocr):
+                new_routes[page_num] = MODE_OCR if page_needs_ocr else MODE_TEXT
+                if page_needs_ocr:
+                    to_ocr.append(page_num)
+                else:
+                    new_texts[page_num] = page_text
+            self._store_pages(text_keys, new_texts)
+            self._store_pages(route_keys, new_routes)
+            progress.advance(len(new_texts))
+            yield from reorder.update(new_texts)
+        if cancel_event and cancel_event.is_set():
+            return
+
+        for page_num, img_text in self._iter_ocr_pages(pdf_path, password, sorted(to_ocr), cancel_event):
+            if img_text is not None:
+                self._store_pages(ocr_keys, {page_num: img_text})
+            progress.advance()
+            yield from reorder.add(page_num, img_text or '')
+
+    def iter_pages(self, pdf_path, mode=MODE_TEXT, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        """Выбирает генератор страниц по режиму: MODE_TEXT, MODE_OCR или MODE_AUTO."""
+        iterators = {
+            MODE_TEXT: self.iter_text,
+            MODE_OCR: self.iter_ocr_text,
+            MODE_AUTO: self.iter_auto_text,
+        }
+        if mode not in iterators:
+            raise ValueError(f"Неизвестный режим обработки: {mode}")
+        return iterators[mode](pdf_path, start_page, end_page, password, cancel_event, text_queue, doc_key)
+
+    def make_searchable_pdf(self, pdf_path, output_path, start_page=None, end_page=None, password=None, cancel_event=None, text_queue=None, doc_key=None):
+        """Сохраняет копию PDF с невидимым текстовым слоем из OCR.
+
+        Каждая страница распознаётся один раз: из одного рендера получаются и
+        рамки слов для текстового слоя, и текст, который попадает в кэш OCR.
+        Возвращает False, если операция была отменена.
+        """
+        pages = self._page_range(pdf_path, start_page, end_page, password)
+        word_keys = self._page_keys(doc_key, _CACHE_OCR_WORDS, pages)
+        text_keys = self._page_keys(doc_key, MODE_OCR, pages)
+        page_words = {page_num: json.loads(words) for page_num, words in self._load_cached_pages(word_keys).items()}
+        missing = [page_num for page_num in pages if page_num not in page_words]
+        progress = ProgressReporter(text_queue, len(pages), len(page_words))
+
+        for page_num, words in self._iter_ocr_pages(pdf_path, password, missing, cancel_event, words=True):
+            progress.advance()
+            if words is None:
+                page_words[page_num] = []
+                continue
+            page_words[page_num] = words
+            self._store_pages(word_keys, {page_num: json.dumps(words, ensure_ascii=False)})
+            self._store_pages(text_keys, {page_num: ' '.join(word[4] for word in words)})
+        if cancel_event and cancel_event.is_set():
+            return False
+
+        doc = fitz.open(pdf_path)
         try:
-            doc = fitz.open(pdf_path)
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                annot = page.first_annot
-                while annot:
-                    annot_info = annot.info
-                    annotations.append({
-                        'page': page_num + 1,
-                        'content': annot_info.get('content', ''),
-                        'type': annot_info.get('type', ''),
-                    })
-                    annot = annot.next
+            if doc.is_encrypted and not doc.authenticate(password or ""):
+                raise ValueError("Неверный пароль для PDF-файла.")
+            font = fitz.Font('helv')
+            for page_num in pages:
+                add_text_layer(doc.load_page(page_num), page_words[page_num], font)
+            doc.save(output_path, garbage=3, deflate=True)
+        finally:
             doc.close()
+        return True
+
+    def extract_annotations(self, pdf_path, password=None, cancel_event=None, doc_key=None):
+        """Возвращает аннотации документа по порядку страниц.
+
+        Каждая аннотация — словарь с номером страницы, типом, текстом,
+        темой, автором, датами создания и изменения и рамкой (x0, y0, x1, y1).
+        Аннотации кэшируются по страницам; страницы, которые уже прошли
+        извлечение текста, повторно не сканируются. Для больших документов
+        недостающие страницы обрабатываются шардами в пуле процессов.
+        """
+        try:
+            pages = self._page_range(pdf_path, None, None, password)
+            annot_keys = self._page_keys(doc_key, _CACHE_ANNOTATIONS, pages)
+            page_annots = {page_num: json.loads(annots) for page_num, annots in self._load_cached_pages(annot_keys).items()}
+            missing = [page_num for page_num in pages if page_num not in page_annots]
+            for first, shard_annotations in self._iter_shards(_extract_annotation_range, pdf_path, password, missing, cancel_event):
+                self._store_annotations(annot_keys, first, shard_annotations)
+                page_annots.update(enumerate(shard_annotations, first))
+            return [annot for page_num in pages for annot in page_annots.get(page_num, [])]
         except Exception as e:
             logging.error(f"Ошибка при извлечении аннотаций из {pdf_path}: {e}")
-        return annotations
+            return []
@@ -0,0 +1,195 @@
+"""Панель предпросмотра страниц PDF поверх PageRenderer.
+
+Сразу показывается то, что уже есть в кэше: полная страница или
+растянутая миниатюра, пока полная рендерится в фоне. Лента миниатюр
+под страницей показывает соседние страницы. При быстрой прокрутке
+(колесо, ползунок) полный рендер запрашивается только после паузы, а
+миниатюры — сразу.
+"""
+import queue
+import tkinter as tk
+from tkinter import ttk
+
+from PIL import Image, ImageTk
+
+from page_renderer import LEVEL_DPI, LEVEL_FULL, LEVEL_THUMB
+
+# Миниатюр в ленте (нечётное число: текущая страница посередине)
+STRIP_THUMBS = 7
+# Пауза в прокрутке, после которой запрашивается рендер вокруг страницы, мс
+SETTLE_DELAY_MS = 120
+# Период опроса очереди готовых страниц, мс
+POLL_INTERVAL_MS = 30
+# Во сколько раз полная страница крупнее миниатюры
+THUMB_UPSCALE = LEVEL_DPI[LEVEL_FULL] / LEVEL_DPI[LEVEL_THUMB]
+
+
+def to_photo(page, size=None):
+    """PhotoImage прямо из пикселей страницы: без кодирования в PPM/PNG."""
+    image = Image.frombuffer('RGB', (page.width, page.height), page.samples, 'raw', 'RGB', 0, 1)
+    if size is not None and size != image.size:
+        image = image.resize(size, Image.BILINEAR)
+    return ImageTk.PhotoImage(image)
+
+
+class PreviewPane(ttk.Frame):
+    def __init__(self, master, renderer, document):
+        super().__init__(master)
+        self.renderer = renderer
+        self.document = document
+        self.page_num = 0
+        self._ready = queue.Queue()  # Страницы, дорендеренные в фоне
+        self._settle_job = None
+        self._poll_job = None
+        self._photo = None
+        self._thumb_photos = [None] * STRIP_THUMBS
+
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X)
+        ttk.Button(toolbar, text='◀', width=3, command=lambda: self.show_page(self.page_num - 1)).pack(side=tk.LEFT)
+        ttk.Button(toolbar, text='▶', width=3, command=lambda: self.show_page(self.page_num + 1)).pack(side=tk.LEFT)
+        self.page_label = ttk.Label(toolbar)
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        self.slider = ttk.Scale(toolbar, from_=0, to=max(document.page_count - 1, 0), orient=tk.HORIZONTAL,
+                                command=self._on_slider)
+        self.slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        canvas_frame = ttk.Frame(self)
+        canvas_frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(canvas_frame, background='gray70', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._image_item = self.canvas.create_image(0, 0, anchor='n')
+
+        strip = ttk.Frame(self)
+        strip.pack(fill=tk.X)
+        self._thumb_labels = []
+        for slot in range(STRIP_THUMBS):
+            label = ttk.Label(strip, anchor='center', relief=tk.FLAT)
+            label.pack(side=tk.LEFT, expand=True, padx=2, pady=2)
+            label.bind('<Button-1>', lambda _event, offset=slot - STRIP_THUMBS // 2: self.show_page(self.page_num + offset))
+            self._thumb_labels.append(label)
+
+        for widget in (self.canvas, strip):
+            widget.bind('<MouseWheel>', self._on_wheel)
+            widget.bind('<Button-4>', lambda _event: self.show_page(self.page_num - 1))
+            widget.bind('<Button-5>', lambda _event: self.show_page(self.page_num + 1))
+        self.canvas.bind('<Configure>', lambda _event: self._place_image())
+        self._bind_keys(master)
+        self.bind('<Destroy>', self._on_destroy)
+        self._poll_job = self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _bind_keys(self, window):
+        window.bind('<Prior>', lambda _event: self.show_page(self.page_num - 1))
+        window.bind('<Next>', lambda _event: self.show_page(self.page_num + 1))
+        window.bind('<Home>', lambda _event: self.show_page(0))
+        window.bind('<End>', lambda _event: self.show_page(self.document.page_count - 1))
+
+    # Навигация
+
+    def show_page(self, page_num, settle_delay=0):
+        """Показывает страницу из кэша и запрашивает недостающее.
+
+        С settle_delay рендер вокруг страницы откладывается, пока прокрутка
+        не остановится, чтобы пул не занимался страницами, которые уже пролистали.
+        """
+        page_num = min(max(page_num, 0), self.document.page_count - 1)
+        self.page_num = page_num
+        self.page_label.configure(text=f'{page_num + 1} / {self.document.page_count}')
+        if int(float(self.slider.get())) != page_num:
+            self.slider.set(page_num)
+        self._draw_page()
+        self.canvas.yview_moveto(0)
+        self._draw_strip()
+        if self._settle_job is not None:
+            self.after_cancel(self._settle_job)
+            self._settle_job = None
+        # Миниатюра текущей страницы нужна сразу, даже посреди прокрутки
+        self.renderer.request(self.document, page_num, LEVEL_THUMB, self._on_rendered)
+        if settle_delay:
+            self._settle_job = self.after(settle_delay, self._prefetch)
+        else:
+            self._prefetch()
+
+    def _prefetch(self):
+        self._settle_job = None
+        self.renderer.prefetch(self.document, self.page_num, self._on_rendered)
+
+    def _on_slider(self, value):
+        page_num = int(float(value))
+        if page_num != self.page_num:
+            self.show_page(page_num, SETTLE_DELAY_MS)
+
+    def _on_wheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        self.show_page(self.page_num + step, SETTLE_DELAY_MS)
+
+    # Отрисовка
+
+    def _draw_page(self):
+        full = self.renderer.get(self.document, self.page_num, LEVEL_FULL)
+        if full is not None:
+            self._photo = to_photo(full)
+        else:
+            thumb = self.renderer.get(self.document, self.page_num, LEVEL_THUMB)
+            if thumb is None:
+                self._photo = None
+            else:
+                # Растянутая миниатюра того же размера, что и полная страница
+                self._photo = to_photo(thumb, (round(thumb.width * THUMB_UPSCALE), round(thumb.height * THUMB_UPSCALE)))
+        self.canvas.itemconfigure(self._image_item, image=self._photo or '')
+        self._place_image()
+
+    def _place_image(self):
+        width = self.canvas.winfo_width()
+        self.canvas.coords(self._image_item, width // 2, 0)
+        height = self._photo.height() if self._photo is not None else 0
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+    def _draw_strip(self):
+        for slot, label in enumerate(self._thumb_labels):
+            page_num = self.page_num + slot - STRIP_THUMBS // 2
+            thumb = None
+            if 0 <= page_num < self.document.page_count:
+                thumb = self.renderer.get(self.document, page_num, LEVEL_THUMB)
+            self._thumb_photos[slot] = to_photo(thumb) if thumb is not None else None
+            text = str(page_num + 1) if 0 <= page_num < self.document.page_count else ''
+            label.configure(image=self._thumb_photos[slot] or '', text=text, compound=tk.TOP,
+                            relief=tk.SOLID if page_num == self.page_num else tk.FLAT)
+
+    # Готовые страницы
+
+    def _on_rendered(self, document, page_num, level, page):
+        # Вызывается в потоке пула: виджеты трогать нельзя, только очередь
+        if page is not None:
+            self._ready.put((document, page_num, level))
+
+    def _poll(self):
+        redraw_page = redraw_strip = False
+        try:
+            while True:
+                document, page_num, level = self._ready.get_nowait()
+                if document != self.document:
+                    continue
+                offset = page_num - self.page_num
+                if offset == 0:
+                    redraw_page = True
+                if level == LEVEL_THUMB and abs(offset) <= STRIP_THUMBS // 2:
+                    redraw_strip = True
+        except queue.Empty:
+            pass
+        if redraw_page:
+            self._draw_page()
+        if redraw_strip:
+            self._draw_strip()
+        self._poll_job = self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return
+        for job in (self._poll_job, self._settle_job):
+            if job is not None:
+                self.after_cancel(job)
+        self._poll_job = self._settle_job = None
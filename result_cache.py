@@ -0,0 +1,139 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResultCache:
+    """Дисковый кэш результатов обработки на SQLite.
+
+    Значения хранятся сжатыми zlib и адресуются хэшем от составного ключа.
+    При превышении max_bytes вытесняются давно не использованные записи (LRU).
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(*parts):
+        """Строит ключ кэша из произвольных JSON-сериализуемых частей."""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Возвращает сохранённый текст или None, если записи нет."""
+        with self.lock:
+            row = self.conn.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.conn:
+                self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def get_many(self, keys):
+        """Возвращает словарь {ключ: текст} только для найденных записей."""
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            # SQLite ограничивает число параметров в запросе, поэтому читаем пачками
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, payload FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            if found:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE entries SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+        return {key: zlib.decompress(payload).decode('utf-8') for key, payload in found.items()}
+
+    def put(self, key, text):
+        self.put_many({key: text})
+
+    def put_many(self, items):
+        """Сохраняет несколько записей {ключ: текст} в одной транзакции."""
+        payloads = [(key, zlib.compress(text.encode('utf-8'))) for key, text in items.items()]
+        with self.lock:
+            with self.conn:
+                now = time.time()
+                for key, payload in payloads:
+                    row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self.total_bytes -= row[0]
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                        (key, payload, len(payload), now)
+                    )
+                    self.total_bytes += len(payload)
+                self._evict()
+
+    def _evict(self):
+        # Вызывается под self.lock внутри транзакции
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.total_bytes -= size
+
+    def stats(self):
+        """Возвращает статистику попаданий и занимаемого места."""
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'size_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self.lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Ошибка при закрытии кэша {self.path}: {e}")
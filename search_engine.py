@@ -0,0 +1,148 @@
+"""Поиск и замена по TextStore без участия виджета.
+
+SearchEngine строит отсортированный индекс совпадений (строка, начало,
+конец) порциями: интерфейс может достраивать его в фоне по тактам Tk и
+показывать растущий счётчик, а навигация и подсветка видимой части
+используют бинарный поиск по уже построенной части индекса и сами его не
+достраивают, чтобы не останавливать интерфейс. Добавление страниц в хранилище
+продолжает индексацию с места остановки; очистка или замена текста
+сбрасывают индекс.
+"""
+import bisect
+import re
+
+# Сколько строк индексировать за один вызов index_step()
+INDEX_STEP_LINES = 2000
+
+# Ответ навигации, когда нужная часть индекса ещё не построена:
+# переход повторяют после следующих index_step()
+PENDING = object()
+
+
+class SearchEngine:
+    def __init__(self, store):
+        self.store = store
+        self.regex = None
+        self.literal = True
+        self.matches = []  # (строка, начало, конец) в порядке следования
+        self._indexed_lines = 0
+        self._generation = None
+
+    def set_query(self, pattern, regex=False, case_sensitive=False):
+        """Задаёт запрос; при ошибке в регулярном выражении бросает re.error."""
+        self.regex = None
+        self.literal = not regex
+        if pattern:
+            flags = 0 if case_sensitive else re.IGNORECASE
+            self.regex = re.compile(pattern if regex else re.escape(pattern), flags)
+        self._reset()
+
+    def _reset(self):
+        self.matches = []
+        self._indexed_lines = 0
+        self._generation = self.store.generation
+
+    def _sync(self):
+        # Текст, по которому строился индекс, изменился — индекс недействителен
+        if self._generation != self.store.generation:
+            self._reset()
+
+    @property
+    def is_complete(self):
+        self._sync()
+        return self.regex is None or self._indexed_lines >= self.store.line_count
+
+    @property
+    def count(self):
+        return len(self.matches)
+
+    @property
+    def indexed_lines(self):
+        """Сколько строк с начала текста уже проиндексировано."""
+        self._sync()
+        return self._indexed_lines
+
+    def index_step(self, max_lines=INDEX_STEP_LINES):
+        """Индексирует следующие max_lines строк; возвращает True, если индекс полон."""
+        self._sync()
+        if self.regex is None:
+            return True
+        return self._index_until(self._indexed_lines + max_lines)
+
+    def _index_until(self, end_line):
+        end_line = min(end_line, self.store.line_count)
+        for line_num, line in self.store.iter_lines(self._indexed_lines):
+            if line_num >= end_line:
+                break
+            for match in self.regex.finditer(line):
+                # Пустые совпадения (например, '^') не подсвечиваются и не нумеруются
+                if match.end() > match.start():
+                    self.matches.append((line_num, match.start(), match.end()))
+        self._indexed_lines = max(self._indexed_lines, end_line)
+        return self._indexed_lines >= self.store.line_count
+
+    def matches_in_range(self, start_line, end_line):
+        """Уже найденные совпадения в строках [start_line, end_line).
+
+        Индекс здесь не достраивается: строки дальше indexed_lines
+        догоняет index_step в фоне, иначе переход в конец большого
+        текста остановил бы интерфейс до конца индексации.
+        """
+        self._sync()
+        if self.regex is None:
+            return []
+        first = bisect.bisect_left(self.matches, (start_line,))
+        last = bisect.bisect_left(self.matches, (end_line,))
+        return self.matches[first:last]
+
+    def find_next(self, line, col):
+        """Первое совпадение, начинающееся строго после (line, col); по кругу.
+
+        None — совпадений нет, PENDING — индекс ещё не дошёл до ответа.
+        """
+        self._sync()
+        if self.regex is None:
+            return None
+        position = bisect.bisect_right(self.matches, (line, col, float('inf')))
+        if position < len(self.matches):
+            return self.matches[position]
+        # Следующее совпадение может оказаться в непроиндексированном хвосте
+        if not self.is_complete:
+            return PENDING
+        return self.matches[0] if self.matches else None
+
+    def find_previous(self, line, col):
+        """Последнее совпадение, начинающееся строго до (line, col); по кругу.
+
+        None — совпадений нет, PENDING — индекс ещё не дошёл до ответа.
+        """
+        self._sync()
+        if self.regex is None:
+            return None
+        if self._indexed_lines < min(line + 1, self.store.line_count):
+            return PENDING
+        position = bisect.bisect_left(self.matches, (line, col)) - 1
+        if position >= 0:
+            return self.matches[position]
+        # Переход через начало текста требует полного индекса
+        if not self.is_complete:
+            return PENDING
+        return self.matches[-1] if self.matches else None
+
+    def match_number(self, match):
+        """Порядковый номер совпадения (с 1) в уже построенном индексе."""
+        return bisect.bisect_left(self.matches, match) + 1
+
+    def replace_all(self, replacement):
+        """Заменяет все совпадения за один проход по хранилищу.
+
+        В режиме регулярных выражений replacement может ссылаться на группы
+        (\\1, \\g<name>). Возвращает (число замен, первая изменённая строка или None).
+        """
+        if self.regex is None:
+            return 0, None
+        if self.literal:
+            # Без режима регулярных выражений строка замены вставляется как есть
+            text = replacement
+            replacement = lambda _: text  # noqa: E731
+        return self.store.substitute(self.regex, replacement)
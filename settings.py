@@ -1,6 +1,5 @@
 import json
 import os
-from cryptography.fernet import Fernet
 
 class Settings:
     def __init__(self):
@@ -10,18 +9,39 @@ class Settings:
         self.font_size = 12
         self.ocr_language = 'rus+eng'
         self.ocr_dpi = 200
+        # fixed — всегда ocr_dpi; adaptive — разрешение подбирается по размеру шрифта страницы
+        self.ocr_dpi_mode = 'fixed'
+        self.ocr_dpi_min = 150
+        self.ocr_dpi_max = 400
         self.ocr_psm = '1'
         self.ocr_oem = '3'
         self.ocr_engine = 'tesseract'
+        # Шаги предобработки страниц перед OCR (см. image_preprocessing.PREPROCESS_STEPS)
+        self.ocr_preprocess = ['crop', 'deskew', 'scale', 'otsu']
+        self.ocr_target_x_height = 20  # Страницы с более крупным шрифтом уменьшаются
+        self.ocr_max_inflight = 4  # Страниц, одновременно ожидающих OCR
+        self.ocr_workers = 0  # 0 — по числу ядер процессора
+        # Автоматический режим: OCR для страниц почти без текста, занятых изображением
+        self.auto_ocr_min_chars = 20
+        self.auto_ocr_min_image_coverage = 0.5
         self.theme = 'flatly'
         self.language = 'ru'
         self.export_quality = 90
         self.export_compression = 'medium'
+        self.extract_workers = 0  # 0 — по числу ядер процессора
+        self.cache_file = os.path.join('cache', 'results.sqlite')
+        self.cache_max_mb = 512
+        self.preview_cache_mb = 256  # Кэш отрендеренных страниц предпросмотра в памяти
+        # Полнотекстовый индекс по всем сконвертированным документам
+        self.corpus_index_enabled = True
+        self.corpus_index_file = os.path.join('cache', 'corpus.sqlite')
+        self.fingerprint_mode = 'quick'  # quick, full или pdf_id
         self.hotkeys = {
             'open_file': '<Control-o>',
             'save_file': '<Control-s>',
             'search_text': '<Control-f>',
             'quit': '<Control-q>',
+            'goto_page': '<Control-g>',
         }
         self.api_keys = {}  # Хранение зашифрованных API ключей
         self.load_settings()
@@ -34,14 +54,31 @@ class Settings:
                 self.font_size = settings.get('font_size', self.font_size)
                 self.ocr_language = settings.get('ocr_language', self.ocr_language)
                 self.ocr_dpi = settings.get('ocr_dpi', self.ocr_dpi)
+                self.ocr_dpi_mode = settings.get('ocr_dpi_mode', self.ocr_dpi_mode)
+                self.ocr_dpi_min = settings.get('ocr_dpi_min', self.ocr_dpi_min)
+                self.ocr_dpi_max = settings.get('ocr_dpi_max', self.ocr_dpi_max)
                 self.ocr_psm = settings.get('ocr_psm', self.ocr_psm)
                 self.ocr_oem = settings.get('ocr_oem', self.ocr_oem)
                 self.ocr_engine = settings.get('ocr_engine', self.ocr_engine)
+                self.ocr_preprocess = settings.get('ocr_preprocess', self.ocr_preprocess)
+                self.ocr_target_x_height = settings.get('ocr_target_x_height', self.ocr_target_x_height)
+                self.ocr_max_inflight = settings.get('ocr_max_inflight', self.ocr_max_inflight)
+                self.ocr_workers = settings.get('ocr_workers', self.ocr_workers)
+                self.auto_ocr_min_chars = settings.get('auto_ocr_min_chars', self.auto_ocr_min_chars)
+                self.auto_ocr_min_image_coverage = settings.get('auto_ocr_min_image_coverage', self.auto_ocr_min_image_coverage)
                 self.theme = settings.get('theme', self.theme)
                 self.language = settings.get('language', self.language)
                 self.export_quality = settings.get('export_quality', self.export_quality)
                 self.export_compression = settings.get('export_compression', self.export_compression)
-                self.hotkeys = settings.get('hotkeys', self.hotkeys)
+                self.extract_workers = settings.get('extract_workers', self.extract_workers)
+                self.cache_file = settings.get('cache_file', self.cache_file)
+                self.cache_max_mb = settings.get('cache_max_mb', self.cache_max_mb)
+                self.preview_cache_mb = settings.get('preview_cache_mb', self.preview_cache_mb)
+                self.corpus_index_enabled = settings.get('corpus_index_enabled', self.corpus_index_enabled)
+                self.corpus_index_file = settings.get('corpus_index_file', self.corpus_index_file)
+                self.fingerprint_mode = settings.get('fingerprint_mode', self.fingerprint_mode)
+                # Новые горячие клавиши получают значения по умолчанию, если их нет в файле
+                self.hotkeys = {**self.hotkeys, **settings.get('hotkeys', {})}
                 self.api_keys = settings.get('api_keys', self.api_keys)
                 # Расшифровка API ключей
                 self.decrypt_api_keys()
@@ -54,13 +91,29 @@ class Settings:
             'font_size': self.font_size,
             'ocr_language': self.ocr_language,
             'ocr_dpi': self.ocr_dpi,
+            'ocr_dpi_mode': self.ocr_dpi_mode,
+            'ocr_dpi_min': self.ocr_dpi_min,
+            'ocr_dpi_max': self.ocr_dpi_max,
             'ocr_psm': self.ocr_psm,
             'ocr_oem': self.ocr_oem,
             'ocr_engine': self.ocr_engine,
+            'ocr_preprocess': self.ocr_preprocess,
+            'ocr_target_x_height': self.ocr_target_x_height,
+            'ocr_max_inflight': self.ocr_max_inflight,
+            'ocr_workers': self.ocr_workers,
+            'auto_ocr_min_chars': self.auto_ocr_min_chars,
+            'auto_ocr_min_image_coverage': self.auto_ocr_min_image_coverage,
             'theme': self.theme,
             'language': self.language,
             'export_quality': self.export_quality,
             'export_compression': self.export_compression,
+            'extract_workers': self.extract_workers,
+            'cache_file': self.cache_file,
+            'cache_max_mb': self.cache_max_mb,
+            'preview_cache_mb': self.preview_cache_mb,
+            'corpus_index_enabled': self.corpus_index_enabled,
+            'corpus_index_file': self.corpus_index_file,
+            'fingerprint_mode': self.fingerprint_mode,
             'hotkeys': self.hotkeys,
             'api_keys': self.api_keys,
         }
@@ -82,6 +135,11 @@ class Settings:
         return []
 
     def encrypt_api_keys(self):
+        # cryptography нужна только при наличии ключей — без них запуск её не загружает
+        if not self.api_keys:
+            return
+        from cryptography.fernet import Fernet
+
         key = self.get_encryption_key()
         fernet = Fernet(key)
         for service, api_key in self.api_keys.items():
@@ -90,6 +148,10 @@ class Settings:
                 self.api_keys[service] = encrypted_key
 
     def decrypt_api_keys(self):
+        if not self.api_keys:
+            return
+        from cryptography.fernet import Fernet
+
         key = self.get_encryption_key()
         fernet = Fernet(key)
         for service, api_key in self.api_keys.items():
@@ -103,6 +165,8 @@ class Settings:
             with open(key_file, 'rb') as f:
                 key = f.read()
         else:
+            from cryptography.fernet import Fernet
+
             key = Fernet.generate_key()
             with open(key_file, 'wb') as f:
                 f.write(key)
@@ -1,46 +1,204 @@
-import threading
+import itertools
+import logging
 import queue
+import threading
+
+# Меньшее значение — более высокий приоритет
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+PRIORITY_BACKGROUND = 20
+
+# Приоритет служебной задачи остановки: выше любых пользовательских
+_PRIORITY_STOP = -1
+
+
+class TaskHandle:
+    """Дескриптор поставленной задачи: позволяет отменить её и дождаться завершения."""
+
+    def __init__(self, batch=None):
+        self.batch = batch
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+
+    def cancel(self):
+        """Отменяет задачу, если она ещё не начала выполняться."""
+        if self.done.is_set():
+            return False
+        self.cancelled.set()
+        return True
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class TaskBatch:
+    """Группа задач с собственным счётчиком прогресса (например, одно открытие файлов).
+
+    total — ожидаемое число задач. Его стоит задавать заранее, если задачи
+    подаются постепенно: иначе пакет, первые задачи которого уже выполнены,
+    а остальные ещё не поставлены, выглядел бы завершённым.
+    """
+
+    def __init__(self, name=None, total=0):
+        self.name = name
+        self.lock = threading.Lock()
+        self.handles = []
+        self.total = total
+        self.submitted = 0
+        self.completed = 0
+
+    def _add(self, handle):
+        with self.lock:
+            self.handles.append(handle)
+            self.submitted += 1
+            self.total = max(self.total, self.submitted)
+
+    def close(self):
+        """Больше задач не будет: ожидаемое число сводится к фактически поставленным."""
+        with self.lock:
+            self.total = self.submitted
+
+    def _complete(self):
+        with self.lock:
+            self.completed += 1
+            return self.progress_unlocked()
+
+    def progress_unlocked(self):
+        return int(self.completed / self.total * 100) if self.total else 100
+
+    def progress(self):
+        with self.lock:
+            return self.progress_unlocked()
+
+    def is_finished(self):
+        with self.lock:
+            return self.completed >= self.total
+
+    def cancel(self):
+        """Отменяет все ещё не начатые задачи пакета."""
+        with self.lock:
+            handles = list(self.handles)
+        for handle in handles:
+            handle.cancel()
+
 
 class TaskQueue:
-    def __init__(self, progress_callback=None, max_workers=4):
-        self.tasks = queue.Queue()
-        self.is_running = False
+    """Пул постоянных рабочих потоков с приоритетной ограниченной очередью.
+
+    Потоки создаются один раз при первой задаче и живут до shutdown().
+    Если в очереди уже max_pending задач, submit блокируется (или бросает
+    queue.Full при block=False), так что поставщик не может забежать вперёд.
+    """
+
+    def __init__(self, progress_callback=None, max_workers=4, max_pending=256):
+        self.tasks = queue.PriorityQueue(maxsize=max_pending)
         self.progress_callback = progress_callback
         self.max_workers = max_workers
         self.lock = threading.Lock()
-        self.total_tasks = 0
-        self.completed_tasks = 0
+        # Сигнал shutdown(): поставщик закончил put (в том числе ждавший места в очереди)
+        self._submit_done = threading.Condition(self.lock)
+        self.threads = []
+        self._sequence = itertools.count()
+        self._stopped = False
+        self._submitting = 0  # Вызовы submit между проверкой _stopped и концом put
 
-    def add_task(self, task, *args, **kwargs):
-        self.tasks.put((task, args, kwargs))
+    def new_batch(self, name=None, total=0):
+        return TaskBatch(name, total)
+
+    def submit(self, task, args=(), kwargs=None, priority=PRIORITY_BULK, batch=None, block=True, timeout=None):
+        """Ставит задачу в очередь и возвращает её TaskHandle."""
         with self.lock:
-            self.total_tasks += 1
-        if not self.is_running:
-            self.start()
+            if self._stopped:
+                raise RuntimeError("Очередь задач остановлена")
+            self._submitting += 1
+        try:
+            handle = TaskHandle(batch)
+            if batch is not None:
+                batch._add(handle)
+            # Порядковый номер сохраняет FIFO среди задач одного приоритета
+            item = (priority, next(self._sequence), task, args, kwargs or {}, handle)
+            try:
+                self.tasks.put(item, block=block, timeout=timeout)
+            except queue.Full:
+                if batch is not None:
+                    handle.cancel()
+                    self._finish(handle)
+                raise
+        finally:
+            with self.lock:
+                self._submitting -= 1
+                self._submit_done.notify_all()
+        self._ensure_workers()
+        return handle
 
-    def start(self):
-        self.is_running = True
-        for _ in range(self.max_workers):
-            threading.Thread(target=self.run).start()
+    def add_task(self, task, *args, **kwargs):
+        return self.submit(task, args, kwargs)
+
+    def _ensure_workers(self):
+        with self.lock:
+            if self.threads or self._stopped:
+                return
+            for _ in range(self.max_workers):
+                thread = threading.Thread(target=self.run, daemon=True)
+                thread.start()
+                self.threads.append(thread)
 
     def run(self):
-        while not self.tasks.empty():
+        while True:
+            priority, _, task, args, kwargs, handle = self.tasks.get()
             try:
-                task, args, kwargs = self.tasks.get_nowait()
-            except queue.Empty:
-                break
+                if priority == _PRIORITY_STOP:
+                    return
+                if not handle.cancelled.is_set():
+                    try:
+                        task(*args, **kwargs)
+                    except Exception as e:
+                        handle.error = e
+                        logging.error(f"Ошибка в фоновой задаче: {e}", exc_info=True)
+                self._finish(handle)
+            finally:
+                self.tasks.task_done()
+
+    def _finish(self, handle):
+        handle.done.set()
+        if handle.batch is None:
+            return
+        progress = handle.batch._complete()
+        if self.progress_callback:
             try:
-                task(*args, **kwargs)
+                self.progress_callback(progress, handle.batch)
             except Exception as e:
-                print(f"Error: {e}")
-            self.tasks.task_done()
+                logging.error(f"Ошибка в обработчике прогресса: {e}", exc_info=True)
+
+    def shutdown(self):
+        """Отменяет ожидающие задачи и останавливает рабочие потоки."""
+        with self.lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        while True:
+            # Новые submit уже не начнутся, но начатые могут ждать места в очереди:
+            # очередь опустошается, пока они не закончат, и ещё раз после этого
             with self.lock:
-                self.completed_tasks += 1
-                if self.progress_callback:
-                    progress = int((self.completed_tasks / self.total_tasks) * 100)
-                    self.progress_callback(progress)
-        with self.lock:
-            if self.tasks.empty():
-                self.is_running = False
-                self.total_tasks = 0
-                self.completed_tasks = 0
+                submitting = self._submitting
+            self._cancel_pending()
+            if not submitting:
+                break
+            with self._submit_done:
+                self._submit_done.wait_for(lambda: self._submitting < submitting, timeout=0.1)
+        with self.lock:
+            for _ in self.threads:
+                # Очередь только что опустошена, поэтому put не блокируется надолго
+                self.tasks.put((_PRIORITY_STOP, next(self._sequence), None, (), {}, None))
+            self.threads = []
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                item = self.tasks.get_nowait()
+            except queue.Empty:
+                return
+            item[-1].cancel()
+            self._finish(item[-1])
+            self.tasks.task_done()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from cli import BatchConverter, build_parser, collect_inputs, glob_root
+from settings import Settings
+
+
+class TestCollectInputs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        for sub in ('a', 'b'):
+            os.makedirs(os.path.join(self.root, 'reports', sub))
+            open(os.path.join(self.root, 'reports', sub, 'x.pdf'), 'wb').close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_glob_root(self):
+        self.assertEqual(glob_root(os.path.join('reports', '**', '*.pdf')), 'reports')
+        self.assertEqual(glob_root('*.pdf'), os.curdir)
+        self.assertEqual(glob_root(os.path.join('reports', 'a', 'x.pdf')), os.path.join('reports', 'a'))
+
+    def test_glob_keeps_subdirectories(self):
+        pattern = os.path.join(self.root, 'reports', '**', '*.pdf')
+        outputs = [output for _, output in collect_inputs([pattern], 'out', 'txt')]
+        self.assertEqual(outputs, [os.path.join('out', 'a', 'x.txt'), os.path.join('out', 'b', 'x.txt')])
+
+    def test_conflicting_outputs_fail(self):
+        first = os.path.join(self.root, 'reports', 'a', 'x.pdf')
+        second = os.path.join(self.root, 'reports', 'b', 'x.pdf')
+        output = os.path.join(self.root, 'out', 'x.txt')
+        args = build_parser().parse_args([first, second, '-o', 'out', '--no-cache'])
+        converter = BatchConverter(Settings(), args)
+        try:
+            self.assertEqual(converter.claim_output(first, output), first)
+            result = converter.convert_file((second, output))
+        finally:
+            converter.close()
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn(first, result['error'])
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from corpus_index import CorpusIndex
+
+
+class TestCorpusIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp_dir.name, 'cache', 'corpus.sqlite')
+        self.index = CorpusIndex(self.index_path, flush_pages=2)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def test_search_finds_page(self):
+        self.index.add_page('doc1', 'a.pdf', 1, "Договор поставки оборудования")
+        self.index.add_page('doc1', 'a.pdf', 2, "Акт приёмки работ")
+        self.index.add_page('doc2', 'b.pdf', 7, "Счёт на оплату оборудования")
+        hits = self.index.search("оборудования")
+        self.assertEqual({(hit['path'], hit['page']) for hit in hits}, {('a.pdf', 1), ('b.pdf', 7)})
+        self.assertIn('[оборудования]', hits[0]['snippet'])
+        self.assertEqual(self.index.stats(), {'documents': 2, 'pages': 3})
+
+    def test_all_words_must_match(self):
+        self.index.add_page('doc1', 'a.pdf', 1, "Договор поставки")
+        self.index.add_page('doc1', 'a.pdf', 2, "Договор аренды")
+        hits = self.index.search("договор аренды")
+        self.assertEqual([hit['page'] for hit in hits], [2])
+
+    def test_reindex_replaces_changed_page(self):
+        self.index.add_page('doc1', 'a.pdf', 1, "старый текст")
+        self.index.flush()
+        self.index.add_page('doc1', 'a.pdf', 1, "старый текст")
+        self.index.add_page('doc1', 'moved/a.pdf', 2, "новый текст")
+        self.index.flush()
+        self.index.add_page('doc1', 'moved/a.pdf', 1, "исправленный текст")
+        self.assertEqual(self.index.search("старый"), [])
+        hits = self.index.search("исправленный")
+        self.assertEqual([(hit['path'], hit['page']) for hit in hits], [('moved/a.pdf', 1)])
+        self.assertEqual(self.index.stats()['pages'], 2)
+
+    def test_new_version_of_file_replaces_old_rows(self):
+        self.index.add_page('old-key', 'a.pdf', 1, "прежняя редакция", 'ocr')
+        self.index.flush()
+        self.index.add_page('new-key', 'a.pdf', 1, "новая редакция", 'auto')
+        self.assertEqual(self.index.search("прежняя"), [])
+        hits = self.index.search("редакция")
+        self.assertEqual([(hit['doc_key'], hit['mode']) for hit in hits], [('new-key', 'auto')])
+        self.assertEqual(self.index.stats(), {'documents': 1, 'pages': 1})
+
+    def test_survives_reopen(self):
+        self.index.add_page('doc1', 'a.pdf', 1, "сохранённая страница")
+        self.index.close()
+        self.index = CorpusIndex(self.index_path)
+        self.assertEqual(len(self.index.search("сохранённая")), 1)
+
+    def test_remove_document(self):
+        self.index.add_page('doc1', 'a.pdf', 1, "удаляемый документ")
+        self.index.remove_document('doc1')
+        self.assertEqual(self.index.search("удаляемый"), [])
+        self.assertEqual(self.index.stats(), {'documents': 0, 'pages': 0})
+
+    def test_quote_query_disables_operators(self):
+        self.assertEqual(CorpusIndex.quote_query('a "b" OR'), '"a" """b""" "OR"')
+        self.assertEqual(self.index.search('   '), [])
+        self.index.add_page('doc1', 'a.pdf', 1, "NEAR OR AND")
+        self.assertEqual(len(self.index.search("OR AND")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
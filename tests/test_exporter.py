@@ -0,0 +1,80 @@
+import csv
+import math
+import os
+import tempfile
+import unittest
+
+import fitz
+
+from exporter import PDF_LINE_SPACING, PDF_MARGIN, PDF_PAGE_HEIGHT, Exporter, FontMetrics
+from settings import Settings
+
+
+class FixedWidthFont:
+    """Every glyph is one point wide per point of font size."""
+
+    @staticmethod
+    def text_length(text, fontsize):
+        return len(text) * fontsize
+
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.exporter = Exporter(Settings())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_iter_lines_joins_lines_split_across_chunks(self):
+        chunks = ['первая стр', 'ока\nвторая\n', 'третья']
+        self.assertEqual(list(Exporter.iter_lines(chunks)), ['первая строка', 'вторая', 'третья'])
+
+    def test_txt_accepts_chunk_iterator(self):
+        file_path = os.path.join(self.tmp_dir.name, 'out.txt')
+        self.exporter.export((f"страница {n}\n" for n in range(3)), file_path)
+        with open(file_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), "страница 0\nстраница 1\nстраница 2\n")
+
+    def test_csv_rows_from_chunks(self):
+        file_path = os.path.join(self.tmp_dir.name, 'out.csv')
+        self.exporter.export(iter(['a\nb', '\nc\n']), file_path)
+        with open(file_path, encoding='utf-8', newline='') as f:
+            self.assertEqual(list(csv.reader(f)), [['a'], ['b'], ['c']])
+
+    def test_pdf_page_count_follows_line_count(self):
+        font_size = self.exporter.settings.font_size
+        lines_per_page = int((PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // (font_size * PDF_LINE_SPACING))
+        for line_count in (1, lines_per_page, lines_per_page + 1, 3 * lines_per_page + 5):
+            file_path = os.path.join(self.tmp_dir.name, f'{line_count}.pdf')
+            self.exporter.export(''.join(f"line {n}\n" for n in range(line_count)), file_path)
+            with fitz.open(file_path) as pdf:
+                self.assertEqual(pdf.page_count, math.ceil(line_count / lines_per_page))
+
+    def test_empty_text_gives_one_blank_page(self):
+        file_path = os.path.join(self.tmp_dir.name, 'empty.pdf')
+        self.exporter.export('', file_path)
+        with fitz.open(file_path) as pdf:
+            self.assertEqual(pdf.page_count, 1)
+
+
+class TestFontMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = FontMetrics(FixedWidthFont(), 1)
+
+    def test_wraps_at_word_boundary(self):
+        self.assertEqual(list(self.metrics.wrap(['aaa bbb ccc'], 7)), ['aaa bbb', 'ccc'])
+
+    def test_long_word_is_broken_between_characters(self):
+        self.assertEqual(list(self.metrics.wrap(['ab cdefghijk l'], 4)), ['ab', 'cdef', 'ghij', 'k l'])
+
+    def test_empty_lines_are_kept(self):
+        self.assertEqual(list(self.metrics.wrap(['first', '', '', 'last'], 10)), ['first', '', '', 'last'])
+
+    def test_widths_are_cached_per_glyph(self):
+        self.metrics.text_width('abcabc')
+        self.assertEqual(self.metrics.widths, {'a': 1, 'b': 1, 'c': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from fingerprint import Fingerprinter
+from result_cache import ResultCache
+
+
+class TestFingerprinter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, 'scan.pdf')
+        with open(self.file_path, 'wb') as f:
+            f.write(os.urandom(2 * 1024 * 1024))
+        self.cache = ResultCache(os.path.join(self.tmp_dir.name, 'cache.sqlite'), 1024 * 1024)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_quick_key_is_memoized(self):
+        fingerprinter = Fingerprinter()
+        key = fingerprinter.quick_key(self.file_path)
+        self.assertEqual(fingerprinter.quick_key(self.file_path), key)
+        stats = fingerprinter.stats()
+        self.assertEqual((stats['quick_computed'], stats['quick_memo_hits']), (1, 1))
+
+    def test_quick_key_changes_with_content(self):
+        fingerprinter = Fingerprinter()
+        key = fingerprinter.quick_key(self.file_path)
+        with open(self.file_path, 'r+b') as f:
+            f.seek(-10, os.SEEK_END)
+            f.write(b'0123456789')
+        os.utime(self.file_path, ns=(0, 0))
+        self.assertNotEqual(fingerprinter.quick_key(self.file_path), key)
+
+    def test_full_hash_memoized_in_cache(self):
+        fingerprint = Fingerprinter('full', self.cache).fingerprint(self.file_path)
+        # Новый экземпляр (как после перезапуска) берёт хэш из кэша
+        fingerprinter = Fingerprinter('full', self.cache)
+        self.assertEqual(fingerprinter.fingerprint(self.file_path), fingerprint)
+        stats = fingerprinter.stats()
+        self.assertEqual((stats['full_computed'], stats['full_memo_hits']), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
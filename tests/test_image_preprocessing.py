@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from image_preprocessing import (
+    binarize_adaptive, estimate_skew, estimate_x_height, find_content_box, map_box, otsu_threshold, preprocess
+)
+
+
+def make_page(angle=0.0, size=(1200, 1600), line_height=40, x_height=30):
+    """Белая страница с тёмными «строками» из прямоугольников-букв."""
+    image = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(image)
+    for top in range(200, size[1] - 200, line_height * 2):
+        for left in range(150, size[0] - 150, x_height):
+            draw.rectangle([left, top, left + x_height * 2 // 3, top + x_height], fill=0)
+    return image.rotate(angle, fillcolor=255) if angle else image
+
+
+class TestImagePreprocessing(unittest.TestCase):
+    def test_otsu_threshold_separates_two_levels(self):
+        gray = np.full((100, 100), 200, dtype=np.uint8)
+        gray[:, :30] = 40
+        threshold = otsu_threshold(gray)
+        self.assertTrue(40 <= threshold < 200)
+
+    def test_otsu_threshold_on_black_and_white(self):
+        gray = np.full((100, 100), 255, dtype=np.uint8)
+        gray[:, :30] = 0
+        threshold = otsu_threshold(gray)
+        self.assertTrue(0 < threshold < 255)
+        self.assertEqual(int((gray <= threshold).sum()), 30 * 100)
+
+    def test_adaptive_handles_uneven_background(self):
+        # Фон темнеет слева направо, но тёмная точка должна остаться чёрной, а фон — белым
+        gray = np.tile(np.linspace(120, 250, 200).astype(np.uint8), (100, 1))
+        gray[50, 20] = 0
+        binary = binarize_adaptive(gray)
+        self.assertEqual(binary[50, 20], 0)
+        self.assertEqual(binary[10, 150], 255)
+
+    def test_find_content_box_skips_black_border(self):
+        dark = np.zeros((500, 400), dtype=bool)
+        dark[:, :20] = True  # Чёрная полоса сканера слева
+        dark[100:200, 150:250] = True
+        self.assertEqual(find_content_box(dark, margin=0), (150, 100, 250, 200))
+
+    def test_estimate_skew_finds_rotation(self):
+        # PIL поворачивает против часовой стрелки, строки поднимаются вправо
+        gray = np.asarray(make_page(angle=2.0))
+        self.assertAlmostEqual(estimate_skew(gray < 128), -2.0, delta=0.5)
+        self.assertEqual(estimate_skew(np.asarray(make_page()) < 128), 0.0)
+
+    def test_estimate_x_height(self):
+        gray = np.asarray(make_page(x_height=30))
+        self.assertAlmostEqual(estimate_x_height(gray < 128), 31, delta=2)
+
+    def test_preprocess_shrinks_large_print(self):
+        image = make_page(x_height=60, line_height=80)
+        result, transform = preprocess(image, ['crop', 'scale', 'otsu'], 20)
+        self.assertLess(result.size[0] * result.size[1], image.size[0] * image.size[1] / 4)
+        # Рамка на обработанном изображении возвращается в исходные координаты
+        x0, y0, _, _ = map_box(transform, (0, 0, 10, 10))
+        self.assertGreater(x0, 100)
+        self.assertGreater(y0, 150)
+
+    def test_preprocess_without_steps_keeps_geometry(self):
+        image = make_page()
+        result, transform = preprocess(image, [], 20)
+        self.assertEqual(result.size, image.size)
+        self.assertEqual(map_box(transform, (1, 2, 3, 4)), (1.0, 2.0, 3.0, 4.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+import ocr_backends
+from ocr_backends import (
+    ENGINE_AUTO, ENGINE_BATCH, ENGINE_PYTESSERACT, ENGINE_TESSEROCR, OCROptions, _word_box, resolve_engine
+)
+
+
+class TestOCRBackends(unittest.TestCase):
+    def test_options_config(self):
+        options = OCROptions(ENGINE_PYTESSERACT, 'rus+eng', '1', '3', None)
+        self.assertEqual(options.config, '--oem 3 --psm 1')
+
+    def test_auto_engine_prefers_in_process_binding(self):
+        expected = ENGINE_TESSEROCR if ocr_backends.tesserocr is not None else ENGINE_BATCH
+        self.assertEqual(resolve_engine(ENGINE_AUTO), expected)
+
+    def test_unknown_engine_falls_back_to_pytesseract(self):
+        self.assertEqual(resolve_engine('other_engine'), ENGINE_PYTESSERACT)
+        self.assertEqual(resolve_engine(ENGINE_BATCH), ENGINE_BATCH)
+
+    def test_word_box_skips_structural_rows(self):
+        self.assertIsNone(_word_box('', '-1', 0, 0, 100, 100))
+        self.assertIsNone(_word_box('  ', '95', 0, 0, 10, 10))
+        self.assertEqual(_word_box('Слово', '91.5', '10', '20', '30', '12'), (10, 20, 40, 32, 'Слово'))
+
+
+if __name__ == '__main__':
+    unittest.main()
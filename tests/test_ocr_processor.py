@@ -0,0 +1,40 @@
+import unittest
+from collections import namedtuple
+
+from ocr_processor import _recognize_batch
+
+PageRef = namedtuple('PageRef', ['path', 'page_num'])
+
+
+class TestRecognizeBatch(unittest.TestCase):
+    def setUp(self):
+        self.page_refs = [PageRef('a.pdf', page_num) for page_num in range(4)]
+
+    def test_failed_preparation_loses_only_its_page(self):
+        def prepare(page_ref):
+            if page_ref.page_num == 1:
+                raise RuntimeError("битая страница")
+            return page_ref.page_num
+
+        calls = []
+
+        def recognize(items):
+            calls.append(list(items))
+            return [f'текст {item}' for item in items]
+
+        self.assertEqual(_recognize_batch(self.page_refs, prepare, recognize),
+                         ['текст 0', None, 'текст 2', 'текст 3'])
+        self.assertEqual(calls, [[0, 2, 3]])
+
+    def test_failed_batch_falls_back_to_single_pages(self):
+        def recognize(items):
+            if 2 in items:
+                raise RuntimeError("ошибка движка")
+            return [f'текст {item}' for item in items]
+
+        self.assertEqual(_recognize_batch(self.page_refs, lambda page_ref: page_ref.page_num, recognize),
+                         ['текст 0', 'текст 1', None, 'текст 3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from page_renderer import PageRenderer, PixmapCache, PreviewDocument, RenderedPage
+
+
+def page(nbytes):
+    return RenderedPage(nbytes // 3, 1, b'\0' * nbytes)
+
+
+class TestPixmapCache(unittest.TestCase):
+    def test_evicts_least_recently_used_by_bytes(self):
+        cache = PixmapCache(max_bytes=300)
+        cache.put('a', page(120))
+        cache.put('b', page(120))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('c', page(120))
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.total_bytes, 240)
+
+    def test_replacing_entry_updates_size(self):
+        cache = PixmapCache(max_bytes=300)
+        cache.put('a', page(120))
+        cache.put('a', page(60))
+        self.assertEqual((len(cache), cache.total_bytes), (1, 60))
+
+    def test_oversized_page_is_not_cached(self):
+        cache = PixmapCache(max_bytes=100)
+        cache.put('a', page(60))
+        cache.put('b', page(300))
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+
+    def test_stats(self):
+        cache = PixmapCache(max_bytes=100)
+        cache.put('a', page(30))
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['size_bytes'], stats['hits'], stats['misses']), (1, 30, 1, 1))
+
+
+class TestPrefetchOrder(unittest.TestCase):
+    def test_pages_around_center_nearest_first(self):
+        document = PreviewDocument('a.pdf', None, 10, 0.0)
+        self.assertEqual(PageRenderer._around(document, 5, 2), [5, 6, 4, 7, 3])
+        self.assertEqual(PageRenderer._around(document, 0, 2), [0, 1, 2])
+        self.assertEqual(PageRenderer._around(document, 9, 1), [9, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
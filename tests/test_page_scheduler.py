@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from page_scheduler import ProgressReporter, ReorderBuffer, iter_completed, run_inline
+
+
+class CountingExecutor:
+    """Пул потоков, запоминающий наибольшее число одновременно незавершённых задач."""
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures = []
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        # Future помечается завершённым раньше, чем просыпается wait(), поэтому done() точен
+        self.futures = [future for future in self.futures if not future.done()]
+        future = self.executor.submit(fn, *args)
+        self.futures.append(future)
+        self.peak = max(self.peak, len(self.futures))
+        return future
+
+
+class TestPageScheduler(unittest.TestCase):
+    def test_completion_order_with_reorder_buffer(self):
+        delays = {0: 0.3, 1: 0.0, 2: 0.0}
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            completed = list(iter_completed(
+                delays.items(), lambda delay: executor.submit(time.sleep, delay)
+            ))
+        completed_keys = [key for key, _ in completed]
+        # Медленная первая страница не задерживает отчёт о более поздних
+        self.assertEqual(completed_keys[-1], 0)
+
+        buffer = ReorderBuffer(range(3))
+        ordered = []
+        for key in completed_keys:
+            ordered.extend(buffer.add(key, key))
+        self.assertEqual(ordered, [(0, 0), (1, 1), (2, 2)])
+
+    def test_max_inflight_limits_submissions(self):
+        def double(value):
+            time.sleep(0.01)
+            return value * 2
+
+        # Потоков больше, чем max_inflight: без ограничения задачи шли бы параллельно
+        counting = CountingExecutor(workers=4)
+        try:
+            results = list(iter_completed(((idx, idx) for idx in range(12)),
+                                          lambda arg: counting.submit(double, arg), max_inflight=2))
+        finally:
+            counting.executor.shutdown()
+        self.assertEqual(sorted(results), [(idx, idx * 2) for idx in range(12)])
+        self.assertEqual(counting.peak, 2)
+
+        counting = CountingExecutor(workers=4)
+        try:
+            list(iter_completed(((idx, idx) for idx in range(12)),
+                                lambda arg: counting.submit(double, arg)))
+        finally:
+            counting.executor.shutdown()
+        self.assertGreater(counting.peak, 2)
+
+    def test_run_inline(self):
+        self.assertEqual(run_inline(lambda value: value * 2, 21).result(), 42)
+        with self.assertRaises(ZeroDivisionError):
+            run_inline(lambda value: 1 / value, 0).result()
+
+    def test_cancel_stops_waiting(self):
+        cancel_event = threading.Event()
+        release = threading.Event()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            tasks = ((idx, idx) for idx in range(10))
+            results = iter_completed(tasks, lambda _: executor.submit(release.wait, 5),
+                                     max_inflight=2, cancel_event=cancel_event)
+            threading.Timer(0.05, cancel_event.set).start()
+            started = time.monotonic()
+            self.assertEqual(list(results), [])
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+
+    def test_progress_reporter_message(self):
+        text_queue = queue.Queue()
+        reporter = ProgressReporter(text_queue, total=4, done=1)
+        reporter.advance()
+        message_type, percent, stats = text_queue.get_nowait()
+        self.assertEqual((message_type, percent, stats['done'], stats['total']), ("PROGRESS", 50, 2, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, split_page_range, split_page_runs
 from settings import Settings
 
 class TestPDFProcessor(unittest.TestCase):
@@ -13,10 +13,25 @@ class TestPDFProcessor(unittest.TestCase):
         self.assertIsInstance(text, str)
         self.assertTrue(len(text) > 0)
 
+    def test_split_page_range(self):
+        # Шарды должны быть смежными и покрывать весь диапазон по порядку
+        shards = split_page_range(range(3, 13), 4)
+        self.assertEqual(shards, [(3, 6), (6, 9), (9, 11), (11, 13)])
+        self.assertEqual(split_page_range(range(0, 2), 8), [(0, 1), (1, 2)])
+
+    def test_split_page_runs_skips_cached_pages(self):
+        # Страницы 3-4 уже в кэше: шарды не должны их захватывать
+        shards = split_page_runs([0, 1, 2, 5, 6, 7, 8, 9], 4)
+        self.assertEqual(shards, [(0, 2), (2, 3), (5, 8), (8, 10)])
+
     def test_extract_annotations(self):
         # Тестирование метода extract_annotations
         annotations = self.processor.extract_annotations('sample.pdf')
         self.assertIsInstance(annotations, list)
+        for annotation in annotations:
+            self.assertEqual(len(annotation['rect']), 4)
+            self.assertIn('author', annotation)
+            self.assertIn('modified', annotation)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'cache', 'results.sqlite')
+        self.cache = ResultCache(self.cache_path, max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_put_and_get(self):
+        key = ResultCache.make_key('hash', 'text', 1, 5)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, 'Привет, мир')
+        self.assertEqual(self.cache.get(key), 'Привет, мир')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_survives_reopen(self):
+        key = ResultCache.make_key('hash', 'ocr')
+        self.cache.put(key, 'текст')
+        self.cache.close()
+        self.cache = ResultCache(self.cache_path, max_bytes=10 * 1024 * 1024)
+        self.assertEqual(self.cache.get(key), 'текст')
+
+    def test_get_many_returns_only_found(self):
+        self.cache.put_many({'p1': 'один', 'p2': 'два'})
+        self.assertEqual(self.cache.get_many(['p1', 'p2', 'p3']), {'p1': 'один', 'p2': 'два'})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_lru_eviction(self):
+        # Случайные данные почти не сжимаются, поэтому размер записей предсказуем
+        payloads = [os.urandom(3000).hex() for _ in range(3)]
+        self.cache.max_bytes = 7000
+        self.cache.put('a', payloads[0])
+        self.cache.put('b', payloads[1])
+        self.cache.get('a')  # 'a' становится недавно использованной
+        self.cache.put('c', payloads[2])
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), payloads[0])
+        self.assertLessEqual(self.cache.stats()['size_bytes'], 7000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import re
+import unittest
+
+from search_engine import PENDING, SearchEngine
+from text_store import TextStore
+
+
+class TestSearchEngine(unittest.TestCase):
+    def setUp(self):
+        self.store = TextStore()
+        self.store.append_page("Кот и кот\nсобака", 'a.pdf', 1)
+        self.store.append_page("КОТ 42, пёс 7", 'a.pdf', 2)
+        self.search = SearchEngine(self.store)
+
+    def test_case_folded_count(self):
+        self.search.set_query("кот")
+        while not self.search.index_step(max_lines=1):
+            pass
+        self.assertEqual(self.search.matches, [(0, 0, 3), (0, 6, 9), (2, 0, 3)])
+        self.search.set_query("кот", case_sensitive=True)
+        self.search.index_step()
+        self.assertEqual(self.search.count, 1)
+
+    def test_regex_and_invalid_pattern(self):
+        self.search.set_query(r"\d+", regex=True)
+        self.search.index_step()
+        self.assertEqual(self.search.matches, [(2, 4, 6), (2, 12, 13)])
+        with self.assertRaises(re.error):
+            self.search.set_query("(", regex=True)
+
+    def test_navigation_wraps(self):
+        self.search.set_query("кот")
+        self.search.index_step()
+        self.assertEqual(self.search.find_next(0, -1), (0, 0, 3))
+        self.assertEqual(self.search.find_next(0, 0), (0, 6, 9))
+        self.assertEqual(self.search.find_next(2, 0), (0, 0, 3))
+        self.assertEqual(self.search.find_previous(0, 0), (2, 0, 3))
+        self.assertEqual(self.search.find_previous(2, 0), (0, 6, 9))
+
+    def test_navigation_waits_for_index(self):
+        self.search.set_query("кот")
+        self.search.index_step(max_lines=1)
+        self.assertEqual(self.search.find_next(0, 0), (0, 6, 9))
+        self.assertIs(self.search.find_next(0, 6), PENDING)
+        self.assertIs(self.search.find_previous(2, 0), PENDING)
+        self.assertIs(self.search.find_previous(0, 0), PENDING)
+        # Навигация сама индекс не достраивает
+        self.assertEqual(self.search.indexed_lines, 1)
+        self.search.index_step()
+        self.assertEqual(self.search.find_next(0, 6), (2, 0, 3))
+        self.assertEqual(self.search.find_previous(0, 0), (2, 0, 3))
+
+    def test_matches_in_range_does_not_index(self):
+        self.search.set_query("кот")
+        self.assertEqual(self.search.matches_in_range(0, 3), [])
+        self.search.index_step(1)
+        self.assertEqual(self.search.indexed_lines, 1)
+        self.assertEqual(self.search.matches_in_range(0, 3), [(0, 0, 3), (0, 6, 9)])
+        self.assertFalse(self.search.is_complete)
+
+    def test_index_continues_after_append(self):
+        self.search.set_query("пёс")
+        self.search.index_step()
+        self.store.append_page("ещё пёс", 'b.pdf', 1)
+        self.assertFalse(self.search.is_complete)
+        self.search.index_step()
+        self.assertEqual(self.search.count, 2)
+
+    def test_replace_all_literal_and_regex(self):
+        self.search.set_query("кот")
+        # Без режима регулярных выражений обратная косая черта не особая
+        self.assertEqual(self.search.replace_all(r"\лис"), (3, 0))
+        self.assertEqual(self.store.lines(0, 1), [r"\лис и \лис"])
+        # Индекс устарел после замены и строится заново
+        self.assertEqual(self.search.count, 0)
+        self.search.set_query(r"(\d+)", regex=True)
+        self.assertEqual(self.search.replace_all(r"<\1>"), (2, 2))
+        self.assertEqual(self.store.lines(2, 3), [r"\лис <42>, пёс <7>"])
+        self.assertEqual([(page.source, page.page_num) for page in self.store.pages], [('a.pdf', 1), ('a.pdf', 2)])
+
+    def test_replace_matches_what_was_highlighted(self):
+        # ^ и $ относятся к строкам, пустые совпадения не заменяются и не считаются
+        for pattern in (r"^\w+", r"\w+$", r"\d*"):
+            self.setUp()
+            self.search.set_query(pattern, regex=True)
+            self.search.index_step()
+            highlighted = self.search.count
+            count, _ = self.search.replace_all("#")
+            self.assertEqual(count, highlighted, pattern)
+        self.assertEqual(self.store.text(), "Кот и кот\nсобака\nКОТ #, пёс #\n")
+        self.setUp()
+        self.search.set_query(r"^\w+", regex=True)
+        self.search.replace_all("#")
+        self.assertEqual(self.store.text(), "# и кот\n#\n# 42, пёс 7\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import queue
+import threading
+import unittest
+
+from task_queue import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TaskQueue
+
+
+class TestTaskQueue(unittest.TestCase):
+    def setUp(self):
+        self.progress = []
+        self.task_queue = TaskQueue(lambda progress, batch: self.progress.append(progress), max_workers=1, max_pending=4)
+
+    def tearDown(self):
+        self.task_queue.shutdown()
+
+    def block_worker(self):
+        # Занимает единственный поток, пока тест не разрешит продолжить
+        started, release = threading.Event(), threading.Event()
+        self.task_queue.submit(lambda: (started.set(), release.wait(5)))
+        started.wait(5)
+        return release
+
+    def test_priority_order(self):
+        release = self.block_worker()
+        order = []
+        handles = [
+            self.task_queue.submit(order.append, ('bulk',), priority=PRIORITY_BACKGROUND),
+            self.task_queue.submit(order.append, ('interactive',), priority=PRIORITY_INTERACTIVE),
+        ]
+        release.set()
+        for handle in handles:
+            self.assertTrue(handle.wait(5))
+        self.assertEqual(order, ['interactive', 'bulk'])
+
+    def test_cancel_pending_task(self):
+        release = self.block_worker()
+        executed = []
+        batch = self.task_queue.new_batch()
+        handle = self.task_queue.submit(executed.append, (1,), batch=batch)
+        self.assertTrue(handle.cancel())
+        release.set()
+        self.assertTrue(handle.wait(5))
+        self.assertEqual(executed, [])
+        self.assertTrue(batch.is_finished())
+
+    def test_batch_progress(self):
+        release = self.block_worker()
+        batch = self.task_queue.new_batch()
+        handles = [self.task_queue.submit(lambda: None, batch=batch) for _ in range(4)]
+        release.set()
+        for handle in handles:
+            handle.wait(5)
+        self.assertEqual(self.progress, [25, 50, 75, 100])
+
+    def test_batch_with_expected_size(self):
+        batch = self.task_queue.new_batch(total=4)
+        first = self.task_queue.submit(lambda: None, batch=batch)
+        self.assertTrue(first.wait(5))
+        # Остальные задачи ещё не поставлены — пакет не завершён
+        self.assertEqual(self.progress, [25])
+        self.assertFalse(batch.is_finished())
+        batch.close()
+        self.assertTrue(batch.is_finished())
+
+    def test_backpressure(self):
+        release = self.block_worker()
+        for _ in range(4):
+            self.task_queue.submit(lambda: None)
+        with self.assertRaises(queue.Full):
+            self.task_queue.submit(lambda: None, block=False)
+        release.set()
+
+    def test_shutdown_cancels_task_of_blocked_feeder(self):
+        release = self.block_worker()
+        batch = self.task_queue.new_batch(total=5)
+        for _ in range(4):
+            self.task_queue.submit(lambda: None, batch=batch)
+        # Пятая задача ждёт места в полной очереди, как поставщик пакета в интерфейсе
+        feeder = threading.Thread(target=self.task_queue.submit, args=(lambda: None,), kwargs={'batch': batch})
+        feeder.start()
+        feeder.join(0.1)
+        self.assertTrue(feeder.is_alive())
+        self.task_queue.shutdown()
+        feeder.join(5)
+        self.assertTrue(batch.is_finished())
+        self.assertEqual(self.task_queue.tasks.qsize(), 1)  # Только задача остановки потока
+        release.set()
+        with self.assertRaises(RuntimeError):
+            self.task_queue.submit(lambda: None)
+
+    def test_tasks_added_after_idle_are_processed(self):
+        first = self.task_queue.submit(lambda: None)
+        self.assertTrue(first.wait(5))
+        second = self.task_queue.submit(lambda: None)
+        self.assertTrue(second.wait(5))
+        self.assertEqual(len(self.task_queue.threads), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
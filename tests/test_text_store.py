@@ -0,0 +1,92 @@
+import unittest
+
+from text_store import PageSequencer, TextStore
+
+
+class TestTextStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TextStore()
+        self.store.append_page("первая\nстрока два", 'a.pdf', 1)
+        self.store.append_page("вторая страница", 'a.pdf', 2)
+        self.store.append_page("третья\nи\nпоследняя", 'b.pdf', 1)
+
+    def test_lines_span_pages(self):
+        self.assertEqual(self.store.line_count, 6)
+        self.assertEqual(self.store.lines(1, 4), ["строка два", "вторая страница", "третья"])
+        self.assertEqual(self.store.lines(5, 100), ["последняя"])
+        self.assertEqual(self.store.lines(7, 9), [])
+
+    def test_page_lookup(self):
+        self.assertEqual(self.store.page_at_line(2), 1)
+        self.assertEqual(self.store.page_start_line(2), 3)
+        self.assertEqual(self.store.find_page(1), 0)
+        self.assertEqual(self.store.find_page(1, 'b.pdf'), 2)
+        self.assertIsNone(self.store.find_page(5))
+
+    def test_empty_page_has_no_lines(self):
+        self.store.append_page("", 'b.pdf', 2)
+        self.store.append_page("конец", 'b.pdf', 3)
+        self.assertEqual(self.store.line_count, 7)
+        self.assertEqual(self.store.find_page(2, 'b.pdf'), 3)
+        self.assertEqual(self.store.page_start_line(3), 6)
+        self.assertEqual(self.store.page_at_line(6), 4)
+        self.assertEqual(self.store.text().splitlines()[-2:], ["последняя", "конец"])
+
+    def test_iter_chunks_matches_page_text(self):
+        self.assertEqual(
+            list(self.store.iter_chunks()),
+            ["первая\nстрока два\n", "вторая страница\n", "третья\nи\nпоследняя\n"]
+        )
+
+    def test_clear(self):
+        self.assertFalse(self.store.is_blank())
+        self.store.clear()
+        self.assertTrue(self.store.is_blank())
+        self.assertEqual(self.store.line_count, 0)
+
+
+class TestPageSequencer(unittest.TestCase):
+    def setUp(self):
+        self.store = TextStore()
+        self.sequencer = PageSequencer(self.store)
+
+    def sources(self):
+        return [(page.source, page.page_num) for page in self.store.pages]
+
+    def test_documents_stay_contiguous(self):
+        self.assertEqual(self.sequencer.add_page('a.pdf', 1, "a1"), [('a.pdf', 1)])
+        self.assertEqual(self.sequencer.add_page('b.pdf', 1, "b1"), [])
+        self.sequencer.add_page('a.pdf', 2, "a2")
+        self.sequencer.add_page('c.pdf', 1, "c1")
+        self.sequencer.add_page('b.pdf', 2, "b2")
+        self.sequencer.finish('b.pdf')
+        self.assertEqual(self.sequencer.finish('a.pdf'), [('b.pdf', 1), ('b.pdf', 2), ('c.pdf', 1)])
+        self.sequencer.add_page('c.pdf', 2, "c2")
+        self.assertEqual(self.sources(), [('a.pdf', 1), ('a.pdf', 2), ('b.pdf', 1), ('b.pdf', 2),
+                                          ('c.pdf', 1), ('c.pdf', 2)])
+
+    def test_empty_pages_are_stored_without_lines(self):
+        self.assertEqual(self.sequencer.add_page('a.pdf', 1, ""), [('a.pdf', 1)])
+        self.sequencer.add_page('a.pdf', 2, "текст")
+        self.assertEqual(self.sources(), [('a.pdf', 1), ('a.pdf', 2)])
+        self.assertEqual(self.store.text(), "текст\n")
+
+    def test_is_pending_until_stored(self):
+        self.sequencer.add_page('a.pdf', 1, "a1")
+        self.sequencer.add_page('b.pdf', 1, "b1")
+        self.sequencer.finish('b.pdf')
+        self.assertTrue(self.sequencer.is_pending('b.pdf'))
+        self.sequencer.finish('a.pdf')
+        self.assertFalse(self.sequencer.is_pending('a.pdf'))
+        self.assertFalse(self.sequencer.is_pending('b.pdf'))
+
+    def test_finish_all_flushes_buffers(self):
+        self.sequencer.add_page('a.pdf', 1, "a1")
+        self.sequencer.add_page('b.pdf', 1, "b1")
+        self.sequencer.finish_all()
+        self.assertEqual(self.sources(), [('a.pdf', 1), ('b.pdf', 1)])
+        self.assertIsNone(self.sequencer.active)
+
+
+if __name__ == '__main__':
+    unittest.main()
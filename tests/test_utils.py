@@ -0,0 +1,27 @@
+import sys
+import unittest
+
+from utils import LazyModule, lazy_import
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_module_loads_on_first_attribute(self):
+        sys.modules.pop('colorsys', None)
+        module = lazy_import('colorsys')
+        self.assertIsInstance(module, LazyModule)
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn('colorsys', sys.modules)
+
+    def test_already_imported_module_is_returned_as_is(self):
+        self.assertIs(lazy_import('os'), sys.modules['os'])
+
+    def test_optional_missing_module(self):
+        self.assertIsNone(lazy_import('no_such_module_for_tests', optional=True))
+        module = lazy_import('no_such_module_for_tests')
+        with self.assertRaises(ImportError):
+            module.anything
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""Постраничное хранилище извлечённого текста.
+
+Текст хранится в памяти как список страниц, каждая — кортеж строк, плюс
+индекс начальных строк страниц. По нему окно просмотра за O(log n)
+получает любой диапазон строк, не собирая весь текст в одну строку, а
+сохранение и экспорт читают текст постранично. Модуль не зависит от tkinter.
+"""
+import bisect
+from collections import OrderedDict, namedtuple
+
+# source — путь к исходному файлу, page_num — номер страницы (с 1) или None
+StoredPage = namedtuple('StoredPage', ['source', 'page_num', 'lines'])
+
+
+class TextStore:
+    def __init__(self):
+        self.pages = []
+        self._line_starts = []  # Номер первой строки каждой страницы
+        self.line_count = 0
+        # Счётчик изменений: окно просмотра по нему понимает, что пора перечитать строки
+        self.version = 0
+        # Растёт, когда меняются уже добавленные строки (очистка, замена), а не при добавлении
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    def clear(self):
+        self.pages = []
+        self._line_starts = []
+        self.line_count = 0
+        self.version += 1
+        self.generation += 1
+
+    def append_page(self, text, source=None, page_num=None):
+        """Добавляет страницу в конец и возвращает её индекс.
+
+        Пустая страница (например, без текстового слоя) хранится без строк:
+        номера страниц идут без пропусков, а в тексте она не оставляет
+        пустой строки и начинается там же, где следующая.
+        """
+        lines = tuple(text.split('\n')) if text else ()
+        self.pages.append(StoredPage(source, page_num, lines))
+        self._line_starts.append(self.line_count)
+        self.line_count += len(lines)
+        self.version += 1
+        return len(self.pages) - 1
+
+    def is_blank(self):
+        """True, если в хранилище нет ни одной непустой строки."""
+        return not any(line.strip() for page in self.pages for line in page.lines)
+
+    def page_at_line(self, line):
+        """Индекс страницы, которой принадлежит строка line."""
+        return max(bisect.bisect_right(self._line_starts, line) - 1, 0)
+
+    def page_start_line(self, index):
+        return self._line_starts[index]
+
+    def find_page(self, page_num, source=None):
+        """Индекс первой страницы с данным номером (и источником, если задан) или None."""
+        for index, page in enumerate(self.pages):
+            if page.page_num == page_num and (source is None or page.source == source):
+                return index
+        return None
+
+    def lines(self, start, end):
+        """Строки с номерами [start, end)."""
+        start, end = max(start, 0), min(end, self.line_count)
+        result = []
+        if start >= end:
+            return result
+        index = self.page_at_line(start)
+        while index < len(self.pages) and len(result) < end - start:
+            offset = self._line_starts[index]
+            lines = self.pages[index].lines
+            result.extend(lines[max(start - offset, 0):end - offset])
+            index += 1
+        return result
+
+    def iter_chunks(self):
+        """Текст по страницам для потокового экспорта: каждая страница заканчивается '\\n'."""
+        for page in list(self.pages):
+            if page.lines:
+                yield '\n'.join(page.lines) + '\n'
+
+    def text(self):
+        return ''.join(self.iter_chunks())
+
+    def iter_lines(self, start_line=0):
+        """Пары (номер строки, строка) начиная со start_line."""
+        if start_line >= self.line_count:
+            return
+        for index in range(self.page_at_line(start_line), len(self.pages)):
+            offset = self._line_starts[index]
+            lines = self.pages[index].lines
+            for line_offset in range(max(start_line - offset, 0), len(lines)):
+                yield offset + line_offset, lines[line_offset]
+
+    def substitute(self, regex, replacement):
+        """Заменяет совпадения regex за один проход по страницам.
+
+        Совпадения ищутся в каждой строке отдельно и пустые совпадения
+        пропускаются — так же, как их находит и подсвечивает SearchEngine,
+        поэтому заменяется ровно то, что было подсвечено.
+        replacement — строка шаблона re.sub или функция от совпадения.
+        Изменяются только затронутые страницы, индекс строк пересчитывается
+        начиная с первой из них. Возвращает (число замен, номер первой
+        изменённой строки или None).
+        """
+        count = 0
+        first_changed = None
+
+        def replace(match):
+            nonlocal count
+            if match.end() == match.start():
+                return ''
+            count += 1
+            return replacement(match) if callable(replacement) else match.expand(replacement)
+
+        for index, page in enumerate(self.pages):
+            page_start = count
+            new_lines = [regex.sub(replace, line) for line in page.lines]
+            if count == page_start:
+                continue
+            if first_changed is None:
+                first_changed = index
+            # Замена может содержать перевод строки — строки страницы разбираются заново
+            self.pages[index] = page._replace(lines=tuple('\n'.join(new_lines).split('\n')))
+        if first_changed is None:
+            return 0, None
+        line = self._line_starts[first_changed]
+        for index in range(first_changed, len(self.pages)):
+            self._line_starts[index] = line
+            line += len(self.pages[index].lines)
+        self.line_count = line
+        self.version += 1
+        self.generation += 1
+        return count, self._line_starts[first_changed]
+
+
+class PageSequencer:
+    """Складывает в TextStore страницы нескольких документов, обрабатываемых параллельно.
+
+    Страницы первого начавшего поступать документа идут в хранилище сразу,
+    страницы остальных копятся по источникам и добавляются, когда
+    предыдущий документ завершён. Так каждый документ лежит в хранилище
+    сплошным куском в порядке страниц, а не вперемешку с другими.
+    Методы возвращают список добавленных (source, page_num).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.active = None
+        self._buffers = OrderedDict()  # source -> [(page_num, text)]
+        self._finished = set()  # Завершённые документы, ещё ждущие своей очереди
+
+    def reset(self):
+        self.active = None
+        self._buffers.clear()
+        self._finished.clear()
+
+    def add_page(self, source, page_num, text):
+        if self.active is None and source not in self._buffers:
+            self.active = source
+        if source == self.active:
+            return self._append(source, [(page_num, text)])
+        self._buffers.setdefault(source, []).append((page_num, text))
+        return []
+
+    def finish(self, source):
+        """Документ source обработан (успешно или с ошибкой)."""
+        if source == self.active:
+            self.active = None
+        elif source in self._buffers:
+            self._finished.add(source)
+        return self._advance()
+
+    def is_pending(self, source):
+        """True, если страницы source ещё поступают или ждут своей очереди."""
+        return source == self.active or source in self._buffers
+
+    def finish_all(self):
+        """Всё, что накоплено, добавляется сразу (например, после отмены)."""
+        self._finished.update(self._buffers)
+        self.active = None
+        return self._advance()
+
+    def _advance(self):
+        appended = []
+        while self.active is None and self._buffers:
+            source, pages = self._buffers.popitem(last=False)
+            appended.extend(self._append(source, pages))
+            if source in self._finished:
+                self._finished.discard(source)
+            else:
+                self.active = source
+        return appended
+
+    def _append(self, source, pages):
+        appended = []
+        for page_num, text in pages:
+            self.store.append_page(text, source, page_num)
+            appended.append((source, page_num))
+        return appended
@@ -0,0 +1,195 @@
+"""Виртуализированный просмотр большого текста из TextStore.
+
+В tk.Text загружается только окно строк вокруг видимой области (с запасом
+сверху и снизу), ограниченное числом строк и символов. Когда прокрутка
+подходит к краю окна, оно перестраивается вокруг текущей позиции. Полоса
+прокрутки показывает положение во всём хранилище, а не в окне.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+# Границы окна, загружаемого в виджет
+WINDOW_LINES = 400
+WINDOW_CHARS = 300000
+# Доля окна, которая остаётся над текущей строкой после перестроения
+WINDOW_BEFORE_SHARE = 1 / 3
+# Перестраивать окно, когда видимая область подходит к его краю ближе этой доли
+RECENTER_THRESHOLD = 0.1
+
+
+class VirtualTextView(ttk.Frame):
+    def __init__(self, master, store, font):
+        super().__init__(master)
+        self.store = store
+        self.text = tk.Text(self, wrap=tk.WORD, font=font, yscrollcommand=self._on_text_scroll)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Текст только для чтения: изменения вносятся в хранилище, а не в окно
+        self.text.configure(state=tk.DISABLED)
+        self.text.tag_config('highlight', background='yellow')
+        self.text.tag_config('match', background='orange')
+        self.window_start = 0
+        self.window_end = 0
+        self._window_chars = 0
+        self._synced_line_count = 0
+        self._recenter_pending = False
+        self._search = None
+        self._match = None
+
+    # Окно строк
+
+    def _window_around(self, top):
+        """Границы окна [start, end) вокруг строки top с учётом лимитов строк и символов."""
+        before_lines = int(WINDOW_LINES * WINDOW_BEFORE_SHARE)
+        before_chars = int(WINDOW_CHARS * WINDOW_BEFORE_SHARE)
+        start, chars = top, 0
+        for line in reversed(self.store.lines(top - before_lines, top)):
+            chars += len(line) + 1
+            if chars > before_chars:
+                break
+            start -= 1
+        end = top
+        for line in self.store.lines(top, top + WINDOW_LINES - (top - start)):
+            # В окно всегда попадает хотя бы строка top
+            if end > top and chars + len(line) + 1 > WINDOW_CHARS:
+                break
+            chars += len(line) + 1
+            end += 1
+        return start, end, chars
+
+    def _set_window(self, start, end, chars):
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', '\n'.join(self.store.lines(start, end)))
+        self.text.configure(state=tk.DISABLED)
+        self.window_start, self.window_end, self._window_chars = start, end, chars
+        self._synced_line_count = self.store.line_count
+        self._apply_highlight()
+
+    def _show_line(self, line):
+        self.text.yview(f'{line - self.window_start + 1}.0')
+
+    def goto_line(self, line, col=None, length=0):
+        """Прокручивает к строке line; если задан столбец, выделяет совпадение длины length."""
+        line = min(max(line, 0), max(self.store.line_count - 1, 0))
+        if not self.window_start <= line < self.window_end or self.window_end > self.store.line_count:
+            self._set_window(*self._window_around(line))
+        self._match = (line, col, length) if col is not None else None
+        self._apply_match()
+        self._show_line(line)
+        self._apply_highlight()
+        self._update_scrollbar()
+
+    def goto_page(self, index):
+        self.goto_line(self.store.page_start_line(index))
+
+    def refresh(self):
+        """Перечитывает окно после изменения хранилища (очистки, замены)."""
+        self._match = None
+        top = self.top_line() if self.window_end <= self.store.line_count else 0
+        self._set_window(*self._window_around(min(top, max(self.store.line_count - 1, 0))))
+        self._show_line(top if self.window_start <= top < self.window_end else self.window_start)
+        self._apply_highlight()
+        self._update_scrollbar()
+
+    def on_store_append(self):
+        """Вызывается после добавления страниц: дописывает их, если окно стоит в конце текста."""
+        if self.window_end < self.store.line_count and self._is_tail_open():
+            new_lines = []
+            for line in self.store.lines(self.window_end, self.window_start + WINDOW_LINES):
+                if self._window_chars + len(line) + 1 > WINDOW_CHARS and self.window_end > self.window_start:
+                    break
+                new_lines.append(line)
+                self._window_chars += len(line) + 1
+            if new_lines:
+                prefix = '\n' if self.window_end > self.window_start else ''
+                self.text.configure(state=tk.NORMAL)
+                self.text.insert(tk.END + '-1c', prefix + '\n'.join(new_lines))
+                self.text.configure(state=tk.DISABLED)
+                self.window_end += len(new_lines)
+                self._apply_highlight()
+        self._synced_line_count = self.store.line_count
+        self._update_scrollbar()
+
+    def _is_tail_open(self):
+        # Окно можно дописывать, пока оно заканчивается на конце текста, каким
+        # он был при прошлой загрузке, и лимиты окна ещё не исчерпаны
+        return (self.window_end == self._synced_line_count
+                and self.window_end - self.window_start < WINDOW_LINES
+                and self._window_chars < WINDOW_CHARS)
+
+    # Прокрутка
+
+    def top_line(self):
+        return self.window_start + int(self.text.index('@0,0').split('.')[0]) - 1
+
+    def bottom_line(self):
+        return self.window_start + int(self.text.index(f'@0,{self.text.winfo_height()}').split('.')[0]) - 1
+
+    def _on_text_scroll(self, first, last):
+        first, last = float(first), float(last)
+        near_start = self.window_start > 0 and first < RECENTER_THRESHOLD
+        near_end = self.window_end < self.store.line_count and last > 1 - RECENTER_THRESHOLD
+        if (near_start or near_end) and not self._recenter_pending:
+            # Перестроение откладывается: yscrollcommand вызывается посреди обновления виджета
+            self._recenter_pending = True
+            self.after_idle(self._recenter)
+        self._apply_highlight()
+        self._update_scrollbar()
+
+    def _recenter(self):
+        self._recenter_pending = False
+        top = self.top_line()
+        self._set_window(*self._window_around(top))
+        self._apply_match()
+        self._show_line(top)
+
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.goto_line(int(float(args[1]) * self.store.line_count))
+        elif args[0] == 'scroll':
+            # Внутри окна прокручивает сам виджет, края окна обработает _on_text_scroll
+            self.text.yview_scroll(int(args[1]), args[2])
+
+    def _update_scrollbar(self):
+        total = self.store.line_count
+        if not total or self.window_end <= self.window_start:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.top_line() / total, min((self.bottom_line() + 1) / total, 1.0))
+
+    # Подсветка
+
+    def set_search(self, search):
+        """Подсвечивает совпадения SearchEngine (или снимает подсветку при None)."""
+        self._search = search
+        self._apply_highlight()
+
+    def on_search_indexed(self, start_line, end_line):
+        """Обновляет подсветку, если строки [start_line, end_line) только что проиндексированы и видны."""
+        if self._search is not None and start_line <= self.bottom_line() and end_line > self.top_line():
+            self._apply_highlight()
+
+    def _apply_highlight(self):
+        # Теги ставятся только на видимые строки и обновляются при прокрутке
+        self.text.tag_remove('highlight', '1.0', tk.END)
+        if self._search is None or self.window_end <= self.window_start:
+            return
+        top = max(self.top_line(), self.window_start)
+        bottom = min(self.bottom_line() + 1, self.window_end)
+        for line, start, end in self._search.matches_in_range(top, bottom):
+            row = line - self.window_start + 1
+            self.text.tag_add('highlight', f'{row}.{start}', f'{row}.{end}')
+
+    def _apply_match(self):
+        self.text.tag_remove('match', '1.0', tk.END)
+        if self._match is None:
+            return
+        line, col, length = self._match
+        if self.window_start <= line < self.window_end:
+            start = f'{line - self.window_start + 1}.{col}'
+            self.text.tag_add('match', start, f'{start}+{length}c')
+
+    def set_font(self, font):
+        self.text.configure(font=font)
@@ -1,15 +1,21 @@
-import requests
 import os
 import sys
-import subprocess
+
 
 class Updater:
+    """Проверка и установка обновлений.
+
+    Модуль ничего не делает при импорте: проверку запускает интерфейс
+    после того, как окно показано.
+    """
+
     def __init__(self):
         self.update_url = 'https://example.com/updates'  # URL для проверки обновлений
 
     def is_update_available(self):
         # Проверка наличия обновлений
-        # Здесь можно реализовать запрос к серверу для получения информации о последней версии
+        # Здесь можно реализовать запрос к серверу для получения информации о последней версии;
+        # requests стоит импортировать внутри метода, чтобы не замедлять запуск
         return False  # Для примера, всегда возвращаем False
 
     def update(self):
@@ -22,10 +28,3 @@ class Updater:
             os.system("osascript -e 'tell app \"Terminal\" to do script \"echo Update functionality is in development and currently not available.\"'")
         else:
             os.system("gnome-terminal -- bash -c 'echo Update functionality is in development and currently not available; exec bash'")
-
-# Пример использования
-updater = Updater()
-if updater.is_update_available():
-    updater.update()
-else:
-    print("No updates available.")
@@ -1,7 +1,9 @@
+import importlib
+import importlib.util
 import os
 import sys
-import tkinter as tk
 import hashlib
+import threading
 
 def resource_path(relative_path):
     try:
@@ -16,6 +18,9 @@ def validate_file(file_path):
     return os.path.splitext(file_path)[1].lower() in valid_extensions
 
 def create_tooltip(widget, text):
+    # tkinter импортируется здесь, чтобы utils можно было использовать без GUI
+    import tkinter as tk
+
     tooltip = tk.Toplevel(widget)
     tooltip.withdraw()
     tooltip.overrideredirect(True)
@@ -43,3 +48,52 @@ def hash_file(file_path):
             hasher.update(buf)
             buf = f.read(65536)
     return hasher.hexdigest()
+
+def resolve_workers(value):
+    """Возвращает число рабочих процессов: 0 или None означает число ядер."""
+    if not value:
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+class LazyModule:
+    """Модуль, который импортируется при первом обращении к его атрибуту.
+
+    Тяжёлые зависимости (fitz, numpy, pytesseract) не замедляют запуск
+    приложения, пока не понадобятся. Загрузка защищена блокировкой: к
+    модулю могут впервые обратиться сразу несколько рабочих потоков.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'загружен' if self._module is not None else 'не загружен'
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name, optional=False):
+    """Возвращает LazyModule для name; модуль загрузится при первом использовании.
+
+    Для optional=True возвращает None, если модуль не установлен: это
+    проверяется по find_spec, без выполнения кода модуля.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)